@@ -8,6 +8,80 @@ Configuración del sistema de alquiler de vehículos
 # Configuración de base de datos
 DB_FILE = "alquiler_vehiculos.db"
 
+# Perfiles de conexión SQLite
+# Cada perfil define los PRAGMA que se aplican al abrir una conexión.
+# journal_mode=WAL permite que las lecturas (reportes) no bloqueen las escrituras (alquileres).
+DB_PROFILES = {
+    # Uso normal en el mostrador: lecturas y escrituras cortas
+    "desk": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -16000,          # ~16 MB (valor negativo = KiB)
+        "mmap_size": 64 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,          # milisegundos
+    },
+    # Reportes: consultas largas de solo lectura
+    "reporting": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+    # Importaciones masivas: prioriza rendimiento sobre durabilidad ante cortes de energía
+    "bulk-import": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -128000,
+        "mmap_size": 256 * 1024 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+    },
+}
+
+# Perfil usado por defecto en las conexiones de la aplicación
+DB_PROFILE = "desk"
+# Perfil de las conexiones de solo lectura del pool (reportes, consultas)
+DB_READER_PROFILE = "reporting"
+
+# Versión mínima de SQLite (la que trae el módulo sqlite3 de Python): las consultas usan
+# UPDATE ... FROM (3.33), UPSERT (3.24) y las funciones JSON (json_each)
+SQLITE_VERSION_MINIMA = (3, 33, 0)
+
+# Pool de conexiones: un escritor por thread + N lectores de solo lectura
+DB_POOL_MAX_READERS = 4
+DB_POOL_IDLE_TIMEOUT = 300      # segundos sin uso antes de cerrar un lector
+DB_POOL_LEAK_TIMEOUT = 60       # segundos prestada antes de reportar una posible fuga
+DB_POOL_CHECKOUT_TIMEOUT = 10   # segundos de espera máxima para obtener una conexión
+# Depuración de fugas: guarda el stack completo de cada préstamo (por defecto solo la
+# línea que pidió la conexión; armar el stack en cada consulta es caro)
+DB_POOL_LEAK_TRACEBACK = False
+
+# Escritura diferida (write-behind): las escrituras de los DAOs se encolan y un único
+# thread las confirma en lotes (un commit por lote en lugar de uno por fila)
+DB_WRITE_BEHIND = False
+DB_WRITE_BATCH_WINDOW_MS = 5    # ventana de latencia para agrupar escrituras
+DB_WRITE_BATCH_MAX = 500        # escrituras máximas por transacción
+
+# Transacciones BEGIN IMMEDIATE (alquileres): reintentos si la base sigue bloqueada
+# después de busy_timeout (otro puesto escribiendo). La espera crece exponencialmente.
+DB_WRITE_RETRIES = 5
+DB_WRITE_RETRY_BACKOFF_MS = 25
+
+# Estructuras en memoria (índice de disponibilidad, capacidad, planificador de estados):
+# las escrituras de la aplicación se detectan en memoria; las de otros procesos, releyendo
+# la tabla version_calendario como mucho cada estos segundos
+DB_VERIFICACION_EXTERNA_SEGUNDOS = 2
+
+# Caché de reportes (ReportesService): resultados guardados por método + argumentos,
+# invalidados cuando cambia PRAGMA data_version. Máximo de resultados en memoria (LRU)
+REPORTES_CACHE_MAX_ENTRADAS = 128
+
+# Exportación de alquileres a CSV: filas leídas por fetchmany (la memoria no depende del total)
+EXPORTACION_TAMANO_LOTE = 5000
+
 # Verificar disponibilidad de matplotlib
 try:
     import matplotlib.pyplot as plt
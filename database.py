@@ -7,12 +7,38 @@ Programación Estructurada - Funciones bien organizadas
 Compatibilidad - Mantiene funciones legacy para compatibilidad con código existente
 """
 
+import argparse
 import sqlite3
+import sys
 from datetime import datetime, timedelta
-from config import DB_FILE
+from config import DB_FILE, SQLITE_VERSION_MINIMA
 
 # Patrón Singleton - Importar la nueva implementación
 from persistence.database_connection import DatabaseConnection
+from persistence.migraciones import (aplicar_migraciones, reconstruir_resumen_mensual,
+                                     reconstruir_estadisticas)
+
+
+class SQLiteNoCompatibleError(RuntimeError):
+    """La versión de SQLite incluida en Python no soporta las consultas de la aplicación"""
+
+
+def verificar_sqlite(conn):
+    """
+    Comprueba que SQLite tenga la versión mínima y las funciones JSON
+    Raises:
+        SQLiteNoCompatibleError: con la versión encontrada y la requerida
+    """
+    requerida = ".".join(map(str, SQLITE_VERSION_MINIMA))
+    if sqlite3.sqlite_version_info < SQLITE_VERSION_MINIMA:
+        raise SQLiteNoCompatibleError(
+            f"Se requiere SQLite {requerida} o superior y Python trae la {sqlite3.sqlite_version}. "
+            f"Actualice Python (o la biblioteca SQLite del sistema).")
+    try:
+        conn.execute("SELECT value FROM json_each('[1]')").fetchall()
+    except sqlite3.OperationalError:
+        raise SQLiteNoCompatibleError(
+            f"SQLite {sqlite3.sqlite_version} fue compilado sin las funciones JSON (json_each).")
 
 
 def get_connection():
@@ -20,6 +46,8 @@ def get_connection():
     Obtiene una conexión a la base de datos
     Programación Estructurada - Función de compatibilidad
     Patrón Singleton - Usa la instancia única de DatabaseConnection
+    Devuelve la conexión de escritura del pool (las lecturas pesadas deben usar
+    DatabaseConnection().lector())
     """
     # Patrón Singleton - Obtener instancia única
     db = DatabaseConnection()
@@ -28,127 +56,97 @@ def get_connection():
 
 def init_db():
     """
-    Inicializa la base de datos con las tablas necesarias
+    Inicializa la base de datos aplicando las migraciones pendientes
     Programación Estructurada - Función bien organizada
+    Si el esquema está al día solo se lee PRAGMA user_version
+    Raises:
+        SQLiteNoCompatibleError: si la versión de SQLite no alcanza (ver verificar_sqlite)
+        MigracionError: si una migración falla (su transacción se revierte)
     """
     # Crear conexión temporal para inicialización (no usar Singleton para evitar conflictos)
     conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
-    # Activar claves foráneas
-    c.executescript("""
-    PRAGMA foreign_keys = ON;
+    try:
+        verificar_sqlite(conn)
+        # Activar claves foráneas (debe hacerse fuera de una transacción)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return aplicar_migraciones(conn)
+    finally:
+        conn.close()
 
-    CREATE TABLE IF NOT EXISTS cliente (
-        id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        apellido TEXT NOT NULL,
-        dni TEXT UNIQUE,
-        telefono TEXT,
-        direccion TEXT,
-        email TEXT
-    );
 
-    CREATE TABLE IF NOT EXISTS empleado (
-        id_empleado INTEGER PRIMARY KEY AUTOINCREMENT,
-        nombre TEXT NOT NULL,
-        apellido TEXT NOT NULL,
-        dni TEXT UNIQUE,
-        cargo TEXT,
-        telefono TEXT,
-        email TEXT
-    );
+def reconstruir_resumenes():
+    """
+    Recalcula desde cero las tablas de resumen que mantienen los triggers
+    Programación Estructurada - Comando de reparación (p. ej. tras editar la base a mano
+    con los triggers desactivados); corre en una sola transacción
+    """
+    def reconstruir(c):
+        reconstruir_resumen_mensual(c)
+        reconstruir_estadisticas(c)
 
-    CREATE TABLE IF NOT EXISTS vehiculo (
-        id_vehiculo INTEGER PRIMARY KEY AUTOINCREMENT,
-        patente TEXT UNIQUE NOT NULL,
-        marca TEXT,
-        modelo TEXT,
-        tipo TEXT,
-        costo_diario REAL NOT NULL DEFAULT 0,
-        estado TEXT DEFAULT 'disponible',
-        fecha_ultimo_mantenimiento TEXT
-    );
+    init_db()
+    DatabaseConnection().ejecutar_inmediata(reconstruir)
 
-    CREATE TABLE IF NOT EXISTS alquiler (
-        id_alquiler INTEGER PRIMARY KEY AUTOINCREMENT,
-        fecha_inicio TEXT NOT NULL,
-        fecha_fin TEXT NOT NULL,
-        costo_total REAL NOT NULL,
-        id_cliente INTEGER NOT NULL,
-        id_vehiculo INTEGER NOT NULL,
-        id_empleado INTEGER,
-        fecha_registro TEXT NOT NULL DEFAULT (date('now')),
-        FOREIGN KEY(id_cliente) REFERENCES cliente(id_cliente) ON DELETE RESTRICT,
-        FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE RESTRICT,
-        FOREIGN KEY(id_empleado) REFERENCES empleado(id_empleado) ON DELETE SET NULL
-    );
 
-    CREATE TABLE IF NOT EXISTS multa (
-        id_multa INTEGER PRIMARY KEY AUTOINCREMENT,
-        descripcion TEXT,
-        monto REAL,
-        id_alquiler INTEGER NOT NULL,
-        FOREIGN KEY(id_alquiler) REFERENCES alquiler(id_alquiler) ON DELETE CASCADE
-    );
+def verificar_indices():
+    """
+    Verifica con EXPLAIN QUERY PLAN que las consultas que ejecuta la aplicación usan sus índices
+    Programación Estructurada - Devuelve un resultado por consulta para poder reportarlo
+    Returns:
+        list: dicts con consulta, indices_esperados, usa_indice y plan
+    """
+    # Imports locales: models y services dependen de este módulo
+    from models import (SQL_ALQUILERES_SOLAPADOS, SQL_ALQUILERES_ACTIVOS, SQL_ESTADOS_DERIVADOS,
+                        FILTRO_VEHICULOS, SQL_LISTADO_ALQUILERES, SQL_VALIDAR_ALQUILER,
+                        SQL_VALIDAR_ALQUILERES_LOTE)
+    from services.reportes_service import ReportesService
+    from services.indice_disponibilidad import IndiceDisponibilidad
+    from services.capacidad_categorias import CapacidadCategorias
 
-    CREATE TABLE IF NOT EXISTS mantenimiento (
-        id_mant INTEGER PRIMARY KEY AUTOINCREMENT,
-        tipo TEXT,
-        fecha_inicio TEXT NOT NULL,
-        fecha_fin TEXT NOT NULL,
-        costo REAL,
-        id_vehiculo INTEGER NOT NULL,
-        observaciones TEXT,
-        FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE CASCADE
-    );
-    """)
-    
-    # Migración: Si existe la columna 'fecha' antigua, migrar a fecha_inicio y fecha_fin
-    try:
-        c.execute("PRAGMA table_info(mantenimiento)")
-        columnas = [col[1] for col in c.fetchall()]
-        
-        if 'fecha' in columnas and 'fecha_inicio' not in columnas:
-            # Migrar datos: agregar columnas nuevas
-            c.execute("ALTER TABLE mantenimiento ADD COLUMN fecha_inicio TEXT")
-            c.execute("ALTER TABLE mantenimiento ADD COLUMN fecha_fin TEXT")
-            
-            # Copiar fecha a fecha_inicio y fecha_fin
-            c.execute("UPDATE mantenimiento SET fecha_inicio = fecha, fecha_fin = fecha WHERE fecha_inicio IS NULL")
-            
-            # Eliminar columna antigua (SQLite no soporta DROP COLUMN directamente)
-            # En su lugar, creamos una nueva tabla y copiamos los datos
-            c.execute("""
-                CREATE TABLE mantenimiento_new (
-                    id_mant INTEGER PRIMARY KEY AUTOINCREMENT,
-                    tipo TEXT,
-                    fecha_inicio TEXT NOT NULL,
-                    fecha_fin TEXT NOT NULL,
-                    costo REAL,
-                    id_vehiculo INTEGER NOT NULL,
-                    observaciones TEXT,
-                    FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE CASCADE
-                )
-            """)
-            
-            c.execute("""
-                INSERT INTO mantenimiento_new 
-                (id_mant, tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones)
-                SELECT id_mant, tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones
-                FROM mantenimiento
-            """)
-            
-            c.execute("DROP TABLE mantenimiento")
-            c.execute("ALTER TABLE mantenimiento_new RENAME TO mantenimiento")
-            
-            conn.commit()
-    except Exception as e:
-        # Si hay error en la migración, continuar (puede que ya esté migrado)
-        pass
-    
-    conn.commit()
-    conn.close()
+    hoy = datetime.now().strftime("%Y-%m-%d")
+    por_vehiculo = ("idx_alquiler_vehiculo_fechas", "idx_mantenimiento_vehiculo_fin")
+    consultas = [
+        ("registrar_alquiler (validación)", SQL_VALIDAR_ALQUILER,
+         {"cliente": 1, "empleado": None, "vehiculo": 1, "inicio": hoy, "fin": hoy}, por_vehiculo),
+        ("registrar_alquileres (validación del lote)", SQL_VALIDAR_ALQUILERES_LOTE,
+         {"solicitudes": "[]"}, por_vehiculo),
+        ("registrar_mantenimiento (alquileres solapados)", SQL_ALQUILERES_SOLAPADOS,
+         (1, hoy, hoy), ("idx_alquiler_vehiculo_fechas",)),
+        ("actualizar_estados_vehiculos (vehículos indicados)",
+         SQL_ESTADOS_DERIVADOS.format(filtro=FILTRO_VEHICULOS), {"ref": hoy, "ids": "[1]"}, por_vehiculo),
+        ("actualizar_estados_vehiculos y auditoría (toda la flota)",
+         SQL_ESTADOS_DERIVADOS.format(filtro=""), {"ref": hoy}, por_vehiculo),
+        ("índice de disponibilidad (intervalos de un vehículo)",
+         IndiceDisponibilidad.SQL_INTERVALOS_VEHICULO, (1, 1), por_vehiculo),
+        ("capacidad por categoría (ocupación)", CapacidadCategorias.SQL_OCUPACION,
+         {"desde": hoy, "hasta": hoy},
+         ("idx_alquiler_fecha_inicio", "idx_reserva_categoria_tipo_fechas")),
+        ("alquiler activo de un vehículo", SQL_ALQUILERES_ACTIVOS,
+         (1, hoy, hoy), ("idx_alquiler_vehiculo_fechas",)),
+        ("detalle_alquileres_por_cliente", ReportesService.SQL_DETALLE_ALQUILERES_CLIENTE,
+         (1,), ("idx_alquiler_cliente_fecha",)),
+        ("listado de alquileres", SQL_LISTADO_ALQUILERES,
+         (), ("idx_alquiler_fecha_inicio",)),
+        ("multas de un alquiler", "SELECT * FROM multa WHERE id_alquiler = ?",
+         (1,), ("idx_multa_alquiler",)),
+        ("ranking de clientes", ReportesService.SQL_RANKING_CLIENTES,
+         (10,), ("idx_estadistica_cliente_ranking",)),
+        ("vehículos más alquilados", ReportesService.SQL_RANKING_VEHICULOS,
+         (10,), ("idx_estadistica_vehiculo_ranking",)),
+    ]
+
+    resultados = []
+    with DatabaseConnection().lector() as conn:
+        for nombre, sql, params, indices in consultas:
+            # La columna 3 de EXPLAIN QUERY PLAN es el detalle (SEARCH/SCAN ... USING INDEX ...)
+            plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+            resultados.append({
+                "consulta": nombre,
+                "indices_esperados": list(indices),
+                "usa_indice": all(any(indice in paso for paso in plan) for indice in indices),
+                "plan": plan,
+            })
+    return resultados
 
 
 def seed_sample_data():
@@ -316,3 +314,27 @@ def seed_sample_data():
 
     conn.commit()
     conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mantenimiento de la base de datos de alquileres")
+    parser.add_argument("--reconstruir-resumenes", action="store_true",
+                        help="recalcula los resúmenes y contadores desde los alquileres")
+    parser.add_argument("--verificar-indices", action="store_true",
+                        help="muestra el plan de las consultas frecuentes y si usan sus índices")
+    args = parser.parse_args()
+    if args.reconstruir_resumenes:
+        reconstruir_resumenes()
+        print("Resúmenes reconstruidos.")
+    elif args.verificar_indices:
+        init_db()
+        resultados = verificar_indices()
+        for r in resultados:
+            print(f"[{'OK' if r['usa_indice'] else 'SIN ÍNDICE'}] {r['consulta']} "
+                  f"({', '.join(r['indices_esperados'])})")
+            if not r["usa_indice"]:
+                for paso in r["plan"]:
+                    print(f"    {paso}")
+        sys.exit(0 if all(r["usa_indice"] for r in resultados) else 1)
+    else:
+        print(f"Migraciones aplicadas: {init_db() or 'ninguna (esquema al día)'}")
@@ -13,24 +13,38 @@ Funcionalidades:
 - Reportes: listado de alquileres, vehículos más alquilados, facturación mensual (gráfico)
 """
 
-from database import init_db, seed_sample_data
+from database import init_db, seed_sample_data, SQLiteNoCompatibleError
+from persistence.migraciones import MigracionError
 from ui.main_window import App
-from models import actualizar_estados_vehiculos
+from services.planificador_estados import PlanificadorEstados
+from services.lista_espera import ListaEspera
 
 
 def main():
     """Función principal que inicializa la base de datos y la aplicación"""
-    init_db()
+    try:
+        init_db()
+    except SQLiteNoCompatibleError as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    except MigracionError as e:
+        # No iniciar la aplicación con un esquema a medio migrar
+        print(f"Error: no se pudo actualizar la base de datos. {e}")
+        raise SystemExit(1)
     seed_sample_data()
     
     # Actualizar estados de vehículos al iniciar la aplicación
     # Esto asegura que los estados estén correctos según alquileres y mantenimientos activos
+    # (el primer procesar() recalcula toda la flota y arma el planificador)
     try:
-        actualizar_estados_vehiculos()
+        PlanificadorEstados().procesar()
     except Exception as e:
         # Si hay error, continuar de todas formas (no bloquear el inicio)
         print(f"Advertencia: No se pudieron actualizar los estados de vehículos: {e}")
     
+    # Suscribir la lista de espera al calendario antes de que se liberen vehículos
+    ListaEspera()
+    
     app = App()
     app.mainloop()
 
@@ -5,8 +5,156 @@
 Módulo de lógica de negocio para el sistema de alquiler de vehículos
 """
 
-from datetime import datetime, date
-from database import get_connection
+import json
+import sqlite3
+from datetime import datetime, date, timedelta
+from persistence.database_connection import DatabaseConnection
+from validations import normalizar_fecha
+from patterns.observer import CalendarioNotifier
+
+
+# Consultas de disponibilidad y estado (usan los índices idx_alquiler_vehiculo_fechas
+# e idx_mantenimiento_vehiculo_fin; database.verificar_indices() lo comprueba)
+# Las fechas se guardan en ISO 'YYYY-MM-DD', por lo que se comparan como texto sin date():
+# envolver la columna en una función impediría usar el índice
+# Parámetros: (id_vehiculo, fecha_inicio, fecha_fin)
+# Un registro se solapa si termina después del inicio pedido y empieza antes del fin pedido
+SQL_ALQUILERES_SOLAPADOS = """
+SELECT COUNT(*) FROM alquiler
+WHERE id_vehiculo = ?
+  AND fecha_fin >= ?
+  AND fecha_inicio <= ?
+"""
+
+# Un alquiler está activo si: fecha_inicio <= fecha_referencia <= fecha_fin
+# Parámetros: (id_vehiculo, fecha_referencia, fecha_referencia)
+SQL_ALQUILERES_ACTIVOS = """
+SELECT COUNT(*) FROM alquiler
+WHERE id_vehiculo = ?
+  AND fecha_inicio <= ?
+  AND fecha_fin >= ?
+"""
+
+# Estado que debería tener cada vehículo en la fecha :ref
+# (Alquilado si tiene un alquiler activo, Mantenimiento si tiene un mantenimiento sin terminar)
+# Las subconsultas correlacionadas se resuelven con los índices por vehículo
+SQL_ESTADOS_DERIVADOS = """
+SELECT d.*,
+       CASE
+           WHEN d.alquileres_activos > 0 THEN 'Alquilado'
+           WHEN d.mantenimientos_activos > 0 THEN 'Mantenimiento'
+           ELSE 'Disponible'
+       END AS estado_nuevo
+FROM (
+    SELECT v.id_vehiculo, v.patente, v.marca, v.modelo, v.estado,
+           (SELECT COUNT(*) FROM alquiler a
+            WHERE a.id_vehiculo = v.id_vehiculo
+              AND a.fecha_inicio <= :ref AND a.fecha_fin >= :ref) AS alquileres_activos,
+           (SELECT COUNT(*) FROM mantenimiento m
+            WHERE m.id_vehiculo = v.id_vehiculo
+              AND m.fecha_fin >= :ref) AS mantenimientos_activos
+    FROM vehiculo v
+    {filtro}
+) d
+"""
+
+# Restringe SQL_ESTADOS_DERIVADOS a una lista de vehículos (:ids es un array JSON)
+FILTRO_VEHICULOS = "WHERE v.id_vehiculo IN (SELECT value FROM json_each(:ids))"
+
+# Aplica el estado derivado solo a los vehículos que cambian
+SQL_ACTUALIZAR_ESTADOS = f"""
+UPDATE vehiculo SET estado = d.estado_nuevo
+FROM ({SQL_ESTADOS_DERIVADOS}) d
+WHERE vehiculo.id_vehiculo = d.id_vehiculo
+  AND vehiculo.estado IS NOT d.estado_nuevo
+"""
+
+# Vehículos cuyo estado guardado difiere del derivado (misma comparación exacta que
+# SQL_ACTUALIZAR_ESTADOS: un estado con otras mayúsculas también se considera desactualizado)
+SQL_ESTADOS_DESACTUALIZADOS = f"""
+SELECT * FROM ({SQL_ESTADOS_DERIVADOS}) d
+WHERE d.estado IS NOT d.estado_nuevo
+"""
+
+# Validación completa de un alquiler en una sola consulta: existencia de cliente, empleado
+# y vehículo, costo diario, estado, tipo y cantidad de alquileres/mantenimientos solapados
+# Parámetros con nombre: :cliente, :empleado (puede ser NULL), :vehiculo, :inicio, :fin
+SQL_VALIDAR_ALQUILER = """
+SELECT EXISTS (SELECT 1 FROM cliente WHERE id_cliente = :cliente) AS cliente_existe,
+       (:empleado IS NULL
+        OR EXISTS (SELECT 1 FROM empleado WHERE id_empleado = :empleado)) AS empleado_existe,
+       v.id_vehiculo IS NOT NULL AS vehiculo_existe,
+       v.costo_diario,
+       v.estado,
+       v.tipo,
+       (SELECT COUNT(*) FROM alquiler a
+        WHERE a.id_vehiculo = :vehiculo
+          AND a.fecha_fin >= :inicio AND a.fecha_inicio <= :fin) AS alquileres_solapados,
+       (SELECT COUNT(*) FROM mantenimiento m
+        WHERE m.id_vehiculo = :vehiculo
+          AND m.fecha_fin >= :inicio AND m.fecha_inicio <= :fin) AS mantenimientos_solapados
+FROM (SELECT 1)
+LEFT JOIN vehiculo v ON v.id_vehiculo = :vehiculo
+"""
+
+# Misma validación para un lote de solicitudes (:solicitudes es un array JSON de objetos
+# {cliente, empleado, vehiculo, inicio, fin}); devuelve una fila por solicitud (pos = índice)
+SQL_VALIDAR_ALQUILERES_LOTE = """
+WITH s AS (
+    SELECT CAST(key AS INTEGER) AS pos,
+           json_extract(value, '$.cliente') AS cliente,
+           json_extract(value, '$.empleado') AS empleado,
+           json_extract(value, '$.vehiculo') AS vehiculo,
+           json_extract(value, '$.inicio') AS inicio,
+           json_extract(value, '$.fin') AS fin
+    FROM json_each(:solicitudes)
+)
+SELECT s.pos,
+       EXISTS (SELECT 1 FROM cliente WHERE id_cliente = s.cliente) AS cliente_existe,
+       (s.empleado IS NULL
+        OR EXISTS (SELECT 1 FROM empleado WHERE id_empleado = s.empleado)) AS empleado_existe,
+       v.id_vehiculo IS NOT NULL AS vehiculo_existe,
+       v.costo_diario,
+       v.estado,
+       v.tipo,
+       (SELECT COUNT(*) FROM alquiler a
+        WHERE a.id_vehiculo = s.vehiculo
+          AND a.fecha_fin >= s.inicio AND a.fecha_inicio <= s.fin) AS alquileres_solapados,
+       (SELECT COUNT(*) FROM mantenimiento m
+        WHERE m.id_vehiculo = s.vehiculo
+          AND m.fecha_fin >= s.inicio AND m.fecha_inicio <= s.fin) AS mantenimientos_solapados
+FROM s
+LEFT JOIN vehiculo v ON v.id_vehiculo = s.vehiculo
+ORDER BY s.pos
+"""
+
+# Alquileres y mantenimientos del vehículo en el tramo que se agrega al extender un alquiler
+SQL_SOLAPAMIENTOS_TRAMO = """
+SELECT (SELECT COUNT(*) FROM alquiler a
+        WHERE a.id_vehiculo = :vehiculo
+          AND a.fecha_fin >= :inicio AND a.fecha_inicio <= :fin) AS alquileres_solapados,
+       (SELECT COUNT(*) FROM mantenimiento m
+        WHERE m.id_vehiculo = :vehiculo
+          AND m.fecha_fin >= :inicio AND m.fecha_inicio <= :fin) AS mantenimientos_solapados,
+       (SELECT tipo FROM vehiculo WHERE id_vehiculo = :vehiculo) AS tipo
+"""
+
+# Modos de registrar_alquileres
+MODO_TODO_O_NADA = "todo_o_nada"
+MODO_MEJOR_ESFUERZO = "mejor_esfuerzo"
+
+# Listado de alquileres de la pestaña Alquileres (más recientes primero)
+SQL_LISTADO_ALQUILERES = """
+SELECT a.id_alquiler, a.fecha_inicio, a.fecha_fin, a.costo_total,
+       c.apellido || ', ' || c.nombre AS cliente,
+       v.patente || ' - ' || v.marca || ' ' || v.modelo AS vehiculo,
+       e.apellido || ', ' || e.nombre AS empleado
+FROM alquiler a
+JOIN cliente c ON a.id_cliente = c.id_cliente
+JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
+LEFT JOIN empleado e ON a.id_empleado = e.id_empleado
+ORDER BY a.fecha_inicio DESC
+"""
 
 
 def calcular_costo(costo_diario, fecha_inicio_str, fecha_fin_str):
@@ -25,53 +173,153 @@ def vehiculo_en_mantenimiento(id_vehiculo, fecha_inicio_str, fecha_fin_str):
     """
     Verifica si el vehículo está en mantenimiento en el período especificado
     Programación Estructurada - Función bien organizada
+    Se resuelve en memoria con el índice de disponibilidad (sin consultar SQLite)
     """
-    conn = get_connection()
-    c = conn.cursor()
-    
-    query = """
-    SELECT COUNT(*) FROM mantenimiento
-    WHERE id_vehiculo = ?
-      AND NOT (date(fecha_fin) < date(?) OR date(fecha_inicio) > date(?))
-    """
-    # Si existe un mantenimiento cuyo rango NO está completamente fuera del período deseado => está solapado
-    c.execute(query, (id_vehiculo, fecha_inicio_str, fecha_fin_str))
-    cnt = c.fetchone()[0]
-    
-    # No cerrar la conexión aquí - el Singleton la maneja por thread
-    # conn.close()  # Removido para evitar cerrar conexión compartida
-    return cnt > 0
+    from services.indice_disponibilidad import IndiceDisponibilidad
+    return IndiceDisponibilidad().en_mantenimiento(id_vehiculo, fecha_inicio_str, fecha_fin_str)
 
 
 def vehiculo_disponible(id_vehiculo, fecha_inicio_str, fecha_fin_str):
     """
     Verifica si el vehículo no tiene alquileres solapados ni mantenimientos en ese período
     Programación Estructurada - Función bien organizada
+    Se resuelve en memoria con el índice de disponibilidad (sin consultar SQLite)
     """
-    conn = get_connection()
-    c = conn.cursor()
-    
-    # Verificar alquileres solapados
-    query_alquileres = """
-    SELECT COUNT(*) FROM alquiler
-    WHERE id_vehiculo = ?
-      AND NOT (date(fecha_fin) < date(?) OR date(fecha_inicio) > date(?))
+    from services.indice_disponibilidad import IndiceDisponibilidad
+    return IndiceDisponibilidad().esta_libre(id_vehiculo, fecha_inicio_str, fecha_fin_str)
+
+
+def proximas_fechas_libres(dias, id_vehiculo=None, tipo=None, desde=None, cantidad=5):
+    """
+    Sugiere las primeras fechas en las que se puede alquilar `dias` días seguidos
+    un vehículo concreto (id_vehiculo) o cualquier vehículo disponible de un tipo
+    Se resuelve en memoria con el índice de disponibilidad (barrido de intervalos)
+    Returns:
+        list: ver IndiceDisponibilidad.proximas_ventanas
+    """
+    from services.indice_disponibilidad import IndiceDisponibilidad
+    if id_vehiculo is not None:
+        ids_vehiculo = [id_vehiculo]
+    elif tipo:
+        # Mismos candidatos que acepta registrar_alquiler (estado 'Disponible')
+        ids_vehiculo = [fila[0] for fila in DatabaseConnection().execute_query(
+            "SELECT id_vehiculo FROM vehiculo WHERE tipo = ? COLLATE NOCASE AND upper(estado) = 'DISPONIBLE'",
+            (tipo,)).fetchall()]
+    else:
+        raise ValueError("Indique un vehículo o un tipo de vehículo.")
+    return IndiceDisponibilidad().proximas_ventanas(ids_vehiculo, dias, desde, cantidad)
+
+
+def _error_de_negocio(error):
+    """
+    Convierte el RAISE(ABORT, ...) de un trigger de validación en ValueError
+    Los errores propios de SQLite ('... constraint failed') se devuelven sin cambios
+    """
+    if isinstance(error, sqlite3.IntegrityError) and "constraint failed" not in str(error):
+        return ValueError(str(error))
+    return error
+
+
+def motivo_rechazo_alquiler(validacion):
+    """
+    Deriva el motivo de rechazo a partir de una fila de SQL_VALIDAR_ALQUILER
+    Programación Estructurada - Mismo orden de validaciones que antes: cliente, empleado,
+    vehículo, estado y, por último, disponibilidad en el período
+    Returns:
+        str: mensaje de error, o None si el alquiler es válido
     """
-    c.execute(query_alquileres, (id_vehiculo, fecha_inicio_str, fecha_fin_str))
-    cnt_alquileres = c.fetchone()[0]
+    if not validacion["cliente_existe"]:
+        return "Cliente no encontrado."
+    if not validacion["empleado_existe"]:
+        return "Empleado no encontrado."
+    if not validacion["vehiculo_existe"]:
+        return "Vehículo no encontrado."
+    
+    # Validar que el vehículo esté en estado "Disponible" (comparación case-insensitive)
+    estado_vehiculo = validacion["estado"]
+    if estado_vehiculo and estado_vehiculo.upper() != "DISPONIBLE":
+        return (f"El vehículo no está disponible para alquilar. Estado actual: {estado_vehiculo}. "
+                f"Solo se pueden alquilar vehículos en estado 'Disponible'.")
     
-    # Verificar mantenimientos solapados
-    query_mantenimientos = """
-    SELECT COUNT(*) FROM mantenimiento
-    WHERE id_vehiculo = ?
-      AND NOT (date(fecha_fin) < date(?) OR date(fecha_inicio) > date(?))
+    # Verificar si es por alquileres o mantenimientos
+    if validacion["mantenimientos_solapados"]:
+        return ("Vehículo no disponible en el periodo indicado. "
+                "El vehículo está en mantenimiento en ese rango de fechas.")
+    if validacion["alquileres_solapados"]:
+        return ("Vehículo no disponible en el periodo indicado. "
+                "Ya existe un alquiler activo en ese rango de fechas.")
+    return None
+
+
+def _preparar_capacidad(fecha_inicio=None, fecha_fin=None):
+    """
+    Actualiza el modelo de capacidad antes de abrir la transacción de escritura: si estaba
+    desactualizado se recarga sin tener tomado el lock de escritura de SQLite
     """
-    c.execute(query_mantenimientos, (id_vehiculo, fecha_inicio_str, fecha_fin_str))
-    cnt_mantenimientos = c.fetchone()[0]
+    from services.capacidad_categorias import CapacidadCategorias
+    CapacidadCategorias().preparar(fecha_inicio, fecha_fin)
+
+
+def _capacidad_disponible(c, tipo, fecha_inicio, fecha_fin):
+    """
+    True si queda al menos un vehículo del tipo sin comprometer en el período
+    (alquileres y mantenimientos de la flota + reservas por categoría pendientes)
+    Se evalúa dentro de la transacción del cursor sin recargar el modelo (ver _preparar_capacidad)
+    """
+    if not tipo:
+        return True
+    from services.capacidad_categorias import CapacidadCategorias
+    return CapacidadCategorias().admite([(tipo, fecha_inicio, fecha_fin)], cursor=c)[0]
+
+
+def _mensaje_capacidad(tipo):
+    return (f"Vehículo no disponible en el periodo indicado. Los vehículos de tipo {tipo} "
+            f"libres en ese rango de fechas están comprometidos por reservas por categoría.")
+
+
+def _insertar_alquiler(c, fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado,
+                       tipo_reservado=None):
+    """
+    Valida e inserta un alquiler dentro de una transacción ya abierta
+    Programación Estructurada - Una sola consulta valida cliente, empleado, vehículo,
+    estado y solapamientos; el motivo del rechazo se deriva del resultado
+    Con tipo_reservado (asignación de una reserva por categoría) el vehículo debe ser de
+    ese tipo y no se controla la capacidad: la reserva ya la tenía comprometida
+    Returns:
+        int: id del alquiler creado
+    """
+    c.execute(SQL_VALIDAR_ALQUILER, {
+        "cliente": id_cliente, "empleado": id_empleado, "vehiculo": id_vehiculo,
+        "inicio": fecha_inicio, "fin": fecha_fin,
+    })
+    validacion = c.fetchone()
+    motivo = motivo_rechazo_alquiler(validacion)
+    if motivo:
+        raise ValueError(motivo)
+    
+    if tipo_reservado is not None:
+        if (validacion["tipo"] or "").upper() != tipo_reservado.upper():
+            raise ValueError(f"El vehículo no es de tipo {tipo_reservado}.")
+    elif not _capacidad_disponible(c, validacion["tipo"], fecha_inicio, fecha_fin):
+        raise ValueError(_mensaje_capacidad(validacion["tipo"]))
+    
+    # Calcular costo total
+    costo_total = calcular_costo(validacion["costo_diario"], fecha_inicio, fecha_fin)
     
-    # No cerrar la conexión aquí - el Singleton la maneja por thread
-    # conn.close()  # Removido para evitar cerrar conexión compartida
-    return cnt_alquileres == 0 and cnt_mantenimientos == 0
+    # Insertar alquiler (los triggers de solapamiento abortan si hay doble reserva)
+    c.execute(
+        """INSERT INTO alquiler (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo, id_empleado)
+           VALUES (?,?,?,?,?,?)""",
+        (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo, id_empleado)
+    )
+    id_alquiler = c.lastrowid
+    
+    # Actualizar estado del vehículo solo si el alquiler ya comenzó (fecha_inicio <= fecha_actual)
+    # Si es una fecha futura, el estado se actualizará automáticamente cuando llegue la fecha
+    if fecha_inicio <= date.today().isoformat():
+        # El alquiler ya comenzó o comienza hoy, marcar como "Alquilado"
+        c.execute("UPDATE vehiculo SET estado = 'Alquilado' WHERE id_vehiculo = ?", (id_vehiculo,))
+    return id_alquiler
 
 
 def registrar_alquiler(fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado=None):
@@ -79,186 +327,650 @@ def registrar_alquiler(fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empl
     Registra un nuevo alquiler en la base de datos
     Programación Estructurada - Función bien organizada
     Valida que el vehículo esté disponible y actualiza su estado
+    Concurrencia - Validación e INSERT corren en una transacción BEGIN IMMEDIATE y los
+    triggers de solapamiento (migración 5) rechazan una doble reserva aunque dos puestos
+    validen a la vez; si la base está ocupada se reintenta con espera exponencial
     """
-    conn = get_connection()
-    c = conn.cursor()
+    # Las fechas se guardan siempre en formato ISO (requisito de las consultas indexadas)
+    fecha_inicio = normalizar_fecha(fecha_inicio)
+    fecha_fin = normalizar_fecha(fecha_fin)
+    _preparar_capacidad(fecha_inicio, fecha_fin)
     
     try:
-        # Validar que el cliente exista
-        # Programación Estructurada - Validación de cliente
-        c.execute("SELECT id_cliente FROM cliente WHERE id_cliente = ?", (id_cliente,))
-        if not c.fetchone():
-            raise ValueError("Cliente no encontrado.")
-        
-        # Validar que el empleado exista (si se proporcionó)
-        # Programación Estructurada - Validación de empleado
-        if id_empleado is not None:
-            c.execute("SELECT id_empleado FROM empleado WHERE id_empleado = ?", (id_empleado,))
-            if not c.fetchone():
-                raise ValueError("Empleado no encontrado.")
-        
-        # Obtener información del vehículo (costo diario y estado)
-        c.execute("SELECT costo_diario, estado FROM vehiculo WHERE id_vehiculo = ?", (id_vehiculo,))
+        id_alquiler = DatabaseConnection().ejecutar_inmediata(
+            lambda c: _insertar_alquiler(c, fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado))
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    # Patrón Observer - Avisar al calendario (planificador de estados, índices)
+    CalendarioNotifier().alquiler_creado({
+        "id_alquiler": id_alquiler, "id_vehiculo": id_vehiculo,
+        "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin,
+    })
+    return True
+
+
+def extender_alquiler(id_alquiler, nueva_fecha_fin):
+    """
+    Extiende un alquiler hasta nueva_fecha_fin (posterior a la actual)
+    Solo se verifica el tramo agregado (día siguiente al fin actual .. nueva_fecha_fin)
+    Returns:
+        dict: datos del alquiler modificado (fechas nuevas y anteriores, costo_total)
+    """
+    return _cambiar_fecha_fin(id_alquiler, nueva_fecha_fin, extender=True)
+
+
+def acortar_alquiler(id_alquiler, nueva_fecha_fin):
+    """
+    Devolución anticipada: adelanta el fin del alquiler a nueva_fecha_fin
+    Acortar no puede generar solapamientos: no se consulta disponibilidad
+    Returns:
+        dict: datos del alquiler modificado (fechas nuevas y anteriores, costo_total)
+    """
+    return _cambiar_fecha_fin(id_alquiler, nueva_fecha_fin, extender=False)
+
+
+def _cambiar_fecha_fin(id_alquiler, nueva_fecha_fin, extender):
+    """
+    Cambia fecha_fin y costo_total en una transacción BEGIN IMMEDIATE (las multas no se tocan)
+    - costo_total se recalcula con calcular_costo a la tarifa diaria del alquiler original
+    - el estado se recalcula solo para el vehículo del alquiler
+    Patrón Observer - Notifica 'alquiler_modificado' con las fechas anteriores
+    """
+    nueva_fecha_fin = normalizar_fecha(nueva_fecha_fin)
+    if extender:
+        _preparar_capacidad(fecha_fin=nueva_fecha_fin)
+    
+    def cambiar(c):
+        c.execute("SELECT id_vehiculo, fecha_inicio, fecha_fin, costo_total FROM alquiler WHERE id_alquiler = ?",
+                  (id_alquiler,))
         row = c.fetchone()
-        
         if not row:
-            raise ValueError("Vehículo no encontrado.")
+            raise ValueError("Alquiler no encontrado.")
+        id_vehiculo, fecha_inicio, fecha_fin = row["id_vehiculo"], row["fecha_inicio"], row["fecha_fin"]
         
-        costo_diario = row["costo_diario"]
-        estado_vehiculo = row["estado"]
+        if extender:
+            if nueva_fecha_fin <= fecha_fin:
+                raise ValueError(f"La nueva fecha de fin debe ser posterior a la actual ({fecha_fin}).")
+            desde = (date.fromisoformat(fecha_fin) + timedelta(days=1)).isoformat()
+            c.execute(SQL_SOLAPAMIENTOS_TRAMO, {"vehiculo": id_vehiculo, "inicio": desde, "fin": nueva_fecha_fin})
+            tramo = c.fetchone()
+            if tramo["mantenimientos_solapados"]:
+                raise ValueError("Vehículo no disponible en el periodo indicado. "
+                                 "El vehículo está en mantenimiento en ese rango de fechas.")
+            if tramo["alquileres_solapados"]:
+                raise ValueError("Vehículo no disponible en el periodo indicado. "
+                                 "Ya existe un alquiler activo en ese rango de fechas.")
+            if not _capacidad_disponible(c, tramo["tipo"], desde, nueva_fecha_fin):
+                raise ValueError(_mensaje_capacidad(tramo["tipo"]))
+        else:
+            if nueva_fecha_fin >= fecha_fin:
+                raise ValueError(f"La nueva fecha de fin debe ser anterior a la actual ({fecha_fin}).")
+            if nueva_fecha_fin < fecha_inicio:
+                raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
         
-        # Validar que el vehículo esté en estado "Disponible" (comparación case-insensitive)
-        # Programación Estructurada - Validación de estado
-        if estado_vehiculo and estado_vehiculo.upper() != "DISPONIBLE":
-            raise ValueError(f"El vehículo no está disponible para alquilar. Estado actual: {estado_vehiculo}. "
-                           f"Solo se pueden alquilar vehículos en estado 'Disponible'.")
+        # Tarifa diaria pactada: costo_total / días originales
+        dias = (date.fromisoformat(fecha_fin) - date.fromisoformat(fecha_inicio)).days + 1
+        costo_total = calcular_costo((row["costo_total"] or 0) / dias, fecha_inicio, nueva_fecha_fin)
+        c.execute("UPDATE alquiler SET fecha_fin = ?, costo_total = ? WHERE id_alquiler = ?",
+                  (nueva_fecha_fin, costo_total, id_alquiler))
+        _aplicar_estados(c, date.today().isoformat(), [id_vehiculo])
+        return {"id_alquiler": id_alquiler, "id_vehiculo": id_vehiculo,
+                "fecha_inicio": fecha_inicio, "fecha_fin": nueva_fecha_fin,
+                "fecha_inicio_anterior": fecha_inicio, "fecha_fin_anterior": fecha_fin,
+                "costo_total": costo_total}
+    
+    try:
+        datos = DatabaseConnection().ejecutar_inmediata(cambiar)
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    CalendarioNotifier().alquiler_modificado(datos)
+    return datos
+
+
+def registrar_alquileres(solicitudes, modo=MODO_TODO_O_NADA):
+    """
+    Registra un lote de alquileres (reservas corporativas o de flota) en una transacción
+    Programación Estructurada - Las solicitudes se validan entre sí y contra la base con
+    una sola consulta, y las válidas se insertan con un único executemany
+    
+    Args:
+        solicitudes: lista de dicts con fecha_inicio, fecha_fin, id_cliente, id_vehiculo
+                     e id_empleado (opcional)
+        modo: MODO_TODO_O_NADA (si alguna falla no se registra ninguna) o
+              MODO_MEJOR_ESFUERZO (se registran las válidas)
+    
+    Returns:
+        list: un dict por solicitud, en el mismo orden, con indice, ok, id_alquiler y error
+    """
+    if modo not in (MODO_TODO_O_NADA, MODO_MEJOR_ESFUERZO):
+        raise ValueError(f"Modo de registro inválido: {modo}")
+    
+    resultados = [{"indice": i, "ok": False, "id_alquiler": None, "error": None}
+                  for i in range(len(solicitudes))]
+    pendientes = []     # (indice, fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado)
+    for i, solicitud in enumerate(solicitudes):
+        try:
+            fecha_inicio = normalizar_fecha(solicitud["fecha_inicio"])
+            fecha_fin = normalizar_fecha(solicitud["fecha_fin"])
+            if fecha_fin < fecha_inicio:
+                raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+        except (KeyError, ValueError) as e:
+            resultados[i]["error"] = str(e) if isinstance(e, ValueError) else f"Falta el campo {e}."
+            continue
+        pendientes.append((i, fecha_inicio, fecha_fin, solicitud.get("id_cliente"),
+                           solicitud.get("id_vehiculo"), solicitud.get("id_empleado")))
+    
+    # Solapamientos dentro del lote: gana la primera solicitud de cada vehículo
+    aceptados = {}
+    validos = []
+    for pendiente in pendientes:
+        i, fecha_inicio, fecha_fin, _, id_vehiculo, _ = pendiente
+        previos = aceptados.setdefault(id_vehiculo, [])
+        if any(fin >= fecha_inicio and inicio <= fecha_fin for inicio, fin in previos):
+            resultados[i]["error"] = ("Vehículo no disponible en el periodo indicado. "
+                                      "Se solapa con otra solicitud del mismo lote.")
+            continue
+        previos.append((fecha_inicio, fecha_fin))
+        validos.append(pendiente)
+    
+    def registrar(c):
+        c.execute(SQL_VALIDAR_ALQUILERES_LOTE, {"solicitudes": json.dumps([
+            {"cliente": id_cliente, "empleado": id_empleado, "vehiculo": id_vehiculo,
+             "inicio": fecha_inicio, "fin": fecha_fin}
+            for _, fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado in validos
+        ])})
+        aprobados = []
+        for (i, fecha_inicio, fecha_fin, id_cliente, id_vehiculo, id_empleado), validacion in zip(validos, c.fetchall()):
+            motivo = motivo_rechazo_alquiler(validacion)
+            if motivo:
+                resultados[i]["error"] = motivo
+                continue
+            costo_total = calcular_costo(validacion["costo_diario"], fecha_inicio, fecha_fin)
+            aprobados.append((validacion["tipo"], i, (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo, id_empleado)))
         
-        # Verificar disponibilidad temporal (no tiene alquileres solapados ni mantenimientos)
-        if not vehiculo_disponible(id_vehiculo, fecha_inicio, fecha_fin):
-            # Verificar si es por alquileres o mantenimientos
-            if vehiculo_en_mantenimiento(id_vehiculo, fecha_inicio, fecha_fin):
-                raise ValueError("Vehículo no disponible en el periodo indicado. "
-                               f"El vehículo está en mantenimiento en ese rango de fechas.")
+        # Capacidad por categoría: cada solicitud aceptada consume capacidad para las siguientes
+        filas = []
+        con_tipo = [a for a in aprobados if a[0]]
+        if con_tipo:
+            from services.capacidad_categorias import CapacidadCategorias
+            admitidos = CapacidadCategorias().admite([(tipo, fila[0], fila[1]) for tipo, _, fila in con_tipo],
+                                                     cursor=c)
+            rechazados = {i for (tipo, i, _), admitido in zip(con_tipo, admitidos) if not admitido}
+        else:
+            rechazados = set()
+        for tipo, i, fila in aprobados:
+            if i in rechazados:
+                resultados[i]["error"] = _mensaje_capacidad(tipo)
             else:
-                raise ValueError("Vehículo no disponible en el periodo indicado. "
-                               f"Ya existe un alquiler activo en ese rango de fechas.")
+                filas.append((i, fila))
         
-        # Calcular costo total
-        costo_total = calcular_costo(costo_diario, fecha_inicio, fecha_fin)
+        if not filas or (modo == MODO_TODO_O_NADA and any(r["error"] for r in resultados)):
+            return []
         
-        # Insertar alquiler
-        c.execute(
+        c.executemany(
             """INSERT INTO alquiler (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo, id_empleado)
                VALUES (?,?,?,?,?,?)""",
-            (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo, id_empleado)
+            [fila for _, fila in filas]
         )
-        
-        # Actualizar estado del vehículo solo si el alquiler ya comenzó (fecha_inicio <= fecha_actual)
-        # Si es una fecha futura, el estado se actualizará automáticamente cuando llegue la fecha
-        fecha_inicio_date = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
-        fecha_actual = date.today()
-        
-        if fecha_inicio_date <= fecha_actual:
-            # El alquiler ya comenzó o comienza hoy, marcar como "Alquilado"
-            c.execute("UPDATE vehiculo SET estado = 'Alquilado' WHERE id_vehiculo = ?", (id_vehiculo,))
-        # Si fecha_inicio_date > fecha_actual, el vehículo permanece "Disponible"
-        # y se actualizará automáticamente cuando llegue la fecha de inicio
-        
-        conn.commit()
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido - el Singleton maneja el ciclo de vida
-        return True
-    except Exception as e:
-        # En caso de error, hacer rollback
-        conn.rollback()
-        raise e
+        # Con el lock de escritura tomado, AUTOINCREMENT asigna ids consecutivos
+        ultimo = c.execute("SELECT last_insert_rowid()").fetchone()[0]
+        primero = ultimo - len(filas) + 1
+        _aplicar_estados(c, date.today().isoformat(), {fila[4] for _, fila in filas})
+        return [(i, primero + k, fila) for k, (i, fila) in enumerate(filas)]
+    
+    insertados = []
+    if validos:
+        _preparar_capacidad(fecha_fin=max(fecha_fin for _, _, fecha_fin, _, _, _ in validos))
+        try:
+            insertados = DatabaseConnection().ejecutar_inmediata(registrar)
+        except sqlite3.IntegrityError as e:
+            raise _error_de_negocio(e) from e
+    
+    if modo == MODO_TODO_O_NADA and any(r["error"] for r in resultados):
+        for resultado in resultados:
+            if not resultado["error"]:
+                resultado["error"] = "No registrado: otras solicitudes del lote tienen errores."
+        return resultados
+    
+    for i, id_alquiler, (fecha_inicio, fecha_fin, _, _, id_vehiculo, _) in insertados:
+        resultados[i].update(ok=True, id_alquiler=id_alquiler)
+        # Patrón Observer - Avisar al calendario cada alquiler creado
+        CalendarioNotifier().alquiler_creado({
+            "id_alquiler": id_alquiler, "id_vehiculo": id_vehiculo,
+            "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin,
+        })
+    return resultados
+
+
+def _aplicar_estados(c, fecha_ref, ids_vehiculo=None):
+    """
+    Recalcula y guarda el estado de los vehículos dentro de la transacción del cursor
+    ids_vehiculo=None recalcula toda la flota
+    Returns:
+        list: filas (SQL_ESTADOS_DERIVADOS) de los vehículos que cambiaron de estado
+    """
+    params = {"ref": fecha_ref}
+    filtro = ""
+    if ids_vehiculo is not None:
+        filtro = FILTRO_VEHICULOS
+        params["ids"] = json.dumps(sorted(set(ids_vehiculo)))
+    
+    # Solo se leen los vehículos cuyo estado guardado difiere del derivado
+    c.execute(SQL_ESTADOS_DESACTUALIZADOS.format(filtro=filtro), params)
+    filas = c.fetchall()
+    
+    if filas:
+        c.execute(SQL_ACTUALIZAR_ESTADOS.format(filtro=filtro), params)
+    return filas
 
 
-def actualizar_estados_vehiculos(fecha_referencia=None):
+def actualizar_estados_vehiculos(fecha_referencia=None, ids_vehiculo=None):
     """
     Actualiza el estado de los vehículos basándose en si tienen alquileres activos o mantenimientos activos.
     Si un vehículo tiene mantenimientos que ya terminaron, lo marca como Disponible (si no tiene alquileres).
     Si un vehículo tiene mantenimientos activos, lo marca como Mantenimiento.
+    Programación Estructurada - Se resuelve con dos sentencias (SELECT de cambios + UPDATE ... FROM)
+    en lugar de consultar cada vehículo por separado
     
     Args:
         fecha_referencia: Fecha a usar como referencia (por defecto, fecha actual).
                          Útil para testing. Formato: 'YYYY-MM-DD' o objeto date.
+        ids_vehiculo: Vehículos a recalcular (por defecto, toda la flota).
+                      Con una lista vacía no se accede a la base de datos.
     
     Returns:
-        dict: Información sobre los cambios realizados
+        dict: Vehículos que cambiaron de estado, agrupados por estado nuevo,
+              y la cantidad de vehículos que no cambiaron
     """
-    conn = get_connection()
-    c = conn.cursor()
+    cambios = {
+        'a_disponible': [],
+        'a_alquilado': [],
+        'a_mantenimiento': [],
+        'cantidad_sin_cambios': 0
+    }
+    if ids_vehiculo is not None and not ids_vehiculo:
+        return cambios
     
-    try:
-        # Determinar fecha de referencia
-        if fecha_referencia is None:
-            fecha_ref = date.today()
-        elif isinstance(fecha_referencia, str):
-            fecha_ref = datetime.strptime(fecha_referencia, "%Y-%m-%d").date()
+    # Determinar fecha de referencia
+    fecha_ref_str = normalizar_fecha(fecha_referencia if fecha_referencia is not None else date.today())
+    
+    def actualizar(c):
+        filas = _aplicar_estados(c, fecha_ref_str, ids_vehiculo)
+        
+        # Programación Funcional - Clasificar los cambios según el estado nuevo
+        destino = {
+            "Disponible": cambios['a_disponible'],
+            "Alquilado": cambios['a_alquilado'],
+            "Mantenimiento": cambios['a_mantenimiento'],
+        }
+        for fila in filas:
+            destino[fila["estado_nuevo"]].append({
+                'vehiculo': f"{fila['patente']} - {fila['marca']} {fila['modelo']} (ID: {fila['id_vehiculo']})",
+                'estado_anterior': fila["estado"],
+                'estado_nuevo': fila["estado_nuevo"],
+                'alquileres_activos': fila["alquileres_activos"],
+                'mantenimientos_activos': fila["mantenimientos_activos"]
+            })
+        
+        if ids_vehiculo is None:
+            c.execute("SELECT COUNT(*) FROM vehiculo")
         else:
-            fecha_ref = fecha_referencia
+            c.execute(f"SELECT COUNT(*) FROM vehiculo v {FILTRO_VEHICULOS}",
+                      {"ids": json.dumps(sorted(set(ids_vehiculo)))})
+        cambios['cantidad_sin_cambios'] = c.fetchone()[0] - len(filas)
+        return cambios
+    
+    # Lectura y escritura en la misma transacción de escritura; si el llamador ya tiene
+    # una abierta se trabaja dentro de ella y el commit o rollback queda a su cargo
+    return DatabaseConnection().ejecutar_inmediata(actualizar)
+
+
+def eliminar_alquiler(id_alquiler):
+    """
+    Elimina un alquiler (y sus multas, por CASCADE) y recalcula el estado del vehículo
+    Patrón Observer - Notifica 'alquiler_eliminado' al calendario
+    """
+    def eliminar(c):
+        c.execute("SELECT id_alquiler, id_vehiculo, fecha_inicio, fecha_fin FROM alquiler WHERE id_alquiler = ?",
+                  (id_alquiler,))
+        row = c.fetchone()
+        if not row:
+            raise ValueError("Alquiler no encontrado.")
+        datos = dict(row)
         
-        fecha_ref_str = fecha_ref.strftime("%Y-%m-%d")
+        c.execute("DELETE FROM alquiler WHERE id_alquiler = ?", (id_alquiler,))
+        _aplicar_estados(c, date.today().isoformat(), [datos["id_vehiculo"]])
+        return datos
+    
+    datos = DatabaseConnection().ejecutar_inmediata(eliminar)
+    CalendarioNotifier().alquiler_eliminado(datos)
+    return True
+
+
+def registrar_mantenimiento(id_vehiculo, tipo, fecha_inicio, fecha_fin, costo=0.0, observaciones=None):
+    """
+    Registra un mantenimiento y actualiza el estado del vehículo
+    Valida que no haya alquileres en el período del mantenimiento
+    Patrón Observer - Notifica 'mantenimiento_creado' al calendario
+    Returns:
+        int: id del mantenimiento creado
+    """
+    fecha_inicio = normalizar_fecha(fecha_inicio)
+    fecha_fin = normalizar_fecha(fecha_fin)
+    if fecha_fin < fecha_inicio:
+        raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+    
+    def registrar(c):
+        c.execute("SELECT id_vehiculo FROM vehiculo WHERE id_vehiculo = ?", (id_vehiculo,))
+        if not c.fetchone():
+            raise ValueError("Vehículo no encontrado.")
         
-        cambios = {
-            'a_disponible': [],
-            'a_alquilado': [],
-            'a_mantenimiento': [],
-            'sin_cambios': []
-        }
+        # Verificar que no haya alquileres en el período de mantenimiento
+        c.execute(SQL_ALQUILERES_SOLAPADOS, (id_vehiculo, fecha_inicio, fecha_fin))
+        alquileres_solapados = c.fetchone()[0]
+        if alquileres_solapados > 0:
+            raise ValueError(f"No se puede programar mantenimiento en un vehículo que tiene alquileres en ese período. "
+                             f"El vehículo tiene {alquileres_solapados} alquiler(es) que se solapan con el mantenimiento.")
         
-        # Obtener todos los vehículos
-        c.execute("SELECT id_vehiculo, patente, marca, modelo, estado FROM vehiculo")
-        vehiculos = c.fetchall()
+        c.execute(
+            "INSERT INTO mantenimiento (tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones) VALUES (?,?,?,?,?,?)",
+            (tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones or None)
+        )
+        id_mant = c.lastrowid
+        c.execute("UPDATE vehiculo SET fecha_ultimo_mantenimiento = ? WHERE id_vehiculo = ?",
+                  (fecha_fin, id_vehiculo))
+        # Un mantenimiento que todavía no terminó deja el vehículo en 'Mantenimiento'
+        _aplicar_estados(c, date.today().isoformat(), [id_vehiculo])
+        return id_mant
+    
+    # BEGIN IMMEDIATE: el trigger de la migración 5 cubre la carrera con un alquiler simultáneo
+    try:
+        id_mant = DatabaseConnection().ejecutar_inmediata(registrar)
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    CalendarioNotifier().mantenimiento_creado({
+        "id_mant": id_mant, "id_vehiculo": id_vehiculo,
+        "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin,
+    })
+    return id_mant
+
+
+def registrar_mantenimientos(mantenimientos):
+    """
+    Registra varios mantenimientos en una sola transacción (plan de taller)
+    Si alguno choca con un alquiler no se registra ninguno
+    Patrón Observer - Notifica 'mantenimiento_creado' por cada uno
+    Args:
+        mantenimientos: lista de dicts con id_vehiculo, tipo, fecha_inicio, fecha_fin,
+                        costo (opcional) y observaciones (opcional)
+    Returns:
+        list: ids de los mantenimientos creados, en el mismo orden
+    """
+    filas = []
+    for m in mantenimientos:
+        fecha_inicio = normalizar_fecha(m["fecha_inicio"])
+        fecha_fin = normalizar_fecha(m["fecha_fin"])
+        if fecha_fin < fecha_inicio:
+            raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+        filas.append((m.get("tipo"), fecha_inicio, fecha_fin, m.get("costo", 0.0), m["id_vehiculo"],
+                      m.get("observaciones") or None))
+    if not filas:
+        return []
+    
+    def registrar(c):
+        for _, fecha_inicio, fecha_fin, _, id_vehiculo, _ in filas:
+            c.execute(SQL_ALQUILERES_SOLAPADOS, (id_vehiculo, fecha_inicio, fecha_fin))
+            if c.fetchone()[0] > 0:
+                raise ValueError(f"El vehículo {id_vehiculo} tiene alquileres entre {fecha_inicio} y {fecha_fin}.")
+        c.executemany(
+            "INSERT INTO mantenimiento (tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones) VALUES (?,?,?,?,?,?)",
+            filas
+        )
+        # Con el lock de escritura tomado, AUTOINCREMENT asigna ids consecutivos
+        ultimo = c.execute("SELECT last_insert_rowid()").fetchone()[0]
+        c.executemany("UPDATE vehiculo SET fecha_ultimo_mantenimiento = ? WHERE id_vehiculo = ?",
+                      [(fila[2], fila[4]) for fila in filas])
+        _aplicar_estados(c, date.today().isoformat(), {fila[4] for fila in filas})
+        return list(range(ultimo - len(filas) + 1, ultimo + 1))
+    
+    try:
+        ids_mant = DatabaseConnection().ejecutar_inmediata(registrar)
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    notifier = CalendarioNotifier()
+    for id_mant, (_, fecha_inicio, fecha_fin, _, id_vehiculo, _) in zip(ids_mant, filas):
+        notifier.mantenimiento_creado({
+            "id_mant": id_mant, "id_vehiculo": id_vehiculo,
+            "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin,
+        })
+    return ids_mant
+
+
+def eliminar_mantenimiento(id_mant):
+    """
+    Elimina un mantenimiento y recalcula el estado del vehículo
+    Patrón Observer - Notifica 'mantenimiento_eliminado' al calendario
+    """
+    def eliminar(c):
+        c.execute("SELECT id_mant, id_vehiculo, fecha_inicio, fecha_fin FROM mantenimiento WHERE id_mant = ?",
+                  (id_mant,))
+        row = c.fetchone()
+        if not row:
+            raise ValueError("Mantenimiento no encontrado.")
+        datos = dict(row)
         
-        for vehiculo in vehiculos:
-            id_vehiculo = vehiculo["id_vehiculo"]
-            patente = vehiculo["patente"]
-            marca = vehiculo["marca"]
-            modelo = vehiculo["modelo"]
-            estado_actual = vehiculo["estado"]
-            
-            # Verificar si tiene alquileres activos
-            # Un alquiler está activo si: fecha_inicio <= fecha_referencia <= fecha_fin
-            # Es decir, el alquiler ya comenzó y aún no terminó
-            c.execute("""
-                SELECT COUNT(*) FROM alquiler 
-                WHERE id_vehiculo = ? 
-                AND date(fecha_inicio) <= date(?)
-                AND date(fecha_fin) >= date(?)
-            """, (id_vehiculo, fecha_ref_str, fecha_ref_str))
-            
-            alquileres_activos = c.fetchone()[0]
-            
-            # Verificar si está en mantenimiento activo (fecha_fin >= fecha_referencia)
-            c.execute("""
-                SELECT COUNT(*) FROM mantenimiento 
-                WHERE id_vehiculo = ?
-                AND date(fecha_fin) >= date(?)
-            """, (id_vehiculo, fecha_ref_str))
-            mantenimientos_activos = c.fetchone()[0]
-            
-            # Determinar el estado que debería tener
-            if alquileres_activos > 0:
-                estado_deberia = "Alquilado"
-            elif mantenimientos_activos > 0:
-                estado_deberia = "Mantenimiento"
-            else:
-                estado_deberia = "Disponible"
-            
-            # Actualizar si es necesario
-            if estado_actual != estado_deberia:
-                c.execute("UPDATE vehiculo SET estado = ? WHERE id_vehiculo = ?", 
-                         (estado_deberia, id_vehiculo))
-                
-                info_vehiculo = f"{patente} - {marca} {modelo} (ID: {id_vehiculo})"
-                cambio = {
-                    'vehiculo': info_vehiculo,
-                    'estado_anterior': estado_actual,
-                    'estado_nuevo': estado_deberia,
-                    'alquileres_activos': alquileres_activos,
-                    'mantenimientos_activos': mantenimientos_activos
-                }
-                
-                if estado_deberia == "Disponible":
-                    cambios['a_disponible'].append(cambio)
-                elif estado_deberia == "Alquilado":
-                    cambios['a_alquilado'].append(cambio)
-                elif estado_deberia == "Mantenimiento":
-                    cambios['a_mantenimiento'].append(cambio)
-            else:
-                info_vehiculo = f"{patente} - {marca} {modelo} (ID: {id_vehiculo})"
-                cambios['sin_cambios'].append({
-                    'vehiculo': info_vehiculo,
-                    'estado': estado_actual,
-                    'alquileres_activos': alquileres_activos,
-                    'mantenimientos_activos': mantenimientos_activos
-                })
+        c.execute("DELETE FROM mantenimiento WHERE id_mant = ?", (id_mant,))
+        _aplicar_estados(c, date.today().isoformat(), [datos["id_vehiculo"]])
+        return datos
+    
+    datos = DatabaseConnection().ejecutar_inmediata(eliminar)
+    CalendarioNotifier().mantenimiento_eliminado(datos)
+    return True
+
+
+def registrar_reserva_categoria(tipo, fecha_inicio, fecha_fin, id_cliente, id_empleado=None):
+    """
+    Reserva un vehículo de un tipo (Sedan, PickUp, ...) sin elegir la unidad concreta
+    El vehículo se asigna al retirarlo (asignar_reserva_categoria)
+    Se acepta solo si el modelo de capacidad por categoría tiene lugar en todos los días
+    Patrón Observer - Notifica 'reserva_creada' al calendario
+    Returns:
+        int: id de la reserva creada
+    """
+    fecha_inicio = normalizar_fecha(fecha_inicio)
+    fecha_fin = normalizar_fecha(fecha_fin)
+    if fecha_fin < fecha_inicio:
+        raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+    _preparar_capacidad(fecha_inicio, fecha_fin)
+    
+    def registrar(c):
+        # Se guarda el tipo tal como figura en la flota (la búsqueda no distingue mayúsculas)
+        c.execute("SELECT tipo FROM vehiculo WHERE tipo = ? COLLATE NOCASE LIMIT 1", (tipo,))
+        fila = c.fetchone()
+        if not fila:
+            raise ValueError(f"No hay vehículos de tipo {tipo}.")
+        tipo_flota = fila["tipo"]
+        c.execute("SELECT 1 FROM cliente WHERE id_cliente = ?", (id_cliente,))
+        if not c.fetchone():
+            raise ValueError("Cliente no encontrado.")
+        if id_empleado is not None:
+            c.execute("SELECT 1 FROM empleado WHERE id_empleado = ?", (id_empleado,))
+            if not c.fetchone():
+                raise ValueError("Empleado no encontrado.")
         
-        conn.commit()
-        return cambios
+        # Con BEGIN IMMEDIATE tomado nadie más puede consumir capacidad hasta el COMMIT
+        if not _capacidad_disponible(c, tipo_flota, fecha_inicio, fecha_fin):
+            raise ValueError(f"No quedan vehículos de tipo {tipo_flota} disponibles en el periodo indicado.")
+        
+        c.execute(
+            """INSERT INTO reserva_categoria (tipo, fecha_inicio, fecha_fin, id_cliente, id_empleado)
+               VALUES (?,?,?,?,?)""",
+            (tipo_flota, fecha_inicio, fecha_fin, id_cliente, id_empleado)
+        )
+        return c.lastrowid, tipo_flota
+    
+    id_reserva, tipo_flota = DatabaseConnection().ejecutar_inmediata(registrar)
+    
+    CalendarioNotifier().reserva_creada({
+        "id_reserva": id_reserva, "tipo": tipo_flota,
+        "fecha_inicio": fecha_inicio, "fecha_fin": fecha_fin,
+    })
+    return id_reserva
+
+
+def cancelar_reserva_categoria(id_reserva):
+    """
+    Cancela una reserva por categoría pendiente y libera su capacidad
+    Patrón Observer - Notifica 'reserva_cancelada' al calendario
+    """
+    def cancelar(c):
+        c.execute("SELECT id_reserva, tipo, fecha_inicio, fecha_fin, estado FROM reserva_categoria WHERE id_reserva = ?",
+                  (id_reserva,))
+        row = c.fetchone()
+        if not row:
+            raise ValueError("Reserva no encontrada.")
+        if row["estado"] != "Pendiente":
+            raise ValueError(f"Solo se pueden cancelar reservas pendientes. Estado actual: {row['estado']}.")
+        c.execute("UPDATE reserva_categoria SET estado = 'Cancelada' WHERE id_reserva = ?", (id_reserva,))
+        return {k: row[k] for k in ("id_reserva", "tipo", "fecha_inicio", "fecha_fin")}
+    
+    datos = DatabaseConnection().ejecutar_inmediata(cancelar)
+    CalendarioNotifier().reserva_cancelada(datos)
+    return True
+
+
+def asignar_reserva_categoria(id_reserva, id_vehiculo=None, id_empleado=None):
+    """
+    Convierte una reserva por categoría en un alquiler de un vehículo concreto (al retirarlo)
+    Si no se indica id_vehiculo lo elige AsignadorVehiculos (mejor ajuste de ventanas libres)
+    El alquiler se valida igual que en registrar_alquiler y se registra en la misma
+    transacción que marca la reserva como 'Asignada'
+    Patrón Observer - Notifica 'alquiler_creado' y 'reserva_asignada' al calendario
+    Returns:
+        int: id del alquiler creado
+    """
+    def asignar(c):
+        c.execute("SELECT * FROM reserva_categoria WHERE id_reserva = ?", (id_reserva,))
+        reserva = c.fetchone()
+        if not reserva:
+            raise ValueError("Reserva no encontrada.")
+        if reserva["estado"] != "Pendiente":
+            raise ValueError(f"La reserva no está pendiente. Estado actual: {reserva['estado']}.")
+        
+        vehiculo = id_vehiculo
+        if vehiculo is None:
+            from services.asignador_vehiculos import AsignadorVehiculos
+            resultado = AsignadorVehiculos().asignar([{
+                "tipo": reserva["tipo"], "fecha_inicio": reserva["fecha_inicio"],
+                "fecha_fin": reserva["fecha_fin"], "cantidad": 1,
+            }])
+            if not resultado["asignaciones"]:
+                raise ValueError(resultado["sin_asignar"][0]["motivo"])
+            vehiculo = resultado["asignaciones"][0]["id_vehiculo"]
         
-    except Exception as e:
-        conn.rollback()
-        raise e
+        empleado = id_empleado if id_empleado is not None else reserva["id_empleado"]
+        id_alquiler = _insertar_alquiler(c, reserva["fecha_inicio"], reserva["fecha_fin"],
+                                         reserva["id_cliente"], vehiculo, empleado,
+                                         tipo_reservado=reserva["tipo"])
+        c.execute("UPDATE reserva_categoria SET estado = 'Asignada', id_alquiler = ? WHERE id_reserva = ?",
+                  (id_alquiler, id_reserva))
+        return id_alquiler, vehiculo, dict(reserva)
+    
+    try:
+        id_alquiler, vehiculo, reserva = DatabaseConnection().ejecutar_inmediata(asignar)
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    notifier = CalendarioNotifier()
+    notifier.alquiler_creado({
+        "id_alquiler": id_alquiler, "id_vehiculo": vehiculo,
+        "fecha_inicio": reserva["fecha_inicio"], "fecha_fin": reserva["fecha_fin"],
+    })
+    notifier.reserva_asignada({
+        "id_reserva": id_reserva, "tipo": reserva["tipo"],
+        "fecha_inicio": reserva["fecha_inicio"], "fecha_fin": reserva["fecha_fin"],
+    })
+    return id_alquiler
+
+
+def agregar_a_lista_espera(tipo, fecha_inicio, fecha_fin, id_cliente, id_empleado=None):
+    """
+    Anota una solicitud no atendida (tipo de vehículo y período) en la lista de espera
+    Cuando se libera un vehículo de ese tipo, services.lista_espera propone el alquiler
+    Returns:
+        int: id de la solicitud en espera
+    """
+    fecha_inicio = normalizar_fecha(fecha_inicio)
+    fecha_fin = normalizar_fecha(fecha_fin)
+    if fecha_fin < fecha_inicio:
+        raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+    
+    def agregar(c):
+        # Se guarda el tipo tal como figura en la flota: el emparejamiento compara por índice
+        c.execute("SELECT tipo FROM vehiculo WHERE tipo = ? COLLATE NOCASE LIMIT 1", (tipo,))
+        fila = c.fetchone()
+        if not fila:
+            raise ValueError(f"No hay vehículos de tipo {tipo}.")
+        c.execute("SELECT 1 FROM cliente WHERE id_cliente = ?", (id_cliente,))
+        if not c.fetchone():
+            raise ValueError("Cliente no encontrado.")
+        c.execute(
+            """INSERT INTO lista_espera (tipo, fecha_inicio, fecha_fin, id_cliente, id_empleado)
+               VALUES (?,?,?,?,?)""",
+            (fila["tipo"], fecha_inicio, fecha_fin, id_cliente, id_empleado)
+        )
+        return c.lastrowid
+    
+    return DatabaseConnection().ejecutar_inmediata(agregar)
+
+
+def cancelar_espera(id_espera):
+    """Quita de la lista de espera una solicitud pendiente"""
+    def cancelar(c):
+        c.execute("UPDATE lista_espera SET estado = 'Cancelada' WHERE id_espera = ? AND estado = 'Pendiente'",
+                  (id_espera,))
+        if c.rowcount == 0:
+            raise ValueError("Solicitud en espera no encontrada o ya atendida.")
+    
+    DatabaseConnection().ejecutar_inmediata(cancelar)
+    return True
+
+
+def atender_espera(id_espera, id_vehiculo, id_empleado=None):
+    """
+    Registra el alquiler de una solicitud en espera con un vehículo concreto y la marca
+    como 'Atendida' en la misma transacción (validación igual a registrar_alquiler)
+    Patrón Observer - Notifica 'alquiler_creado' al calendario
+    Returns:
+        int: id del alquiler creado
+    """
+    def atender(c):
+        c.execute("SELECT * FROM lista_espera WHERE id_espera = ?", (id_espera,))
+        espera = c.fetchone()
+        if not espera:
+            raise ValueError("Solicitud en espera no encontrada.")
+        if espera["estado"] != "Pendiente":
+            raise ValueError(f"La solicitud no está pendiente. Estado actual: {espera['estado']}.")
+        empleado = id_empleado if id_empleado is not None else espera["id_empleado"]
+        id_alquiler = _insertar_alquiler(c, espera["fecha_inicio"], espera["fecha_fin"],
+                                         espera["id_cliente"], id_vehiculo, empleado)
+        c.execute("UPDATE lista_espera SET estado = 'Atendida', id_alquiler = ? WHERE id_espera = ?",
+                  (id_alquiler, id_espera))
+        return id_alquiler, dict(espera)
+    
+    # Las fechas se leen en la transacción: se prepara el horizonte por defecto
+    _preparar_capacidad()
+    try:
+        id_alquiler, espera = DatabaseConnection().ejecutar_inmediata(atender)
+    except sqlite3.IntegrityError as e:
+        raise _error_de_negocio(e) from e
+    
+    CalendarioNotifier().alquiler_creado({
+        "id_alquiler": id_alquiler, "id_vehiculo": id_vehiculo,
+        "fecha_inicio": espera["fecha_inicio"], "fecha_fin": espera["fecha_fin"],
+    })
+    return id_alquiler
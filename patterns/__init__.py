@@ -6,11 +6,11 @@ Módulo de patrones de diseño
 Patrones de Diseño - Implementaciones de patrones creacionales y de comportamiento
 """
 
-from .observer import Observer, Subject, AlquilerNotifier, LogObserver, EmailObserver
+from .observer import Observer, Subject, AlquilerNotifier, CalendarioNotifier, LogObserver, EmailObserver
 from .factory import EntityFactory, DAOFactory
 
 __all__ = [
-    'Observer', 'Subject', 'AlquilerNotifier', 'LogObserver', 'EmailObserver',
+    'Observer', 'Subject', 'AlquilerNotifier', 'CalendarioNotifier', 'LogObserver', 'EmailObserver',
     'EntityFactory', 'DAOFactory'
 ]
 
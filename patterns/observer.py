@@ -6,6 +6,7 @@ Patrón Observer - Sistema de notificaciones
 Programación Orientada a Objetos - Implementación del patrón Observer
 """
 
+import threading
 from abc import ABC, abstractmethod
 from typing import List
 
@@ -82,6 +83,68 @@ class AlquilerNotifier(Subject):
         self.notify("alquiler_actualizado", alquiler)
 
 
+class CalendarioNotifier(Subject):
+    """
+    Patrón Observer - Sujeto que avisa cambios en el calendario de la flota
+    (alquileres y mantenimientos que se crean, modifican o eliminan)
+    Patrón Singleton - Una única instancia compartida entre models y los servicios
+    Los datos de cada evento son un dict con id_vehiculo, fecha_inicio, fecha_fin
+    y el id del registro (id_alquiler o id_mant); las reservas por categoría llevan
+    tipo en lugar de id_vehiculo
+    """
+    
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    instancia = super(CalendarioNotifier, cls).__new__(cls)
+                    Subject.__init__(instancia)
+                    cls._instance = instancia
+        return cls._instance
+    
+    def __init__(self):
+        # La lista de observadores se inicializa una sola vez en __new__
+        pass
+    
+    def alquiler_creado(self, datos):
+        """Patrón Observer - Notifica un alquiler nuevo"""
+        self.notify("alquiler_creado", datos)
+    
+    def alquiler_modificado(self, datos):
+        """Patrón Observer - Notifica un cambio de fechas de un alquiler"""
+        self.notify("alquiler_modificado", datos)
+    
+    def alquiler_eliminado(self, datos):
+        """Patrón Observer - Notifica la eliminación de un alquiler"""
+        self.notify("alquiler_eliminado", datos)
+    
+    def mantenimiento_creado(self, datos):
+        """Patrón Observer - Notifica un mantenimiento nuevo"""
+        self.notify("mantenimiento_creado", datos)
+    
+    def mantenimiento_eliminado(self, datos):
+        """Patrón Observer - Notifica la eliminación de un mantenimiento"""
+        self.notify("mantenimiento_eliminado", datos)
+    
+    def reserva_creada(self, datos):
+        """Patrón Observer - Notifica una reserva por categoría (tipo, fechas, id_reserva)"""
+        self.notify("reserva_creada", datos)
+    
+    def reserva_cancelada(self, datos):
+        """Patrón Observer - Notifica la cancelación de una reserva por categoría"""
+        self.notify("reserva_cancelada", datos)
+    
+    def reserva_asignada(self, datos):
+        """Patrón Observer - Notifica que una reserva por categoría pasó a un alquiler concreto"""
+        self.notify("reserva_asignada", datos)
+
+
 class LogObserver(Observer):
     """
     Patrón Observer - Observador que registra eventos en log
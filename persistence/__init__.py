@@ -7,6 +7,8 @@ Persistencia - Capa de acceso a datos
 """
 
 from .database_connection import DatabaseConnection
+from .connection_pool import ConnectionPool, PoolAgotadoError
+from .write_queue import WriteQueue
 
-__all__ = ['DatabaseConnection']
+__all__ = ['DatabaseConnection', 'ConnectionPool', 'PoolAgotadoError', 'WriteQueue']
 
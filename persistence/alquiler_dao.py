@@ -9,7 +9,7 @@ Herencia y Polimorfismo - Hereda de DAOBase
 
 from persistence.dao_base import DAOBase
 from entities.alquiler import Alquiler
-from datetime import date
+from validations import normalizar_fecha
 
 
 class AlquilerDAO(DAOBase):
@@ -18,23 +18,29 @@ class AlquilerDAO(DAOBase):
     Herencia y Polimorfismo - Implementa métodos abstractos de DAOBase
     """
     
+    _ATRIBUTO_ID = "_id_alquiler"
+    
     def create(self, alquiler):
         """
         Persistencia - Crea un nuevo alquiler en la base de datos
         Programación Estructurada - Función bien definida
         """
-        fecha_inicio_str = alquiler.fecha_inicio.strftime("%Y-%m-%d") if isinstance(alquiler.fecha_inicio, date) else alquiler.fecha_inicio
-        fecha_fin_str = alquiler.fecha_fin.strftime("%Y-%m-%d") if isinstance(alquiler.fecha_fin, date) else alquiler.fecha_fin
+        query, params = self._sentencia_create(alquiler)
+        alquiler._id_alquiler = self._db.execute_write(query, params)
+        return alquiler
+    
+    def _sentencia_create(self, alquiler):
+        """
+        Persistencia - INSERT del alquiler (usado por create y create_many)
+        """
+        fecha_inicio_str = normalizar_fecha(alquiler.fecha_inicio)
+        fecha_fin_str = normalizar_fecha(alquiler.fecha_fin)
         
         query = """INSERT INTO alquiler (fecha_inicio, fecha_fin, costo_total, 
                    id_cliente, id_vehiculo, id_empleado) VALUES (?,?,?,?,?,?)"""
         params = (fecha_inicio_str, fecha_fin_str, alquiler.costo_total,
                  alquiler.id_cliente, alquiler.id_vehiculo, alquiler.id_empleado)
-        
-        cursor = self._db.execute_query(query, params)
-        self._db.get_connection().commit()
-        alquiler._id_alquiler = cursor.lastrowid
-        return alquiler
+        return query, params
     
     def read(self, id_alquiler):
         """
@@ -54,8 +60,8 @@ class AlquilerDAO(DAOBase):
         Persistencia - Actualiza un alquiler existente
         Programación Estructurada - Función bien definida
         """
-        fecha_inicio_str = alquiler.fecha_inicio.strftime("%Y-%m-%d") if isinstance(alquiler.fecha_inicio, date) else alquiler.fecha_inicio
-        fecha_fin_str = alquiler.fecha_fin.strftime("%Y-%m-%d") if isinstance(alquiler.fecha_fin, date) else alquiler.fecha_fin
+        fecha_inicio_str = normalizar_fecha(alquiler.fecha_inicio)
+        fecha_fin_str = normalizar_fecha(alquiler.fecha_fin)
         
         query = """UPDATE alquiler SET fecha_inicio=?, fecha_fin=?, costo_total=?, 
                    id_cliente=?, id_vehiculo=?, id_empleado=? WHERE id_alquiler=?"""
@@ -63,8 +69,7 @@ class AlquilerDAO(DAOBase):
                  alquiler.id_cliente, alquiler.id_vehiculo, alquiler.id_empleado,
                  alquiler.id_alquiler)
         
-        self._db.execute_query(query, params)
-        self._db.get_connection().commit()
+        self._db.execute_write(query, params)
         return alquiler
     
     def delete(self, id_alquiler):
@@ -73,8 +78,7 @@ class AlquilerDAO(DAOBase):
         Programación Estructurada - Función bien definida
         """
         query = "DELETE FROM alquiler WHERE id_alquiler = ?"
-        self._db.execute_query(query, (id_alquiler,))
-        self._db.get_connection().commit()
+        self._db.execute_write(query, (id_alquiler,))
         return True
     
     def list_all(self):
@@ -94,15 +98,16 @@ class AlquilerDAO(DAOBase):
         Persistencia - Verifica si un vehículo está disponible en un período
         Programación Funcional - Uso de filter para verificar solapamientos
         """
-        fecha_inicio_str = fecha_inicio.strftime("%Y-%m-%d") if isinstance(fecha_inicio, date) else fecha_inicio
-        fecha_fin_str = fecha_fin.strftime("%Y-%m-%d") if isinstance(fecha_fin, date) else fecha_fin
+        fecha_inicio_str = normalizar_fecha(fecha_inicio)
+        fecha_fin_str = normalizar_fecha(fecha_fin)
         
+        # Fechas ISO comparadas sin date() para usar idx_alquiler_vehiculo_fechas
         query = """SELECT * FROM alquiler 
                    WHERE id_vehiculo = ? 
-                   AND NOT (date(fecha_fin) < date(?) OR date(fecha_inicio) > date(?))"""
+                   AND fecha_fin >= ?
+                   AND fecha_inicio <= ?"""
         cursor = self._db.execute_query(query, (id_vehiculo, fecha_inicio_str, fecha_fin_str))
         rows = cursor.fetchall()
         
         # Programación Funcional - Verificar si hay solapamientos
         return len(rows) == 0
-
@@ -17,20 +17,26 @@ class ClienteDAO(DAOBase):
     Herencia y Polimorfismo - Implementa métodos abstractos de DAOBase
     """
     
+    _ATRIBUTO_ID = "_id_cliente"
+    
     def create(self, cliente):
         """
         Persistencia - Crea un nuevo cliente en la base de datos
         Programación Estructurada - Función bien definida
         """
+        query, params = self._sentencia_create(cliente)
+        cliente._id_cliente = self._db.execute_write(query, params)
+        return cliente
+    
+    def _sentencia_create(self, cliente):
+        """
+        Persistencia - INSERT del cliente (usado por create y create_many)
+        """
         query = """INSERT INTO cliente (nombre, apellido, dni, telefono, direccion, email) 
                    VALUES (?,?,?,?,?,?)"""
         params = (cliente.nombre, cliente.apellido, cliente.dni, 
                  cliente.telefono, cliente.direccion, cliente.email)
-        
-        cursor = self._db.execute_query(query, params)
-        self._db.get_connection().commit()
-        cliente._id_cliente = cursor.lastrowid
-        return cliente
+        return query, params
     
     def read(self, id_cliente):
         """
@@ -55,8 +61,7 @@ class ClienteDAO(DAOBase):
         params = (cliente.nombre, cliente.apellido, cliente.dni,
                  cliente.telefono, cliente.direccion, cliente.email, cliente.id_cliente)
         
-        self._db.execute_query(query, params)
-        self._db.get_connection().commit()
+        self._db.execute_write(query, params)
         return cliente
     
     def delete(self, id_cliente):
@@ -65,8 +70,7 @@ class ClienteDAO(DAOBase):
         Programación Estructurada - Función bien definida
         """
         query = "DELETE FROM cliente WHERE id_cliente = ?"
-        self._db.execute_query(query, (id_cliente,))
-        self._db.get_connection().commit()
+        self._db.execute_write(query, (id_cliente,))
         return True
     
     def list_all(self):
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Pool de conexiones - Un escritor por thread y N lectores de solo lectura
+Programación Orientada a Objetos - Encapsula el ciclo de vida de las conexiones
+Thread-Safe - Préstamo (checkout) y devolución (checkin) protegidos con locks
+"""
+
+import contextlib
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Archivos que se saltean al buscar quién pidió la conexión (paquete persistence y contextlib)
+_ARCHIVOS_INTERNOS = (os.path.dirname(os.path.abspath(__file__)), contextlib.__file__)
+
+
+class PoolAgotadoError(RuntimeError):
+    """No se pudo obtener una conexión del pool dentro del tiempo de espera"""
+
+
+class _Prestamo:
+    """
+    Registro de una conexión prestada (para detección de fugas)
+    Se crea en cada préstamo: por defecto solo guarda archivo, línea y función de quien
+    pidió la conexión; el stack completo se arma únicamente con capturar_stack=True
+    """
+
+    __slots__ = ("conn", "solo_lectura", "thread", "desde", "_origen")
+
+    def __init__(self, conn, solo_lectura, capturar_stack=False):
+        self.conn = conn
+        self.solo_lectura = solo_lectura
+        self.thread = threading.current_thread()
+        self.desde = time.monotonic()
+        if capturar_stack:
+            self._origen = "".join(traceback.format_stack(limit=6)[:-2])
+        else:
+            marco = sys._getframe(1)
+            while marco.f_back is not None and marco.f_code.co_filename.startswith(_ARCHIVOS_INTERNOS):
+                marco = marco.f_back
+            self._origen = (marco.f_code.co_filename, marco.f_lineno, marco.f_code.co_name)
+
+    @property
+    def origen(self):
+        """Texto del origen del préstamo (se formatea solo al reportar)"""
+        if isinstance(self._origen, str):
+            return self._origen
+        archivo, linea, funcion = self._origen
+        return f'  File "{archivo}", line {linea}, in {funcion}\n'
+
+    def describir(self):
+        return {
+            "solo_lectura": self.solo_lectura,
+            "thread": self.thread.name,
+            "thread_activo": self.thread.is_alive(),
+            "segundos": round(time.monotonic() - self.desde, 3),
+            "origen": self.origen,
+        }
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones SQLite
+    - Un escritor por thread: el commit o rollback de un thread nunca afecta el trabajo
+      a medio hacer de otro; entre escritores, SQLite serializa con su lock de escritura
+      (BEGIN IMMEDIATE + busy_timeout)
+    - N lectores: conexiones mode=ro reutilizables, con tamaño máximo y desalojo por inactividad
+    - Detección de fugas: préstamos que superan un umbral o cuyo thread terminó
+    """
+
+    def __init__(self, abrir_conexion, max_lectores=4, tiempo_inactivo=300,
+                 umbral_fuga=60, tiempo_espera=10, capturar_stack=False):
+        """
+        abrir_conexion: función (solo_lectura) -> conexión nueva
+        capturar_stack: guarda el stack completo de cada préstamo (depuración de fugas)
+        """
+        self._capturar_stack = capturar_stack
+        self._abrir_conexion = abrir_conexion
+        self._max_lectores = max(1, int(max_lectores))
+        self._tiempo_inactivo = tiempo_inactivo
+        self._umbral_fuga = umbral_fuga
+        self._tiempo_espera = tiempo_espera
+
+        self._condicion = threading.Condition()
+        self._lectores_libres = []      # lista de (conexión, instante de devolución)
+        self._lectores_abiertos = 0
+        self._prestamos = {}            # id(conexión) -> _Prestamo
+
+        self._local = threading.local()             # escritor y profundidad de checkout del thread
+        self._escritores = {}                       # thread -> escritor abierto (para close_all y stats)
+
+    # ------------------------------------------------------------------
+    # Escritor
+    # ------------------------------------------------------------------
+    def writer_connection(self):
+        """
+        Devuelve la conexión de escritura del thread actual (la abre o reabre si hace falta)
+        Los escritores de threads que ya terminaron se cierran al abrir uno nuevo
+        """
+        conn = getattr(self._local, "escritor", None)
+        if conn is None or not self._conexion_viva(conn):
+            conn = self._abrir_conexion(False)
+            self._local.escritor = conn
+            with self._condicion:
+                self._cerrar_escritores_huerfanos()
+                self._escritores[threading.current_thread()] = conn
+        return conn
+
+    def writer_in_transaction(self):
+        """Indica si el escritor del thread actual tiene una transacción abierta (sin abrirlo)"""
+        conn = getattr(self._local, "escritor", None)
+        return conn is not None and self._conexion_viva(conn) and conn.in_transaction
+
+    # ------------------------------------------------------------------
+    # Préstamo y devolución
+    # ------------------------------------------------------------------
+    def checkout(self, solo_lectura=True, timeout=None):
+        """
+        Presta una conexión del pool
+        solo_lectura=False devuelve el escritor del thread actual (préstamo reentrante)
+        """
+        timeout = self._tiempo_espera if timeout is None else timeout
+        if not solo_lectura:
+            conn = self.writer_connection()
+            profundidad = getattr(self._local, "profundidad", 0) + 1
+            self._local.profundidad = profundidad
+            if profundidad == 1:
+                with self._condicion:
+                    self._prestamos[id(conn)] = _Prestamo(conn, False, self._capturar_stack)
+            return conn
+
+        limite = time.monotonic() + timeout
+        with self._condicion:
+            while True:
+                self._desalojar_inactivos()
+                while self._lectores_libres:
+                    conn, _ = self._lectores_libres.pop()  # LIFO: la más reciente tiene caché caliente
+                    if self._conexion_viva(conn):
+                        self._prestamos[id(conn)] = _Prestamo(conn, True, self._capturar_stack)
+                        return conn
+                    self._lectores_abiertos -= 1
+
+                if self._lectores_abiertos < self._max_lectores:
+                    conn = self._abrir_conexion(True)
+                    self._lectores_abiertos += 1
+                    self._prestamos[id(conn)] = _Prestamo(conn, True, self._capturar_stack)
+                    return conn
+
+                # Pool lleno: recuperar conexiones de threads que terminaron sin devolverlas
+                if self._recuperar_huerfanas():
+                    continue
+
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    self._reportar_fugas()
+                    raise PoolAgotadoError(
+                        f"No hay conexiones de lectura libres (máximo {self._max_lectores}).")
+                self._condicion.wait(restante)
+
+    def checkin(self, conn):
+        """
+        Devuelve una conexión prestada al pool
+        """
+        with self._condicion:
+            prestamo = self._prestamos.get(id(conn))
+            if prestamo is not None and not prestamo.solo_lectura:
+                # El escritor es reentrante: se libera un nivel por checkin
+                self._local.profundidad -= 1
+                if self._local.profundidad == 0:
+                    self._prestamos.pop(id(conn), None)
+                return
+
+            self._prestamos.pop(id(conn), None)
+            if prestamo is None:
+                return
+
+            if self._conexion_viva(conn):
+                if conn.in_transaction:
+                    # Cierra la transacción de lectura para liberar el snapshot WAL
+                    conn.rollback()
+                self._lectores_libres.append((conn, time.monotonic()))
+            else:
+                self._lectores_abiertos -= 1
+            self._desalojar_inactivos()
+            self._condicion.notify()
+
+    @contextmanager
+    def reader(self, timeout=None):
+        """Context manager de checkout/checkin de un lector"""
+        conn = self.checkout(True, timeout)
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    @contextmanager
+    def writer(self, timeout=None):
+        """Context manager de checkout/checkin del escritor"""
+        conn = self.checkout(False, timeout)
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    # ------------------------------------------------------------------
+    # Mantenimiento del pool
+    # ------------------------------------------------------------------
+    def evict_idle(self):
+        """Cierra los lectores que superaron el tiempo de inactividad"""
+        with self._condicion:
+            return self._desalojar_inactivos()
+
+    def detect_leaks(self, umbral=None):
+        """
+        Devuelve los préstamos que superan el umbral de fuga o cuyo thread ya terminó
+        """
+        umbral = self._umbral_fuga if umbral is None else umbral
+        ahora = time.monotonic()
+        with self._condicion:
+            return [p.describir() for p in self._prestamos.values()
+                    if ahora - p.desde >= umbral or not p.thread.is_alive()]
+
+    def stats(self):
+        """Estado actual del pool"""
+        with self._condicion:
+            return {
+                "lectores_abiertos": self._lectores_abiertos,
+                "lectores_libres": len(self._lectores_libres),
+                "lectores_prestados": sum(1 for p in self._prestamos.values() if p.solo_lectura),
+                "max_lectores": self._max_lectores,
+                "escritores_abiertos": len(self._escritores),
+            }
+
+    def close_all(self):
+        """Cierra todas las conexiones (lectores libres y escritores de todos los threads)"""
+        with self._condicion:
+            for conn, _ in self._lectores_libres:
+                conn.close()
+            self._lectores_abiertos -= len(self._lectores_libres)
+            self._lectores_libres = []
+            for conn in self._escritores.values():
+                conn.close()
+            self._escritores.clear()
+
+    # ------------------------------------------------------------------
+    # Auxiliares (requieren tener tomado self._condicion)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _conexion_viva(conn):
+        try:
+            _ = conn.total_changes
+            return True
+        except (sqlite3.ProgrammingError, AttributeError):
+            return False
+
+    def _desalojar_inactivos(self):
+        if not self._lectores_libres:
+            return 0
+        limite = time.monotonic() - self._tiempo_inactivo
+        vigentes = []
+        cerradas = 0
+        for conn, desde in self._lectores_libres:
+            if desde < limite:
+                conn.close()
+                cerradas += 1
+            else:
+                vigentes.append((conn, desde))
+        self._lectores_libres = vigentes
+        self._lectores_abiertos -= cerradas
+        return cerradas
+
+    def _cerrar_escritores_huerfanos(self):
+        for thread in [t for t in self._escritores if not t.is_alive()]:
+            self._escritores.pop(thread).close()
+
+    def _recuperar_huerfanas(self):
+        huerfanas = [p for p in self._prestamos.values()
+                     if p.solo_lectura and not p.thread.is_alive()]
+        for prestamo in huerfanas:
+            logger.warning("Conexión de lectura no devuelta por el thread '%s'; se recupera.\n%s",
+                           prestamo.thread.name, prestamo.origen)
+            self._prestamos.pop(id(prestamo.conn), None)
+            prestamo.conn.close()
+            self._lectores_abiertos -= 1
+        return bool(huerfanas)
+
+    def _reportar_fugas(self):
+        for fuga in self.detect_leaks():
+            logger.warning("Posible fuga de conexión (%s s, thread '%s'):\n%s",
+                           fuga["segundos"], fuga["thread"], fuga["origen"])
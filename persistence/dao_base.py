@@ -8,6 +8,7 @@ Programación Orientada a Objetos - Clase base abstracta
 Herencia y Polimorfismo - Clase padre para todos los DAOs
 """
 
+import functools
 from abc import ABC, abstractmethod
 from persistence.database_connection import DatabaseConnection
 
@@ -19,6 +20,9 @@ class DAOBase(ABC):
     Herencia y Polimorfismo - Clase padre para todos los DAOs
     """
     
+    # Atributo de la entidad donde se guarda el id asignado por la base (altas en lote)
+    _ATRIBUTO_ID = None
+    
     def __init__(self):
         """
         Persistencia - Inicialización del DAO con conexión Singleton
@@ -65,4 +69,28 @@ class DAOBase(ABC):
         Herencia y Polimorfismo - Debe ser implementado en clases hijas
         """
         pass
+    
+    def create_many(self, entities):
+        """
+        Persistencia - Alta de varias entidades en un solo lote (una transacción)
+        Returns:
+            list: un Future por entidad que se resuelve con la entidad (id ya asignado)
+                  o con el error de su INSERT; las demás altas no se ven afectadas
+        """
+        escrituras = []
+        for entity in entities:
+            query, params = self._sentencia_create(entity)
+            escrituras.append((query, params, functools.partial(self._asignar_id, entity)))
+        return self._db.execute_write_many(escrituras)
+    
+    def _sentencia_create(self, entity):
+        """
+        Herencia y Polimorfismo - (query, params) del INSERT de la entidad
+        Las clases hijas lo implementan para habilitar create_many
+        """
+        raise NotImplementedError(f"{type(self).__name__} no admite altas en lote")
+    
+    def _asignar_id(self, entity, id_entidad):
+        setattr(entity, self._ATRIBUTO_ID, id_entidad)
+        return entity
 
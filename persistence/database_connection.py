@@ -4,29 +4,98 @@
 """
 Patrón Singleton - Conexión única a la base de datos
 Programación Orientada a Objetos - Encapsulación de la conexión
-Thread-Safe - Maneja conexiones por thread para entornos multi-thread
+Thread-Safe - Pool con un escritor por thread y lectores de solo lectura
+Perfiles de conexión - PRAGMA de rendimiento configurables desde config.py
 """
 
 import sqlite3
 import threading
+import random
+import time
 import sys
 import os
+from concurrent.futures import Future
 
 # Agregar directorio padre al path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import DB_FILE
+from config import (DB_FILE, DB_PROFILES, DB_PROFILE, DB_READER_PROFILE,
+                    DB_POOL_MAX_READERS, DB_POOL_IDLE_TIMEOUT,
+                    DB_POOL_LEAK_TIMEOUT, DB_POOL_LEAK_TRACEBACK, DB_POOL_CHECKOUT_TIMEOUT,
+                    DB_WRITE_BEHIND, DB_WRITE_BATCH_WINDOW_MS, DB_WRITE_BATCH_MAX,
+                    DB_WRITE_RETRIES, DB_WRITE_RETRY_BACKOFF_MS,
+                    DB_VERIFICACION_EXTERNA_SEGUNDOS)
+from persistence.connection_pool import ConnectionPool
+from persistence.write_queue import WriteQueue
+
+
+class ConexionPerfilada(sqlite3.Connection):
+    """
+    Conexión SQLite que recuerda el perfil de PRAGMA aplicado
+    Herencia - Extiende sqlite3.Connection solo para guardar el nombre del perfil
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.perfil = None
+
+
+class CursorMaterializado:
+    """
+    Resultado de una consulta de lectura ya leído en memoria
+    Permite devolver el lector al pool antes de que el llamador consuma las filas
+    Interfaz compatible con la parte de sqlite3.Cursor que usan los DAOs
+    """
+    
+    def __init__(self, cursor):
+        self.description = cursor.description
+        self._filas = cursor.fetchall()
+        self._posicion = 0
+        self.rowcount = -1
+        self.lastrowid = None
+    
+    def fetchone(self):
+        if self._posicion >= len(self._filas):
+            return None
+        fila = self._filas[self._posicion]
+        self._posicion += 1
+        return fila
+    
+    def fetchmany(self, size=1):
+        filas = self._filas[self._posicion:self._posicion + size]
+        self._posicion += len(filas)
+        return filas
+    
+    def fetchall(self):
+        filas = self._filas[self._posicion:]
+        self._posicion = len(self._filas)
+        return filas
+    
+    def __iter__(self):
+        return iter(self.fetchall())
 
 
 class DatabaseConnection:
     """
     Patrón Singleton - Garantiza una única instancia de la clase
-    Thread-Safe - Cada thread tiene su propia conexión usando threading.local()
+    Thread-Safe - Las conexiones se prestan desde un ConnectionPool compartido
     Programación Orientada a Objetos - Encapsula la lógica de conexión
     """
     
     _instance = None
     _lock = threading.Lock()
-    _local = threading.local()  # Thread-Safe - Almacena conexión por thread
+    _pool = None
+    _cola_escritura = None
+    _monitor = None          # Conexión dedicada a data_version y a la versión del calendario
+    _escrituras_calendario = 0  # transacciones de este proceso que cambiaron el calendario
+    _local = threading.local()  # última escritura del calendario confirmada por cada thread
+    
+    # Versión del calendario: la avanzan los triggers de la migración 10 con cada escritura en
+    # alquiler, mantenimiento, reserva_categoria, lista_espera y altas/bajas/tipo de vehículos
+    SQL_VERSION_CALENDARIO = "SELECT version FROM version_calendario WHERE id = 1"
+    
+    # Orden en que se aplican los PRAGMA de un perfil
+    _PRAGMAS_PERFIL = ("busy_timeout", "journal_mode", "synchronous",
+                       "cache_size", "mmap_size", "temp_store")
     
     def __new__(cls):
         """Patrón Singleton - Implementación del patrón creacional"""
@@ -36,65 +105,449 @@ class DatabaseConnection:
                     cls._instance = super(DatabaseConnection, cls).__new__(cls)
         return cls._instance
     
-    def get_connection(self):
+    @staticmethod
+    def aplicar_perfil(conn, nombre_perfil, solo_lectura=False):
         """
-        Obtiene la conexión a la base de datos
-        Thread-Safe - Cada thread obtiene su propia conexión
+        Aplica los PRAGMA del perfil indicado a una conexión abierta
+        Programación Estructurada - Valida el nombre antes de modificar la conexión
+        Las conexiones de solo lectura no pueden cambiar journal_mode (lo fija el escritor)
         """
-        # Thread-Safe - Verificar si este thread ya tiene una conexión
-        if not hasattr(self._local, 'connection') or self._local.connection is None:
-            # Thread-Safe - Crear nueva conexión para este thread
-            self._local.connection = sqlite3.connect(DB_FILE, check_same_thread=False)
-            self._local.connection.row_factory = sqlite3.Row
-            # Activar claves foráneas
-            self._local.connection.execute("PRAGMA foreign_keys = ON")
+        if nombre_perfil not in DB_PROFILES:
+            raise ValueError(f"Perfil de conexión desconocido: {nombre_perfil}. "
+                             f"Perfiles disponibles: {', '.join(DB_PROFILES)}")
+        
+        perfil = DB_PROFILES[nombre_perfil]
+        for pragma in DatabaseConnection._PRAGMAS_PERFIL:
+            if solo_lectura and pragma == "journal_mode":
+                continue
+            if pragma in perfil:
+                # Los PRAGMA no admiten parámetros; los valores provienen de config.py
+                conn.execute(f"PRAGMA {pragma} = {perfil[pragma]}").fetchall()
+        
+        if isinstance(conn, ConexionPerfilada):
+            conn.perfil = nombre_perfil
+        return conn
+    
+    @staticmethod
+    def describir_perfil(conn):
+        """
+        Devuelve el perfil y los valores efectivos de los PRAGMA de una conexión
+        Útil para verificar qué configuración está usando realmente SQLite
+        """
+        descripcion = {"perfil": getattr(conn, "perfil", None)}
+        for pragma in DatabaseConnection._PRAGMAS_PERFIL:
+            row = conn.execute(f"PRAGMA {pragma}").fetchone()
+            descripcion[pragma] = row[0] if row else None
+        return descripcion
+    
+    def _abrir_conexion(self, solo_lectura=False, perfil=None):
+        """
+        Crea una conexión nueva con el perfil indicado (o el de config.py)
+        Los lectores se abren con URI mode=ro: SQLite rechaza cualquier escritura
+        """
+        if solo_lectura:
+            uri = f"file:{os.path.abspath(DB_FILE)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                                   factory=ConexionPerfilada)
         else:
-            # Verificar si la conexión está cerrada y recrearla si es necesario
-            try:
-                # Verificar si la conexión está cerrada accediendo a un atributo interno
-                # Si la conexión está cerrada, esto lanzará una excepción
-                _ = self._local.connection.total_changes
-            except (sqlite3.ProgrammingError, AttributeError):
-                # La conexión está cerrada, crear una nueva
-                self._local.connection = sqlite3.connect(DB_FILE, check_same_thread=False)
-                self._local.connection.row_factory = sqlite3.Row
-                # Activar claves foráneas
-                self._local.connection.execute("PRAGMA foreign_keys = ON")
-        return self._local.connection
+            conn = sqlite3.connect(DB_FILE, check_same_thread=False, factory=ConexionPerfilada)
+        conn.row_factory = sqlite3.Row
+        # Activar claves foráneas
+        conn.execute("PRAGMA foreign_keys = ON")
+        perfil = perfil or (DB_READER_PROFILE if solo_lectura else DB_PROFILE)
+        self.aplicar_perfil(conn, perfil, solo_lectura)
+        return conn
+    
+    def get_pool(self):
+        """
+        Devuelve el pool de conexiones compartido (se crea la primera vez)
+        Thread-Safe - Creación protegida con el lock de la clase
+        """
+        if DatabaseConnection._pool is None:
+            with self._lock:
+                if DatabaseConnection._pool is None:
+                    DatabaseConnection._pool = ConnectionPool(
+                        self._abrir_conexion,
+                        max_lectores=DB_POOL_MAX_READERS,
+                        tiempo_inactivo=DB_POOL_IDLE_TIMEOUT,
+                        umbral_fuga=DB_POOL_LEAK_TIMEOUT,
+                        tiempo_espera=DB_POOL_CHECKOUT_TIMEOUT,
+                        capturar_stack=DB_POOL_LEAK_TRACEBACK,
+                    )
+        return DatabaseConnection._pool
+    
+    def get_connection(self):
+        """
+        Obtiene la conexión de escritura del thread actual
+        Compatibilidad - El código existente lee sobre esta conexión; las escrituras
+        pasan por ejecutar_inmediata/escritor(). Si fue cerrada, el pool la reabre
+        """
+        return self.get_pool().writer_connection()
+    
+    def en_transaccion(self):
+        """Indica si el escritor del thread actual tiene una transacción sin confirmar"""
+        return self.get_pool().writer_in_transaction()
+    
+    def lector(self, timeout=None):
+        """
+        Context manager: presta una conexión de solo lectura del pool
+        """
+        return self.get_pool().reader(timeout)
+    
+    def escritor(self, timeout=None):
+        """
+        Context manager: presta la conexión de escritura del thread actual
+        """
+        return self.get_pool().writer(timeout)
+    
+    def version_datos(self):
+        """
+        Devuelve PRAGMA data_version leído en una conexión dedicada
+        El valor cambia cada vez que otra conexión (incluido el escritor del pool,
+        la cola de escritura u otro proceso) confirma cambios: sirve para invalidar cachés
+        """
+        with self._lock:
+            if DatabaseConnection._monitor is None:
+                DatabaseConnection._monitor = self._abrir_conexion(solo_lectura=True)
+            return DatabaseConnection._monitor.execute("PRAGMA data_version").fetchone()[0]
+    
+    def version_calendario(self, conn=None):
+        """
+        Devuelve la versión del calendario (tabla version_calendario)
+        A diferencia de data_version, no cambia con escrituras de clientes, empleados,
+        multas o estados de vehículos: las estructuras del calendario solo se recargan
+        cuando cambió algo que reflejan. Sin conn se lee en la conexión dedicada
+        """
+        if conn is not None:
+            return conn.execute(self.SQL_VERSION_CALENDARIO).fetchone()[0]
+        with self._lock:
+            if DatabaseConnection._monitor is None:
+                DatabaseConnection._monitor = self._abrir_conexion(solo_lectura=True)
+            return DatabaseConnection._monitor.execute(self.SQL_VERSION_CALENDARIO).fetchone()[0]
+    
+    def escrituras_calendario(self):
+        """
+        Cantidad de transacciones confirmadas por este proceso que cambiaron el calendario
+        Se lee en memoria: sirve para detectar escrituras propias sin consultar SQLite
+        """
+        return DatabaseConnection._escrituras_calendario
+    
+    def ultima_escritura(self):
+        """
+        Última transacción del thread actual (con ejecutar_inmediata) que cambió el calendario
+        Returns:
+            tuple: (número de escritura, versión del calendario antes, versión después), o None
+        """
+        return getattr(DatabaseConnection._local, "ultima_escritura", None)
+    
+    def _registrar_escritura(self, conn, version_antes):
+        """
+        Se llama antes del commit, con el lock de escritura de SQLite tomado (la numeración
+        sigue el orden de los commits). Solo cuenta la transacción si cambió el calendario
+        Returns:
+            tuple: (número, versión antes, versión después), o None si no cambió el calendario
+        """
+        version_despues = self.version_calendario(conn)
+        if version_despues == version_antes:
+            return None
+        with self._lock:
+            DatabaseConnection._escrituras_calendario += 1
+            return DatabaseConnection._escrituras_calendario, version_antes, version_despues
+    
+    def cambiar_perfil(self, nombre_perfil):
+        """
+        Cambia el perfil del escritor del thread actual (ej. 'bulk-import' antes de una importación)
+        """
+        return self.aplicar_perfil(self.get_connection(), nombre_perfil)
+    
+    def perfil_actual(self):
+        """
+        Devuelve la descripción del perfil del escritor del thread actual
+        """
+        return self.describir_perfil(self.get_connection())
+    
+    def habilitar_escritura_diferida(self, ventana_ms=None, max_lote=None):
+        """
+        Activa el modo write-behind: execute_write/execute_write_async pasan por una
+        cola drenada por un único thread que confirma las escrituras en lotes
+        """
+        with self._lock:
+            if DatabaseConnection._cola_escritura is None:
+                DatabaseConnection._cola_escritura = WriteQueue(
+                    self._abrir_conexion,
+                    ventana_ms=DB_WRITE_BATCH_WINDOW_MS if ventana_ms is None else ventana_ms,
+                    max_lote=DB_WRITE_BATCH_MAX if max_lote is None else max_lote,
+                    al_iniciar=self.version_calendario,
+                    al_confirmar=self._registrar_escritura,
+                )
+        return DatabaseConnection._cola_escritura
+    
+    def deshabilitar_escritura_diferida(self):
+        """
+        Vuelve al modo de commit inmediato, confirmando antes lo que quede encolado
+        """
+        with self._lock:
+            cola = DatabaseConnection._cola_escritura
+            DatabaseConnection._cola_escritura = None
+        if cola is not None:
+            cola.close()
+    
+    def escritura_diferida_activa(self):
+        """Indica si las escrituras se están encolando (write-behind)"""
+        return DatabaseConnection._cola_escritura is not None
+    
+    def execute_write_async(self, query, params=None):
+        """
+        Ejecuta una escritura y devuelve un Future que se resuelve con el lastrowid
+        En modo write-behind la escritura se encola; si no, se confirma en el momento
+        """
+        if DB_WRITE_BEHIND and DatabaseConnection._cola_escritura is None:
+            self.habilitar_escritura_diferida()
+        cola = DatabaseConnection._cola_escritura
+        if cola is not None:
+            return cola.submit(query, params)
+        
+        futuro = Future()
+        try:
+            futuro.set_result(self.execute_write(query, params))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+    
+    def execute_write_many(self, escrituras):
+        """
+        Ejecuta varias escrituras en un solo lote y devuelve un Future por cada una
+        En modo write-behind se encolan juntas (mismo lote de la cola); si no, se confirman
+        en una transacción BEGIN IMMEDIATE. Cada escritura va en su propio SAVEPOINT:
+        si una falla, solo su Future recibe el error
+        Args:
+            escrituras: tuplas (query, params) o (query, params, resultado), donde
+                        resultado(lastrowid) da el valor con que se resuelve el Future
+        """
+        escrituras = list(escrituras)
+        if DB_WRITE_BEHIND and DatabaseConnection._cola_escritura is None:
+            self.habilitar_escritura_diferida()
+        cola = DatabaseConnection._cola_escritura
+        if cola is not None and not self.en_transaccion():
+            return cola.submit_many(escrituras)
+        
+        def ejecutar(cursor):
+            resultados = []
+            for escritura in escrituras:
+                query, params = escritura[0], escritura[1]
+                resultado = escritura[2] if len(escritura) > 2 else None
+                cursor.execute("SAVEPOINT escritura")
+                try:
+                    lastrowid = cursor.execute(query, params or ()).lastrowid
+                    cursor.execute("RELEASE escritura")
+                except sqlite3.Error as e:
+                    cursor.execute("ROLLBACK TO escritura")
+                    cursor.execute("RELEASE escritura")
+                    resultados.append((None, e))
+                    continue
+                resultados.append((lastrowid if resultado is None else resultado(lastrowid), None))
+            return resultados
+        
+        futuros = [Future() for _ in escrituras]
+        try:
+            resultados = self.ejecutar_inmediata(ejecutar)
+        except Exception as e:
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return futuros
+        for futuro, (valor, error) in zip(futuros, resultados):
+            if error is not None:
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(valor)
+        return futuros
+    
+    def execute_write(self, query, params=None):
+        """
+        Ejecuta una escritura, la confirma y devuelve el lastrowid
+        Programación Estructurada - Punto único de escritura usado por los DAOs
+        """
+        # Dentro de una transacción del thread, la cola esperaría un lock que tiene el propio thread
+        if ((DB_WRITE_BEHIND or DatabaseConnection._cola_escritura is not None)
+                and not self.en_transaccion()):
+            return self.execute_write_async(query, params).result()
+        
+        return self.ejecutar_inmediata(lambda c: c.execute(query, params or ()).lastrowid)
     
     def close(self):
         """
-        Cierra la conexión del thread actual
-        Thread-Safe - Solo cierra la conexión del thread actual
+        Cierra todas las conexiones del pool (y la cola de escritura, si está activa)
+        Las siguientes consultas vuelven a abrir las conexiones necesarias
         """
-        if hasattr(self._local, 'connection') and self._local.connection:
-            self._local.connection.close()
-            self._local.connection = None
+        self.deshabilitar_escritura_diferida()
+        with self._lock:
+            if DatabaseConnection._monitor is not None:
+                DatabaseConnection._monitor.close()
+                DatabaseConnection._monitor = None
+        if DatabaseConnection._pool is not None:
+            DatabaseConnection._pool.close_all()
     
     def execute_query(self, query, params=None):
         """
-        Programación Estructurada - Función para ejecutar consultas
+        Programación Estructurada - Función para ejecutar consultas de lectura
+        Se resuelven en un lector del pool (no bloquean al escritor); las escrituras van
+        por execute_write / ejecutar_inmediata (un lector mode=ro las rechaza)
+        Si el thread actual tiene una transacción abierta se lee en su escritor, para ver
+        sus propios cambios pendientes (nunca los de otro thread)
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        if params:
-            cursor.execute(query, params)
-        else:
-            cursor.execute(query)
-        return cursor
+        if self.en_transaccion():
+            cursor = self.get_connection().cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            return cursor
+        
+        with self.lector() as conn:
+            cursor = conn.execute(query, params or ())
+            return CursorMaterializado(cursor)
+    
+    @staticmethod
+    def es_bloqueo(error):
+        """Indica si el error es SQLITE_BUSY/SQLITE_LOCKED (otra conexión tiene el lock)"""
+        mensaje = str(error).lower()
+        return isinstance(error, sqlite3.OperationalError) and (
+            "locked" in mensaje or "busy" in mensaje)
+    
+    def ejecutar_inmediata(self, funcion, reintentos=None, espera_ms=None):
+        """
+        Ejecuta funcion(cursor) dentro de BEGIN IMMEDIATE sobre el escritor y confirma
+        El lock de escritura de SQLite se toma al empezar: las validaciones que hace la
+        función no pueden quedar invalidadas por otra conexión antes del INSERT
+        Si la base sigue bloqueada tras busy_timeout se reintenta con espera exponencial
+        Si el escritor ya tiene una transacción abierta, la función se ejecuta dentro de ella
+        Si la transacción cambió el calendario se registra (ver ultima_escritura) para que los
+        observadores comprueben que su evento es el único cambio desde su última versión
+        Returns:
+            el valor devuelto por funcion
+        """
+        reintentos = DB_WRITE_RETRIES if reintentos is None else reintentos
+        espera = (DB_WRITE_RETRY_BACKOFF_MS if espera_ms is None else espera_ms) / 1000.0
+        intento = 0
+        while True:
+            with self.escritor() as conn:
+                propia = not conn.in_transaction
+                try:
+                    if propia:
+                        conn.execute("BEGIN IMMEDIATE")
+                        # Con el lock tomado nadie más puede confirmar: es la versión previa exacta
+                        version_antes = self.version_calendario(conn)
+                    resultado = funcion(conn.cursor())
+                    if propia:
+                        escritura = self._registrar_escritura(conn, version_antes)
+                        conn.commit()
+                        if escritura is not None:
+                            DatabaseConnection._local.ultima_escritura = escritura
+                    return resultado
+                except Exception as e:
+                    if propia and conn.in_transaction:
+                        conn.rollback()
+                    if not (propia and self.es_bloqueo(e)) or intento >= reintentos:
+                        raise
+            # Espera exponencial con variación aleatoria para no reintentar a la vez
+            intento += 1
+            time.sleep(espera * (2 ** (intento - 1)) * random.uniform(0.5, 1.5))
     
     def execute_transaction(self, queries_with_params):
         """
         Programación Estructurada - Función para ejecutar transacciones
+        Thread-Safe - Todas las sentencias van en un mismo BEGIN IMMEDIATE
         """
-        conn = self.get_connection()
-        try:
-            cursor = conn.cursor()
+        def ejecutar(cursor):
             for query, params in queries_with_params:
                 cursor.execute(query, params)
-            conn.commit()
             return True
-        except Exception as e:
-            conn.rollback()
-            raise e
+        
+        return self.ejecutar_inmediata(ejecutar)
+
 
+class VersionObservada:
+    """
+    Versión del calendario reflejada por una estructura en memoria (índices, planificadores)
+    Programación Orientada a Objetos - Encapsula las dos fuentes de cambios:
+    - escrituras de este proceso: contador en memoria, sin consultar SQLite
+    - escrituras de otros procesos: tabla version_calendario, como mucho cada `intervalo` segundos
+    Las escrituras que no tocan el calendario (clientes, empleados, estados) no la invalidan
+    El dueño la usa con su propio lock tomado
+    """
+    
+    def __init__(self, db, intervalo=None):
+        self._db = db
+        self._intervalo = DB_VERIFICACION_EXTERNA_SEGUNDOS if intervalo is None else intervalo
+        self.invalidar()
+    
+    def invalidar(self):
+        """Olvida la versión: la próxima verificación indica que hay que recargar"""
+        self._escrituras = None
+        self._version = None
+        self._verificada = float("-inf")
+        self._por_evento = False    # True si la versión avanzó con aplicar_evento
+    
+    def marcar(self):
+        """
+        Registra la versión actual; se llama ANTES de leer los datos a cargar, así una
+        escritura confirmada durante la carga provoca otra recarga (nunca datos viejos)
+        """
+        self._escrituras = self._db.escrituras_calendario()
+        self._version = self._db.version_calendario()
+        self._verificada = time.monotonic()
+        self._por_evento = False
+    
+    def confirmar_carga(self):
+        """
+        Se llama DESPUÉS de leer los datos: si el proceso cambió el calendario durante la
+        carga, no se sabe si los datos las incluyen y la versión queda invalidada
+        (sus eventos no se aplican dos veces; la próxima consulta vuelve a cargar)
+        """
+        if self._escrituras != self._db.escrituras_calendario():
+            self.invalidar()
+    
+    def vigente(self):
+        """
+        False si hubo cambios del calendario que la estructura no aplicó (hay que recargarla)
+        """
+        if self._escrituras is None or self._escrituras != self._db.escrituras_calendario():
+            return False
+        if time.monotonic() - self._verificada < self._intervalo:
+            return True
+        self._verificada = time.monotonic()
+        return self._db.version_calendario() == self._version
+    
+    def coincide(self, version):
+        """
+        True si la estructura refleja exactamente `version` y ninguna escritura propia quedó
+        sin aplicar. Se usa dentro de una transacción de escritura: con el lock tomado, la
+        versión leída en ella no puede cambiar hasta el commit
+        """
+        return (self._escrituras is not None
+                and self._escrituras == self._db.escrituras_calendario()
+                and self._version == version)
+    
+    def aplicar_evento(self):
+        """
+        Lo llama un observador al recibir un evento del calendario (en el thread que escribió)
+        Returns:
+            bool: True si la escritura del evento es el único cambio desde la versión
+                  registrada (se puede aplicar el cambio y la versión avanza); False si
+                  hubo otros cambios (la versión queda invalidada y hay que recargar)
+        Una misma escritura puede avisar varios eventos (lotes, asignación de reservas):
+        los siguientes se aceptan si la versión ya avanzó con un evento de esa escritura
+        """
+        escritura = self._db.ultima_escritura()
+        if escritura is None or self._escrituras is None:
+            aplicable = False
+        elif self._por_evento and escritura[0] == self._escrituras:
+            aplicable = escritura[2] == self._version
+        else:
+            aplicable = escritura[0] == self._escrituras + 1 and escritura[1] == self._version
+        if not aplicable:
+            self.invalidar()
+            return False
+        self._escrituras, _, self._version = escritura
+        self._por_evento = True
+        return True
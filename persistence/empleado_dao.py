@@ -17,20 +17,26 @@ class EmpleadoDAO(DAOBase):
     Herencia y Polimorfismo - Implementa métodos abstractos de DAOBase
     """
     
+    _ATRIBUTO_ID = "_id_empleado"
+    
     def create(self, empleado):
         """
         Persistencia - Crea un nuevo empleado en la base de datos
         Programación Estructurada - Función bien definida
         """
+        query, params = self._sentencia_create(empleado)
+        empleado._id_empleado = self._db.execute_write(query, params)
+        return empleado
+    
+    def _sentencia_create(self, empleado):
+        """
+        Persistencia - INSERT del empleado (usado por create y create_many)
+        """
         query = """INSERT INTO empleado (nombre, apellido, dni, cargo, telefono, email) 
                    VALUES (?,?,?,?,?,?)"""
         params = (empleado.nombre, empleado.apellido, empleado.dni,
                  empleado.cargo, empleado.telefono, empleado.email)
-        
-        cursor = self._db.execute_query(query, params)
-        self._db.get_connection().commit()
-        empleado._id_empleado = cursor.lastrowid
-        return empleado
+        return query, params
     
     def read(self, id_empleado):
         """
@@ -55,8 +61,7 @@ class EmpleadoDAO(DAOBase):
         params = (empleado.nombre, empleado.apellido, empleado.dni,
                  empleado.cargo, empleado.telefono, empleado.email, empleado.id_empleado)
         
-        self._db.execute_query(query, params)
-        self._db.get_connection().commit()
+        self._db.execute_write(query, params)
         return empleado
     
     def delete(self, id_empleado):
@@ -65,8 +70,7 @@ class EmpleadoDAO(DAOBase):
         Programación Estructurada - Función bien definida
         """
         query = "DELETE FROM empleado WHERE id_empleado = ?"
-        self._db.execute_query(query, (id_empleado,))
-        self._db.get_connection().commit()
+        self._db.execute_write(query, (id_empleado,))
         return True
     
     def list_all(self):
@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Migraciones versionadas del esquema de la base de datos
+Persistencia - La versión aplicada se guarda en PRAGMA user_version
+Programación Estructurada - Cada migración es una función registrada en orden
+"""
+
+import logging
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# Registro ordenado de migraciones: lista de (version, descripcion, funcion)
+MIGRACIONES = []
+
+
+class MigracionError(Exception):
+    """Error al aplicar una migración (la transacción de esa migración se revierte)"""
+
+    def __init__(self, version, descripcion, causa):
+        super().__init__(f"Error en la migración {version} ({descripcion}): {causa}")
+        self.version = version
+        self.descripcion = descripcion
+        self.causa = causa
+
+
+def migracion(version, descripcion):
+    """
+    Decorador que registra una migración
+    Las versiones deben ser enteros consecutivos a partir de 1
+    """
+    def registrar(funcion):
+        esperada = len(MIGRACIONES) + 1
+        if version != esperada:
+            raise ValueError(f"Versión de migración {version} fuera de orden (se esperaba {esperada}).")
+        MIGRACIONES.append((version, descripcion, funcion))
+        return funcion
+    return registrar
+
+
+def version_actual(conn):
+    """Lee la versión de esquema aplicada (PRAGMA user_version)"""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def version_esperada():
+    """Versión de esquema que espera el código"""
+    return MIGRACIONES[-1][0] if MIGRACIONES else 0
+
+
+def aplicar_migraciones(conn):
+    """
+    Aplica en orden las migraciones pendientes
+    Si el esquema está al día, solo se lee un entero (PRAGMA user_version)
+    Cada migración corre en su propia transacción junto con el cambio de user_version
+    Returns:
+        list: versiones aplicadas
+    """
+    actual = version_actual(conn)
+    if actual >= version_esperada():
+        return []
+
+    aplicadas = []
+    for version, descripcion, funcion in MIGRACIONES:
+        if version <= actual:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            funcion(conn.cursor())
+            # PRAGMA no admite parámetros; version es un entero del registro
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            logger.error("Falló la migración %s (%s): %s", version, descripcion, e)
+            raise MigracionError(version, descripcion, e) from e
+        logger.info("Migración %s aplicada: %s", version, descripcion)
+        aplicadas.append(version)
+    return aplicadas
+
+
+def _ejecutar_sentencias(c, sentencias):
+    """Ejecuta una lista de sentencias SQL dentro de la transacción en curso"""
+    for sentencia in sentencias:
+        c.execute(sentencia)
+
+
+# ----------------------------------------------------------------------
+# Migraciones
+# ----------------------------------------------------------------------
+
+@migracion(1, "esquema inicial")
+def _esquema_inicial(c):
+    _ejecutar_sentencias(c, [
+        """CREATE TABLE IF NOT EXISTS cliente (
+            id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            dni TEXT UNIQUE,
+            telefono TEXT,
+            direccion TEXT,
+            email TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS empleado (
+            id_empleado INTEGER PRIMARY KEY AUTOINCREMENT,
+            nombre TEXT NOT NULL,
+            apellido TEXT NOT NULL,
+            dni TEXT UNIQUE,
+            cargo TEXT,
+            telefono TEXT,
+            email TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS vehiculo (
+            id_vehiculo INTEGER PRIMARY KEY AUTOINCREMENT,
+            patente TEXT UNIQUE NOT NULL,
+            marca TEXT,
+            modelo TEXT,
+            tipo TEXT,
+            costo_diario REAL NOT NULL DEFAULT 0,
+            estado TEXT DEFAULT 'disponible',
+            fecha_ultimo_mantenimiento TEXT
+        )""",
+        """CREATE TABLE IF NOT EXISTS alquiler (
+            id_alquiler INTEGER PRIMARY KEY AUTOINCREMENT,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            costo_total REAL NOT NULL,
+            id_cliente INTEGER NOT NULL,
+            id_vehiculo INTEGER NOT NULL,
+            id_empleado INTEGER,
+            fecha_registro TEXT NOT NULL DEFAULT (date('now')),
+            FOREIGN KEY(id_cliente) REFERENCES cliente(id_cliente) ON DELETE RESTRICT,
+            FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE RESTRICT,
+            FOREIGN KEY(id_empleado) REFERENCES empleado(id_empleado) ON DELETE SET NULL
+        )""",
+        """CREATE TABLE IF NOT EXISTS multa (
+            id_multa INTEGER PRIMARY KEY AUTOINCREMENT,
+            descripcion TEXT,
+            monto REAL,
+            id_alquiler INTEGER NOT NULL,
+            FOREIGN KEY(id_alquiler) REFERENCES alquiler(id_alquiler) ON DELETE CASCADE
+        )""",
+        """CREATE TABLE IF NOT EXISTS mantenimiento (
+            id_mant INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            costo REAL,
+            id_vehiculo INTEGER NOT NULL,
+            observaciones TEXT,
+            FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE CASCADE
+        )""",
+    ])
+
+
+@migracion(2, "mantenimiento: columna fecha reemplazada por fecha_inicio/fecha_fin")
+def _mantenimiento_rango_fechas(c):
+    c.execute("PRAGMA table_info(mantenimiento)")
+    columnas = [col[1] for col in c.fetchall()]
+    if 'fecha' not in columnas or 'fecha_inicio' in columnas:
+        return
+
+    # SQLite no soporta DROP COLUMN en versiones antiguas: se recrea la tabla
+    _ejecutar_sentencias(c, [
+        """CREATE TABLE mantenimiento_new (
+            id_mant INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            costo REAL,
+            id_vehiculo INTEGER NOT NULL,
+            observaciones TEXT,
+            FOREIGN KEY(id_vehiculo) REFERENCES vehiculo(id_vehiculo) ON DELETE CASCADE
+        )""",
+        """INSERT INTO mantenimiento_new
+           (id_mant, tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones)
+           SELECT id_mant, tipo, fecha, fecha, costo, id_vehiculo, observaciones
+           FROM mantenimiento""",
+        "DROP TABLE mantenimiento",
+        "ALTER TABLE mantenimiento_new RENAME TO mantenimiento",
+    ])
+
+
+@migracion(3, "índices para disponibilidad, mantenimientos, multas y listados")
+def _indices_consultas_frecuentes(c):
+    _ejecutar_sentencias(c, [
+        # Solapamiento de alquileres por vehículo (vehiculo_disponible, verificar_disponibilidad)
+        """CREATE INDEX IF NOT EXISTS idx_alquiler_vehiculo_fechas
+           ON alquiler(id_vehiculo, fecha_inicio, fecha_fin)""",
+        # Detalle de alquileres por cliente ordenado por fecha
+        """CREATE INDEX IF NOT EXISTS idx_alquiler_cliente_fecha
+           ON alquiler(id_cliente, fecha_inicio)""",
+        # Listados ORDER BY fecha_inicio DESC y reportes por período
+        """CREATE INDEX IF NOT EXISTS idx_alquiler_fecha_inicio
+           ON alquiler(fecha_inicio)""",
+        # ON DELETE SET NULL al eliminar un empleado
+        """CREATE INDEX IF NOT EXISTS idx_alquiler_empleado
+           ON alquiler(id_empleado)""",
+        # Mantenimientos activos/solapados por vehículo (índice cubriente)
+        """CREATE INDEX IF NOT EXISTS idx_mantenimiento_vehiculo_fin
+           ON mantenimiento(id_vehiculo, fecha_fin, fecha_inicio)""",
+        # Listado de mantenimientos ORDER BY fecha_inicio DESC
+        """CREATE INDEX IF NOT EXISTS idx_mantenimiento_fecha_inicio
+           ON mantenimiento(fecha_inicio)""",
+        # Multas de un alquiler y ON DELETE CASCADE
+        """CREATE INDEX IF NOT EXISTS idx_multa_alquiler
+           ON multa(id_alquiler)""",
+        # Estadísticas para el planificador de consultas
+        "ANALYZE",
+    ])
+
+
+# Formatos de fecha que pudieron quedar guardados antes de la migración 4
+# (texto libre validado con strptime, que acepta día y mes sin cero a la izquierda)
+FORMATOS_FECHA_LEGADOS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S",
+                          "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+
+def _fecha_legada_a_iso(valor):
+    """Convierte una fecha guardada en un formato legado a 'YYYY-MM-DD' (None si no se reconoce)"""
+    if not isinstance(valor, str):
+        return None
+    for formato in FORMATOS_FECHA_LEGADOS:
+        try:
+            return datetime.strptime(valor.strip(), formato).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+
+def _normalizar_fechas(c):
+    """
+    Reescribe en formato ISO las fechas de alquiler y mantenimiento que no lo están
+    Raises:
+        ValueError: si alguna fecha no está en un formato reconocido (se listan todas y
+        la migración se revierte sin tocar ninguna fila)
+    """
+    cambios = []
+    invalidas = []
+    for tabla in ("alquiler", "mantenimiento"):
+        for columna in ("fecha_inicio", "fecha_fin"):
+            c.execute(f"""SELECT rowid, {columna} FROM {tabla}
+                          WHERE {columna} IS NOT date({columna})""")
+            for id_fila, valor in c.fetchall():
+                iso = _fecha_legada_a_iso(valor)
+                if iso is None:
+                    invalidas.append(f"{tabla} {id_fila} {columna}={valor!r}")
+                else:
+                    cambios.append((tabla, columna, iso, id_fila))
+    if invalidas:
+        raise ValueError("fechas con formato no reconocido (corregirlas y volver a ejecutar): "
+                         + "; ".join(invalidas))
+    for tabla, columna, iso, id_fila in cambios:
+        c.execute(f"UPDATE {tabla} SET {columna} = ? WHERE rowid = ?", (iso, id_fila))
+
+
+@migracion(4, "fechas normalizadas a ISO (YYYY-MM-DD) y validadas por triggers")
+def _fechas_iso(c):
+    _normalizar_fechas(c)
+
+    # Las consultas comparan las columnas directamente (sin date()) para poder usar índices:
+    # solo es correcto si todas las fechas guardadas están en formato ISO
+    for tabla in ("alquiler", "mantenimiento"):
+        condicion = ("NEW.fecha_inicio IS NOT date(NEW.fecha_inicio) "
+                     "OR NEW.fecha_fin IS NOT date(NEW.fecha_fin)")
+        mensaje = f"Las fechas de {tabla} deben tener formato YYYY-MM-DD"
+        _ejecutar_sentencias(c, [
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fechas_iso_insert
+                BEFORE INSERT ON {tabla}
+                WHEN {condicion}
+                BEGIN SELECT RAISE(ABORT, '{mensaje}'); END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_fechas_iso_update
+                BEFORE UPDATE OF fecha_inicio, fecha_fin ON {tabla}
+                WHEN {condicion}
+                BEGIN SELECT RAISE(ABORT, '{mensaje}'); END""",
+        ])
+
+
+@migracion(5, "triggers contra alquileres superpuestos (doble reserva)")
+def _guardas_solapamiento(c):
+    # Condición de solapamiento: igual a SQL_ALQUILERES_SOLAPADOS (usa los índices por vehículo)
+    alquiler_solapado = """EXISTS (SELECT 1 FROM alquiler a
+                              WHERE a.id_vehiculo = NEW.id_vehiculo
+                                AND a.fecha_fin >= NEW.fecha_inicio
+                                AND a.fecha_inicio <= NEW.fecha_fin{excluir})"""
+    mantenimiento_solapado = """EXISTS (SELECT 1 FROM mantenimiento m
+                                   WHERE m.id_vehiculo = NEW.id_vehiculo
+                                     AND m.fecha_fin >= NEW.fecha_inicio
+                                     AND m.fecha_inicio <= NEW.fecha_fin)"""
+    msg_alquiler = ("Vehículo no disponible en el periodo indicado. "
+                    "Ya existe un alquiler activo en ese rango de fechas.")
+    msg_mantenimiento = ("Vehículo no disponible en el periodo indicado. "
+                         "El vehículo está en mantenimiento en ese rango de fechas.")
+    msg_mant_alquiler = ("No se puede programar mantenimiento en un vehículo "
+                         "que tiene alquileres en ese período.")
+    # Se ejecutan dentro de la misma transacción que el INSERT: con BEGIN IMMEDIATE
+    # ninguna otra conexión puede insertar entre la verificación y la escritura
+    _ejecutar_sentencias(c, [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_alquiler_sin_solapamiento_insert
+            BEFORE INSERT ON alquiler
+            BEGIN
+                SELECT RAISE(ABORT, '{msg_mantenimiento}') WHERE {mantenimiento_solapado};
+                SELECT RAISE(ABORT, '{msg_alquiler}') WHERE {alquiler_solapado.format(excluir="")};
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_alquiler_sin_solapamiento_update
+            BEFORE UPDATE OF fecha_inicio, fecha_fin, id_vehiculo ON alquiler
+            BEGIN
+                SELECT RAISE(ABORT, '{msg_mantenimiento}') WHERE {mantenimiento_solapado};
+                SELECT RAISE(ABORT, '{msg_alquiler}')
+                WHERE {alquiler_solapado.format(excluir=" AND a.id_alquiler <> NEW.id_alquiler")};
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_mantenimiento_sin_alquiler_insert
+            BEFORE INSERT ON mantenimiento
+            BEGIN
+                SELECT RAISE(ABORT, '{msg_mant_alquiler}') WHERE {alquiler_solapado.format(excluir="")};
+            END""",
+    ])
+
+
+@migracion(6, "reservas por categoría (tipo de vehículo) con asignación al retirar")
+def _reservas_categoria(c):
+    _ejecutar_sentencias(c, [
+        """CREATE TABLE IF NOT EXISTS reserva_categoria (
+            id_reserva INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            id_cliente INTEGER NOT NULL,
+            id_empleado INTEGER,
+            estado TEXT NOT NULL DEFAULT 'Pendiente'
+                CHECK (estado IN ('Pendiente', 'Asignada', 'Cancelada')),
+            id_alquiler INTEGER,
+            fecha_registro TEXT NOT NULL DEFAULT (date('now')),
+            CHECK (fecha_inicio IS date(fecha_inicio) AND fecha_fin IS date(fecha_fin)
+                   AND fecha_fin >= fecha_inicio),
+            FOREIGN KEY(id_cliente) REFERENCES cliente(id_cliente) ON DELETE RESTRICT,
+            FOREIGN KEY(id_empleado) REFERENCES empleado(id_empleado) ON DELETE SET NULL,
+            FOREIGN KEY(id_alquiler) REFERENCES alquiler(id_alquiler) ON DELETE SET NULL
+        )""",
+        # Reservas pendientes de un tipo que se solapan con un período (modelo de capacidad)
+        """CREATE INDEX IF NOT EXISTS idx_reserva_categoria_tipo_fechas
+           ON reserva_categoria(estado, tipo, fecha_fin, fecha_inicio)""",
+        """CREATE INDEX IF NOT EXISTS idx_reserva_categoria_cliente
+           ON reserva_categoria(id_cliente)""",
+        # ON DELETE SET NULL al eliminar un alquiler asignado
+        """CREATE INDEX IF NOT EXISTS idx_reserva_categoria_alquiler
+           ON reserva_categoria(id_alquiler)""",
+        # El modelo de capacidad agrupa la flota por tipo
+        """CREATE INDEX IF NOT EXISTS idx_vehiculo_tipo
+           ON vehiculo(tipo)""",
+    ])
+
+
+@migracion(7, "lista de espera de solicitudes no atendidas")
+def _lista_espera(c):
+    _ejecutar_sentencias(c, [
+        """CREATE TABLE IF NOT EXISTS lista_espera (
+            id_espera INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            fecha_inicio TEXT NOT NULL,
+            fecha_fin TEXT NOT NULL,
+            id_cliente INTEGER NOT NULL,
+            id_empleado INTEGER,
+            estado TEXT NOT NULL DEFAULT 'Pendiente'
+                CHECK (estado IN ('Pendiente', 'Atendida', 'Cancelada')),
+            id_alquiler INTEGER,
+            fecha_registro TEXT NOT NULL DEFAULT (date('now')),
+            CHECK (fecha_inicio IS date(fecha_inicio) AND fecha_fin IS date(fecha_fin)
+                   AND fecha_fin >= fecha_inicio),
+            FOREIGN KEY(id_cliente) REFERENCES cliente(id_cliente) ON DELETE CASCADE,
+            FOREIGN KEY(id_empleado) REFERENCES empleado(id_empleado) ON DELETE SET NULL,
+            FOREIGN KEY(id_alquiler) REFERENCES alquiler(id_alquiler) ON DELETE SET NULL
+        )""",
+        # Solicitudes pendientes de un tipo que empiezan dentro de un hueco liberado
+        """CREATE INDEX IF NOT EXISTS idx_lista_espera_tipo_inicio
+           ON lista_espera(estado, tipo, fecha_inicio, fecha_fin)""",
+        """CREATE INDEX IF NOT EXISTS idx_lista_espera_cliente
+           ON lista_espera(id_cliente)""",
+        """CREATE INDEX IF NOT EXISTS idx_lista_espera_alquiler
+           ON lista_espera(id_alquiler)""",
+    ])
+
+
+# ----------------------------------------------------------------------
+# Resumen mensual de alquileres (mantenido por triggers)
+# ----------------------------------------------------------------------
+# Dimensiones del resumen: total del mes, por vehículo y por cliente (id = 0 en el total)
+DIMENSIONES_RESUMEN = (("total", "0"), ("vehiculo", "{fila}.id_vehiculo"), ("cliente", "{fila}.id_cliente"))
+
+
+def reconstruir_resumen_mensual(c):
+    """
+    Recalcula resumen_mensual desde la tabla alquiler (dentro de la transacción en curso)
+    Se usa al crear la tabla y como comando de reparación (database.reconstruir_resumenes)
+    """
+    c.execute("DELETE FROM resumen_mensual")
+    for dimension, clave in DIMENSIONES_RESUMEN:
+        c.execute(f"""INSERT INTO resumen_mensual (dimension, mes, id, cantidad, total)
+                      SELECT '{dimension}', substr(a.fecha_inicio, 1, 7), {clave.format(fila="a")},
+                             COUNT(*), COALESCE(SUM(a.costo_total), 0)
+                      FROM alquiler a
+                      GROUP BY 2, 3""")
+
+
+@migracion(8, "resumen mensual de alquileres por total, vehículo y cliente")
+def _resumen_mensual(c):
+    def sumar(fila, signo):
+        # UPSERT: la primera vez crea la fila del mes, después acumula
+        return "\n".join(
+            f"""INSERT INTO resumen_mensual (dimension, mes, id, cantidad, total)
+                VALUES ('{dimension}', substr({fila}.fecha_inicio, 1, 7), {clave.format(fila=fila)},
+                        {signo}1, {signo}COALESCE({fila}.costo_total, 0))
+                ON CONFLICT (dimension, mes, id) DO UPDATE
+                SET cantidad = cantidad + excluded.cantidad, total = total + excluded.total;"""
+            for dimension, clave in DIMENSIONES_RESUMEN)
+
+    # Los meses que quedan sin alquileres se eliminan (igual que un GROUP BY sobre alquiler)
+    limpiar = """DELETE FROM resumen_mensual
+                 WHERE dimension IN ('total', 'vehiculo', 'cliente')
+                   AND mes = substr(OLD.fecha_inicio, 1, 7) AND cantidad <= 0;"""
+
+    _ejecutar_sentencias(c, [
+        """CREATE TABLE IF NOT EXISTS resumen_mensual (
+            dimension TEXT NOT NULL CHECK (dimension IN ('total', 'vehiculo', 'cliente')),
+            mes TEXT NOT NULL,
+            id INTEGER NOT NULL,
+            cantidad INTEGER NOT NULL,
+            total REAL NOT NULL,
+            PRIMARY KEY (dimension, mes, id)
+        ) WITHOUT ROWID""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_mensual_insert
+            AFTER INSERT ON alquiler
+            BEGIN
+                {sumar("NEW", "")}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_mensual_delete
+            AFTER DELETE ON alquiler
+            BEGIN
+                {sumar("OLD", "-")}
+                {limpiar}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_resumen_mensual_update
+            AFTER UPDATE OF fecha_inicio, costo_total, id_vehiculo, id_cliente ON alquiler
+            BEGIN
+                {sumar("OLD", "-")}
+                {sumar("NEW", "")}
+                {limpiar}
+            END""",
+    ])
+    reconstruir_resumen_mensual(c)
+
+
+# ----------------------------------------------------------------------
+# Contadores de alquileres por cliente y por vehículo (mantenidos por triggers)
+# ----------------------------------------------------------------------
+# (tabla de la entidad, clave) -> tabla estadistica_<entidad>
+ENTIDADES_ESTADISTICA = (("cliente", "id_cliente"), ("vehiculo", "id_vehiculo"))
+
+
+def reconstruir_estadisticas(c):
+    """
+    Recalcula estadistica_cliente y estadistica_vehiculo desde la tabla alquiler
+    (dentro de la transacción en curso)
+    """
+    for entidad, clave in ENTIDADES_ESTADISTICA:
+        c.execute(f"DELETE FROM estadistica_{entidad}")
+        c.execute(f"""INSERT INTO estadistica_{entidad}
+                          ({clave}, cantidad_alquileres, total_facturado, ultimo_alquiler)
+                      SELECT e.{clave}, COUNT(a.id_alquiler), COALESCE(SUM(a.costo_total), 0),
+                             MAX(a.fecha_inicio)
+                      FROM {entidad} e
+                      LEFT JOIN alquiler a ON a.{clave} = e.{clave}
+                      GROUP BY e.{clave}""")
+
+
+@migracion(9, "contadores de alquileres por cliente y por vehículo para rankings")
+def _estadisticas_alquileres(c):
+    sentencias = []
+    for entidad, clave in ENTIDADES_ESTADISTICA:
+        tabla = f"estadistica_{entidad}"
+
+        def ajustar(fila, signo):
+            # El último alquiler se vuelve a leer del índice (id, fecha_inicio): una baja
+            # o un cambio de fecha puede retrasarlo
+            return f"""UPDATE {tabla}
+                       SET cantidad_alquileres = cantidad_alquileres {signo} 1,
+                           total_facturado = total_facturado {signo} {fila}.costo_total,
+                           ultimo_alquiler = (SELECT MAX(fecha_inicio) FROM alquiler
+                                              WHERE {clave} = {fila}.{clave})
+                       WHERE {clave} = {fila}.{clave};"""
+
+        sentencias += [
+            f"""CREATE TABLE IF NOT EXISTS {tabla} (
+                {clave} INTEGER PRIMARY KEY,
+                cantidad_alquileres INTEGER NOT NULL DEFAULT 0,
+                total_facturado REAL NOT NULL DEFAULT 0,
+                ultimo_alquiler TEXT
+            )""",
+            # Rankings: ORDER BY cantidad_alquileres DESC, total_facturado DESC LIMIT n
+            f"""CREATE INDEX IF NOT EXISTS idx_{tabla}_ranking
+               ON {tabla}(cantidad_alquileres DESC, total_facturado DESC)""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_alta
+                AFTER INSERT ON {entidad}
+                BEGIN
+                    INSERT OR IGNORE INTO {tabla} ({clave}) VALUES (NEW.{clave});
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_baja
+                AFTER DELETE ON {entidad}
+                BEGIN
+                    DELETE FROM {tabla} WHERE {clave} = OLD.{clave};
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_alquiler_insert
+                AFTER INSERT ON alquiler
+                BEGIN
+                    UPDATE {tabla}
+                    SET cantidad_alquileres = cantidad_alquileres + 1,
+                        total_facturado = total_facturado + NEW.costo_total,
+                        ultimo_alquiler = MAX(COALESCE(ultimo_alquiler, NEW.fecha_inicio), NEW.fecha_inicio)
+                    WHERE {clave} = NEW.{clave};
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_alquiler_delete
+                AFTER DELETE ON alquiler
+                BEGIN
+                    {ajustar("OLD", "-")}
+                END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_alquiler_update
+                AFTER UPDATE OF fecha_inicio, costo_total, {clave} ON alquiler
+                BEGIN
+                    {ajustar("OLD", "-")}
+                    {ajustar("NEW", "+")}
+                END""",
+        ]
+    _ejecutar_sentencias(c, sentencias)
+    reconstruir_estadisticas(c)
+
+
+
+# ----------------------------------------------------------------------
+# Versión del calendario (mantenida por triggers)
+# ----------------------------------------------------------------------
+# Tablas cuyos cambios afectan a las estructuras en memoria del calendario (índice de
+# disponibilidad, capacidad por categoría, planificador de estados)
+TABLAS_CALENDARIO = ("alquiler", "mantenimiento", "reserva_categoria", "lista_espera")
+
+
+@migracion(10, "versión del calendario: cambia solo con escrituras de alquileres, "
+               "mantenimientos, reservas, lista de espera y flota")
+def _version_calendario(c):
+    avanzar = "UPDATE version_calendario SET version = version + 1 WHERE id = 1;"
+    sentencias = [
+        """CREATE TABLE IF NOT EXISTS version_calendario (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )""",
+        "INSERT OR IGNORE INTO version_calendario (id, version) VALUES (1, 0)",
+    ]
+    for tabla in TABLAS_CALENDARIO:
+        for operacion in ("INSERT", "UPDATE", "DELETE"):
+            sentencias.append(
+                f"""CREATE TRIGGER IF NOT EXISTS trg_{tabla}_version_calendario_{operacion.lower()}
+                    AFTER {operacion} ON {tabla}
+                    BEGIN {avanzar} END""")
+    # De la flota solo importan las altas, las bajas y los cambios de tipo (capacidad):
+    # la actualización de estados no es un cambio del calendario
+    sentencias += [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_vehiculo_version_calendario_insert
+            AFTER INSERT ON vehiculo
+            BEGIN {avanzar} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_vehiculo_version_calendario_delete
+            AFTER DELETE ON vehiculo
+            BEGIN {avanzar} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_vehiculo_version_calendario_tipo
+            AFTER UPDATE OF tipo ON vehiculo
+            WHEN OLD.tipo IS NOT NEW.tipo
+            BEGIN {avanzar} END""",
+    ]
+    _ejecutar_sentencias(c, sentencias)
@@ -9,6 +9,7 @@ Herencia y Polimorfismo - Hereda de DAOBase
 
 from persistence.dao_base import DAOBase
 from entities.vehiculo import Vehiculo
+from validations import normalizar_fecha
 
 
 class VehiculoDAO(DAOBase):
@@ -17,20 +18,26 @@ class VehiculoDAO(DAOBase):
     Herencia y Polimorfismo - Implementa métodos abstractos de DAOBase
     """
     
+    _ATRIBUTO_ID = "_id_vehiculo"
+    
     def create(self, vehiculo):
         """
         Persistencia - Crea un nuevo vehículo en la base de datos
         Programación Estructurada - Función bien definida
         """
+        query, params = self._sentencia_create(vehiculo)
+        vehiculo._id_vehiculo = self._db.execute_write(query, params)
+        return vehiculo
+    
+    def _sentencia_create(self, vehiculo):
+        """
+        Persistencia - INSERT del vehiculo (usado por create y create_many)
+        """
         query = """INSERT INTO vehiculo (patente, marca, modelo, tipo, costo_diario, 
                    estado, fecha_ultimo_mantenimiento) VALUES (?,?,?,?,?,?,?)"""
         params = (vehiculo.patente, vehiculo.marca, vehiculo.modelo, vehiculo.tipo,
                  vehiculo.costo_diario, vehiculo.estado, vehiculo._fecha_ultimo_mantenimiento)
-        
-        cursor = self._db.execute_query(query, params)
-        self._db.get_connection().commit()
-        vehiculo._id_vehiculo = cursor.lastrowid
-        return vehiculo
+        return query, params
     
     def read(self, id_vehiculo):
         """
@@ -57,8 +64,7 @@ class VehiculoDAO(DAOBase):
                  vehiculo.costo_diario, vehiculo.estado, vehiculo._fecha_ultimo_mantenimiento,
                  vehiculo.id_vehiculo)
         
-        self._db.execute_query(query, params)
-        self._db.get_connection().commit()
+        self._db.execute_write(query, params)
         return vehiculo
     
     def delete(self, id_vehiculo):
@@ -67,8 +73,7 @@ class VehiculoDAO(DAOBase):
         Programación Estructurada - Función bien definida
         """
         query = "DELETE FROM vehiculo WHERE id_vehiculo = ?"
-        self._db.execute_query(query, (id_vehiculo,))
-        self._db.get_connection().commit()
+        self._db.execute_write(query, (id_vehiculo,))
         return True
     
     def list_all(self):
@@ -104,4 +109,49 @@ class VehiculoDAO(DAOBase):
         todos = self.list_all()
         # Programación Funcional - filter para obtener solo disponibles
         return list(filter(lambda v: v.esta_disponible(), todos))
-
+    
+    def listar_disponibles_en_periodo(self, fecha_inicio, fecha_fin, tipo=None, marca=None,
+                                      costo_maximo=None, limite=None, desplazamiento=0):
+        """
+        Persistencia - Lista los vehículos en estado 'Disponible' sin alquileres ni
+        mantenimientos que se solapen con [fecha_inicio, fecha_fin] (los mismos candidatos
+        que acepta registrar_alquiler)
+        Programación Estructurada - Una sola consulta (anti-join con NOT EXISTS sobre los
+        índices idx_alquiler_vehiculo_fechas e idx_mantenimiento_vehiculo_fin)
+        Filtros opcionales: tipo, marca (sin distinguir mayúsculas) y costo diario máximo
+        Paginación: limite (None = sin límite) y desplazamiento
+        """
+        fecha_inicio = normalizar_fecha(fecha_inicio)
+        fecha_fin = normalizar_fecha(fecha_fin)
+        if fecha_fin < fecha_inicio:
+            raise ValueError("La fecha de fin debe ser igual o posterior a la fecha de inicio.")
+        
+        condiciones = []
+        params = [fecha_inicio, fecha_fin, fecha_inicio, fecha_fin]
+        if tipo:
+            condiciones.append("AND v.tipo = ? COLLATE NOCASE")
+            params.append(tipo)
+        if marca:
+            condiciones.append("AND v.marca = ? COLLATE NOCASE")
+            params.append(marca)
+        if costo_maximo is not None:
+            condiciones.append("AND v.costo_diario <= ?")
+            params.append(costo_maximo)
+        # LIMIT -1 en SQLite equivale a sin límite
+        params.extend([-1 if limite is None else int(limite), int(desplazamiento)])
+        
+        query = f"""SELECT v.* FROM vehiculo v
+                   WHERE upper(v.estado) = 'DISPONIBLE'
+                     AND NOT EXISTS (SELECT 1 FROM alquiler a
+                                     WHERE a.id_vehiculo = v.id_vehiculo
+                                       AND a.fecha_fin >= ? AND a.fecha_inicio <= ?)
+                     AND NOT EXISTS (SELECT 1 FROM mantenimiento m
+                                     WHERE m.id_vehiculo = v.id_vehiculo
+                                       AND m.fecha_fin >= ? AND m.fecha_inicio <= ?)
+                     {' '.join(condiciones)}
+                   ORDER BY v.costo_diario, v.marca, v.modelo, v.id_vehiculo
+                   LIMIT ? OFFSET ?"""
+        cursor = self._db.execute_query(query, params)
+        
+        # Programación Funcional - map para transformar filas en objetos Vehiculo
+        return list(map(lambda row: Vehiculo.from_dict(dict(row)), cursor.fetchall()))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cola de escritura diferida (write-behind) con commit agrupado
+Programación Orientada a Objetos - Encapsula el thread escritor y su conexión
+Thread-Safe - Los llamadores encolan escrituras y reciben un Future con el lastrowid
+Latencia - Si un llamador espera su resultado y no hay más escrituras encoladas, el lote se
+confirma sin agotar la ventana
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_FIN = object()          # Marca de cierre de la cola
+_DESPERTAR = object()    # Un llamador empezó a esperar una escritura encolada
+
+
+class _FuturoEscritura(Future):
+    """
+    Future de una escritura encolada
+    Al llamar a result() avisa a la cola: el thread escritor deja de esperar la ventana
+    """
+
+    def __init__(self, cola, resultado=None):
+        super().__init__()
+        self._cola = cola
+        self.resultado = resultado  # función lastrowid -> valor del Future (None: el lastrowid)
+        self.esperado = False
+
+    def result(self, timeout=None):
+        if not self.esperado and not self.done():
+            self.esperado = True
+            self._cola._despertar()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        if not self.esperado and not self.done():
+            self.esperado = True
+            self._cola._despertar()
+        return super().exception(timeout)
+
+
+class WriteQueue:
+    """
+    Cola de escrituras drenada por un único thread escritor
+    Agrupa en una misma transacción las escrituras que llegan dentro de la ventana
+    de latencia (o hasta completar el lote), pagando un solo fsync por lote
+    La ventana se corta antes si la cola quedó vacía y alguien espera un resultado del lote:
+    un único productor que hace submit().result() no paga los milisegundos de la ventana
+    """
+
+    def __init__(self, abrir_conexion, ventana_ms=5, max_lote=500, al_iniciar=None, al_confirmar=None):
+        """
+        abrir_conexion: función sin argumentos que devuelve la conexión del escritor
+        ventana_ms: tiempo máximo que se espera para completar un lote
+        max_lote: cantidad máxima de escrituras por transacción
+        al_iniciar: función (conexión) llamada después del BEGIN de cada lote
+        al_confirmar: función (conexión, valor de al_iniciar) llamada antes del commit de
+                      cada lote, con el lock de escritura tomado (registro de escrituras del proceso)
+        """
+        self._abrir_conexion = abrir_conexion
+        self._al_iniciar = al_iniciar
+        self._al_confirmar = al_confirmar
+        self._ventana = max(0, ventana_ms) / 1000.0
+        self._max_lote = max(1, int(max_lote))
+        self._cola = queue.Queue()
+        self._cerrada = False
+        self._lock = threading.Lock()
+        self._estadisticas = {"escrituras": 0, "lotes": 0, "errores": 0}
+        self._thread = threading.Thread(target=self._ejecutar, name="db-write-queue", daemon=True)
+        self._thread.start()
+
+    def submit(self, query, params=(), resultado=None):
+        """
+        Encola una escritura y devuelve un Future que se resuelve con el lastrowid
+        (o con resultado(lastrowid)) una vez confirmado el commit del lote que la contiene
+        """
+        return self.submit_many([(query, params, resultado)])[0]
+
+    def submit_many(self, escrituras):
+        """
+        Encola varias escrituras seguidas: van en el mismo lote (hasta max_lote)
+        Args:
+            escrituras: tuplas (query, params) o (query, params, resultado)
+        Returns:
+            list: un Future por escritura, en el mismo orden
+        """
+        items = []
+        for escritura in escrituras:
+            query, params = escritura[0], escritura[1]
+            resultado = escritura[2] if len(escritura) > 2 else None
+            items.append((query, params or (), _FuturoEscritura(self, resultado)))
+        with self._lock:
+            if self._cerrada:
+                raise RuntimeError("La cola de escritura está cerrada.")
+            for item in items:
+                self._cola.put(item)
+        return [futuro for _, _, futuro in items]
+
+    def close(self, esperar=True):
+        """
+        Cierra la cola: las escrituras ya encoladas se confirman antes de terminar
+        """
+        with self._lock:
+            if self._cerrada:
+                return
+            self._cerrada = True
+            self._cola.put(_FIN)
+        if esperar:
+            self._thread.join()
+
+    def _despertar(self):
+        self._cola.put(_DESPERTAR)
+
+    def stats(self):
+        """Cantidad de escrituras, lotes confirmados y errores"""
+        with self._lock:
+            return dict(self._estadisticas, pendientes=self._cola.qsize())
+
+    # ------------------------------------------------------------------
+    # Thread escritor
+    # ------------------------------------------------------------------
+    def _ejecutar(self):
+        conn = self._abrir_conexion()
+        try:
+            terminar = False
+            while not terminar:
+                primero = self._cola.get()
+                if primero is _FIN:
+                    break
+                if primero is _DESPERTAR:
+                    continue
+                lote, terminar = self._completar_lote(primero)
+                self._confirmar_lote(conn, lote)
+        finally:
+            conn.close()
+
+    def _completar_lote(self, primero):
+        """
+        Junta escrituras hasta llenar el lote o agotar la ventana de latencia
+        Corta antes si la cola está vacía y un llamador espera alguna escritura del lote
+        """
+        lote = [primero]
+        esperado = primero[2].esperado
+        limite = time.monotonic() + self._ventana
+        while len(lote) < self._max_lote:
+            if esperado and self._cola.empty():
+                break
+            restante = limite - time.monotonic()
+            try:
+                item = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if item is _FIN:
+                return lote, True
+            if item is _DESPERTAR:
+                esperado = esperado or any(futuro.esperado for _, _, futuro in lote)
+                continue
+            lote.append(item)
+            esperado = esperado or item[2].esperado
+        return lote, False
+
+    def _confirmar_lote(self, conn, lote):
+        """
+        Ejecuta el lote en una transacción
+        Cada escritura va en su propio SAVEPOINT: si una falla, solo su Future recibe el error
+        """
+        resultados = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            inicio = self._al_iniciar(conn) if self._al_iniciar is not None else None
+            cursor = conn.cursor()
+            for query, params, futuro in lote:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                cursor.execute("SAVEPOINT escritura")
+                try:
+                    cursor.execute(query, params)
+                    resultados.append((futuro, cursor.lastrowid, None))
+                    cursor.execute("RELEASE escritura")
+                except Exception as e:
+                    cursor.execute("ROLLBACK TO escritura")
+                    cursor.execute("RELEASE escritura")
+                    resultados.append((futuro, None, e))
+            if self._al_confirmar is not None:
+                self._al_confirmar(conn, inicio)
+            conn.commit()
+        except Exception as e:
+            # Falló el commit (o el BEGIN): ninguna escritura del lote quedó confirmada
+            logger.error("Error confirmando lote de %d escrituras: %s", len(lote), e)
+            if conn.in_transaction:
+                conn.rollback()
+            for _, _, futuro in lote:
+                if not futuro.done():
+                    futuro.set_exception(e)
+            with self._lock:
+                self._estadisticas["errores"] += len(lote)
+            return
+
+        errores = 0
+        for futuro, lastrowid, error in resultados:
+            if error is not None:
+                errores += 1
+                futuro.set_exception(error)
+            else:
+                futuro.set_result(lastrowid if futuro.resultado is None else futuro.resultado(lastrowid))
+        with self._lock:
+            self._estadisticas["escrituras"] += len(resultados) - errores
+            self._estadisticas["errores"] += errores
+            self._estadisticas["lotes"] += 1
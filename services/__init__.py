@@ -6,7 +6,17 @@ Módulo de servicios de negocio
 Programación Orientada a Objetos - Servicios que encapsulan lógica de negocio
 """
 
-from .reportes_service import ReportesService
+from .reportes_service import ReportesService, ResultadoReporte
+from .planificador_estados import PlanificadorEstados
+from .indice_disponibilidad import IndiceDisponibilidad
+from .asignador_vehiculos import AsignadorVehiculos
+from .capacidad_categorias import CapacidadCategorias
+from .planificador_mantenimientos import PlanificadorMantenimientos
+from .auditoria import AuditoriaCalendario
+from .lista_espera import ListaEspera
+from .cache_reportes import CacheReportes
 
-__all__ = ['ReportesService']
+__all__ = ['ReportesService', 'ResultadoReporte', 'PlanificadorEstados', 'IndiceDisponibilidad',
+           'AsignadorVehiculos', 'CapacidadCategorias', 'PlanificadorMantenimientos',
+           'AuditoriaCalendario', 'ListaEspera', 'CacheReportes']
 
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Asignador de vehículos para pedidos por categoría (ej. "5 sedanes del 10 al 14")
+Programación Estructurada - Heurística de interval scheduling sobre el índice de disponibilidad
+Programación Orientada a Objetos - Encapsula la selección de vehículos concretos
+"""
+
+from datetime import date
+
+from persistence.database_connection import DatabaseConnection
+from services.indice_disponibilidad import IndiceDisponibilidad
+from models import calcular_costo
+from validations import normalizar_fecha
+
+
+class AsignadorVehiculos:
+    """
+    Elige vehículos concretos para pedidos de la forma (tipo, fecha_inicio, fecha_fin, cantidad)
+    - Los pedidos se atienden por fecha de fin más temprana (maximiza la cantidad atendida)
+    - Para cada unidad se elige el vehículo cuya ventana libre queda mejor ajustada
+      (best fit): se conservan intactas las ventanas largas de la flota
+    - Con preferir_baratos=True el costo diario tiene prioridad sobre el ajuste
+    Si no se puede atender todo, devuelve el mayor subconjunto que encontró
+    """
+
+    SQL_VEHICULOS_TIPO = """
+    SELECT id_vehiculo, patente, marca, modelo, costo_diario
+    FROM vehiculo
+    WHERE tipo = ? COLLATE NOCASE AND upper(estado) = 'DISPONIBLE'
+    """
+
+    def __init__(self):
+        self._db = DatabaseConnection()
+        self._indice = IndiceDisponibilidad()
+
+    def asignar(self, pedidos, preferir_baratos=False):
+        """
+        Args:
+            pedidos: lista de dicts con tipo, fecha_inicio, fecha_fin y cantidad (por defecto 1)
+            preferir_baratos: priorizar el menor costo_diario sobre el ajuste de ventanas
+        Returns:
+            dict: 'asignaciones' (una por vehículo asignado, con indice_pedido, id_vehiculo,
+                  patente, fechas y costo_total) y 'sin_asignar' (unidades que no se pudieron
+                  atender, con indice_pedido y el motivo)
+        """
+        unidades = []
+        sin_asignar = []
+        for indice, pedido in enumerate(pedidos):
+            try:
+                fecha_inicio = normalizar_fecha(pedido["fecha_inicio"])
+                fecha_fin = normalizar_fecha(pedido["fecha_fin"])
+            except ValueError as e:
+                sin_asignar.append({"indice_pedido": indice, "cantidad": pedido.get("cantidad", 1),
+                                    "motivo": str(e)})
+                continue
+            if fecha_fin < fecha_inicio:
+                sin_asignar.append({"indice_pedido": indice, "cantidad": pedido.get("cantidad", 1),
+                                    "motivo": "La fecha de fin debe ser igual o posterior a la fecha de inicio."})
+                continue
+            unidades.extend([(fecha_fin, fecha_inicio, indice, pedido["tipo"])] * int(pedido.get("cantidad", 1)))
+
+        # Earliest-deadline-first: la regla clásica que maximiza la cantidad de intervalos atendidos
+        unidades.sort()
+
+        vehiculos_por_tipo = {}
+        huecos = {}         # (tipo, inicio, fin) -> ventanas libres según el índice
+        asignados = {}      # id_vehiculo -> [(inicio, fin)] asignados en esta ejecución
+        asignaciones = []
+        for fecha_fin, fecha_inicio, indice, tipo in unidades:
+            if tipo not in vehiculos_por_tipo:
+                filas = self._db.execute_query(self.SQL_VEHICULOS_TIPO, (tipo,)).fetchall()
+                vehiculos_por_tipo[tipo] = {fila["id_vehiculo"]: fila for fila in filas}
+            vehiculos = vehiculos_por_tipo[tipo]
+
+            # Las unidades de un mismo pedido comparten período: el índice se consulta una vez
+            clave_periodo = (tipo, fecha_inicio, fecha_fin)
+            if clave_periodo not in huecos:
+                huecos[clave_periodo] = self._indice.huecos(vehiculos, fecha_inicio, fecha_fin)
+
+            mejor = None
+            for id_vehiculo, (anterior, siguiente) in huecos[clave_periodo].items():
+                hueco = self._ajustar_hueco(anterior, siguiente, asignados.get(id_vehiculo, ()),
+                                            fecha_inicio, fecha_fin)
+                if hueco is None:
+                    continue
+                ajuste = self._holgura(hueco[0], hueco[1], fecha_inicio, fecha_fin)
+                costo = vehiculos[id_vehiculo]["costo_diario"]
+                clave = (costo, ajuste, id_vehiculo) if preferir_baratos else (ajuste, costo, id_vehiculo)
+                if mejor is None or clave < mejor[0]:
+                    mejor = (clave, id_vehiculo)
+
+            if mejor is None:
+                sin_asignar.append({"indice_pedido": indice, "cantidad": 1,
+                                    "motivo": f"No hay vehículos de tipo {tipo} libres en el período."})
+                continue
+
+            id_vehiculo = mejor[1]
+            asignados.setdefault(id_vehiculo, []).append((fecha_inicio, fecha_fin))
+            vehiculo = vehiculos[id_vehiculo]
+            asignaciones.append({
+                "indice_pedido": indice,
+                "tipo": tipo,
+                "id_vehiculo": id_vehiculo,
+                "patente": vehiculo["patente"],
+                "vehiculo": f"{vehiculo['marca']} {vehiculo['modelo']}",
+                "fecha_inicio": fecha_inicio,
+                "fecha_fin": fecha_fin,
+                "costo_total": calcular_costo(vehiculo["costo_diario"], fecha_inicio, fecha_fin),
+            })
+
+        asignaciones.sort(key=lambda a: (a["indice_pedido"], a["id_vehiculo"]))
+        return {"asignaciones": asignaciones, "sin_asignar": sin_asignar}
+
+    @staticmethod
+    def a_solicitudes(asignaciones, id_cliente, id_empleado=None):
+        """
+        Convierte las asignaciones en solicitudes para models.registrar_alquileres
+        """
+        return [{"fecha_inicio": a["fecha_inicio"], "fecha_fin": a["fecha_fin"],
+                 "id_cliente": id_cliente, "id_vehiculo": a["id_vehiculo"],
+                 "id_empleado": id_empleado} for a in asignaciones]
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _ajustar_hueco(anterior, siguiente, tentativos, fecha_inicio, fecha_fin):
+        """Achica la ventana libre con las asignaciones hechas en esta misma ejecución"""
+        for inicio, fin in tentativos:
+            if fin >= fecha_inicio and inicio <= fecha_fin:
+                return None
+            if fin < fecha_inicio and (anterior is None or fin > anterior):
+                anterior = fin
+            if inicio > fecha_fin and (siguiente is None or inicio < siguiente):
+                siguiente = inicio
+        return anterior, siguiente
+
+    @staticmethod
+    def _holgura(anterior, siguiente, fecha_inicio, fecha_fin):
+        """
+        Clave de ajuste: (lados abiertos, días libres que quedan sueltos alrededor)
+        Una ventana sin límite (sin reservas antes/después) es la que más conviene conservar
+        """
+        abiertos = (anterior is None) + (siguiente is None)
+        dias = 0
+        if anterior is not None:
+            dias += (date.fromisoformat(fecha_inicio) - date.fromisoformat(anterior)).days - 1
+        if siguiente is not None:
+            dias += (date.fromisoformat(siguiente) - date.fromisoformat(fecha_fin)).days - 1
+        return abiertos, dias
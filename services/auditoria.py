@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Auditoría de calendario de toda la base de datos
+Programación Estructurada - Barrido (sweep line) de alquileres y mantenimientos ordenados
+por vehículo y fecha de inicio, con min-heaps de intervalos activos por fecha de fin
+(uno para alquileres y otro para mantenimientos)
+Uso desde la línea de comandos:
+    python services/auditoria.py --formato csv --salida auditoria.csv
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+from datetime import date
+
+# Agregar directorio padre al path para imports (ejecución como script)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from persistence.database_connection import DatabaseConnection
+from models import SQL_ESTADOS_DESACTUALIZADOS
+from validations import normalizar_fecha
+
+
+class AuditoriaCalendario:
+    """
+    Detecta los datos que las validaciones actuales no habrían permitido:
+    - alquiler/alquiler y alquiler/mantenimiento solapados en un mismo vehículo
+    - vehículos cuyo estado guardado no coincide con el derivado de alquileres y mantenimientos
+    Una sola lectura ordenada de ambas tablas: O(n log n + k) para k solapamientos
+    """
+
+    SQL_INTERVALOS = """
+    SELECT id_vehiculo, fecha_inicio, fecha_fin, 'alquiler' AS registro, id_alquiler AS id FROM alquiler
+    UNION ALL
+    SELECT id_vehiculo, fecha_inicio, fecha_fin, 'mantenimiento', id_mant FROM mantenimiento
+    ORDER BY id_vehiculo, fecha_inicio
+    """
+
+    SQL_PATENTES = "SELECT id_vehiculo, patente FROM vehiculo"
+
+    COLUMNAS_CSV = ("hallazgo", "id_vehiculo", "patente",
+                    "registro_a", "id_a", "inicio_a", "fin_a",
+                    "registro_b", "id_b", "inicio_b", "fin_b",
+                    "estado_guardado", "estado_derivado")
+
+    def __init__(self):
+        self._db = DatabaseConnection()
+
+    def ejecutar(self, fecha_referencia=None):
+        """
+        Returns:
+            dict: fecha_referencia, solapamientos, estados_inconsistentes y resumen (cantidades)
+        """
+        fecha_ref = normalizar_fecha(fecha_referencia if fecha_referencia is not None else date.today())
+        patentes = {fila["id_vehiculo"]: fila["patente"]
+                    for fila in self._db.execute_query(self.SQL_PATENTES).fetchall()}
+        solapamientos = self._solapamientos(patentes)
+        estados = self._estados_inconsistentes(fecha_ref)
+        return {
+            "fecha_referencia": fecha_ref,
+            "solapamientos": solapamientos,
+            "estados_inconsistentes": estados,
+            "resumen": {
+                "alquiler_alquiler": sum(1 for s in solapamientos if s["registro_b"] == "alquiler"
+                                         and s["registro_a"] == "alquiler"),
+                "alquiler_mantenimiento": sum(1 for s in solapamientos if s["registro_a"] != s["registro_b"]),
+                "estados_inconsistentes": len(estados),
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Exportación
+    # ------------------------------------------------------------------
+    def a_csv(self, resultado, destino):
+        """Escribe los hallazgos en CSV (una fila por hallazgo) en una ruta o archivo abierto"""
+        def escribir(f):
+            writer = csv.DictWriter(f, fieldnames=self.COLUMNAS_CSV, extrasaction="ignore")
+            writer.writeheader()
+            for s in resultado["solapamientos"]:
+                writer.writerow({"hallazgo": "solapamiento", **s})
+            for e in resultado["estados_inconsistentes"]:
+                writer.writerow({"hallazgo": "estado", **e})
+        self._escribir(destino, escribir, newline="")
+
+    def a_json(self, resultado, destino):
+        """Escribe el resultado completo en JSON en una ruta o archivo abierto"""
+        self._escribir(destino, lambda f: json.dump(resultado, f, ensure_ascii=False, indent=2))
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+    def _solapamientos(self, patentes):
+        encontrados = []
+        vehiculo_actual = None
+        # Heaps de (fecha_fin, id, fecha_inicio) activos del vehículo actual, separados por
+        # registro: dos mantenimientos a la vez no son una colisión de reservas, así que un
+        # mantenimiento solo se compara con los alquileres activos
+        activos = {"alquiler": [], "mantenimiento": []}
+        with self._db.lector() as conn:
+            for id_vehiculo, inicio, fin, registro, id_registro in conn.execute(self.SQL_INTERVALOS):
+                if id_vehiculo != vehiculo_actual:
+                    vehiculo_actual = id_vehiculo
+                    activos = {"alquiler": [], "mantenimiento": []}
+                comparar = ("alquiler", "mantenimiento") if registro == "alquiler" else ("alquiler",)
+                for registro_a in comparar:
+                    heap = activos[registro_a]
+                    # Los intervalos que terminaron antes de este inicio ya no pueden solaparse:
+                    # todos los que quedan en el heap son solapamientos
+                    while heap and heap[0][0] < inicio:
+                        heapq.heappop(heap)
+                    for fin_a, id_a, inicio_a in heap:
+                        encontrados.append({
+                            "id_vehiculo": id_vehiculo, "patente": patentes.get(id_vehiculo),
+                            "registro_a": registro_a, "id_a": id_a, "inicio_a": inicio_a, "fin_a": fin_a,
+                            "registro_b": registro, "id_b": id_registro, "inicio_b": inicio, "fin_b": fin,
+                        })
+                heapq.heappush(activos[registro], (fin, id_registro, inicio))
+        return encontrados
+
+    def _estados_inconsistentes(self, fecha_ref):
+        # Misma comparación que usa actualizar_estados_vehiculos para decidir qué reescribir
+        filas = self._db.execute_query(SQL_ESTADOS_DESACTUALIZADOS.format(filtro=""),
+                                       {"ref": fecha_ref}).fetchall()
+        return [{"id_vehiculo": f["id_vehiculo"], "patente": f["patente"],
+                 "estado_guardado": f["estado"], "estado_derivado": f["estado_nuevo"]}
+                for f in filas]
+
+    @staticmethod
+    def _escribir(destino, escribir, newline=None):
+        if hasattr(destino, "write"):
+            escribir(destino)
+            return
+        with open(destino, "w", encoding="utf-8", newline=newline) as f:
+            escribir(f)
+
+
+def main(argv=None):
+    """Línea de comandos: imprime el resumen y escribe el reporte (stdout si no hay --salida)"""
+    parser = argparse.ArgumentParser(description="Auditoría de solapamientos y estados de vehículos")
+    parser.add_argument("--formato", choices=("csv", "json"), default="csv")
+    parser.add_argument("--salida", help="archivo de salida (por defecto, salida estándar)")
+    parser.add_argument("--fecha", help="fecha de referencia para el estado derivado (YYYY-MM-DD)")
+    args = parser.parse_args(argv)
+
+    auditoria = AuditoriaCalendario()
+    resultado = auditoria.ejecutar(args.fecha)
+    exportar = auditoria.a_csv if args.formato == "csv" else auditoria.a_json
+    exportar(resultado, args.salida or sys.stdout)
+
+    resumen = resultado["resumen"]
+    print(f"Solapamientos alquiler/alquiler: {resumen['alquiler_alquiler']}, "
+          f"alquiler/mantenimiento: {resumen['alquiler_mantenimiento']}, "
+          f"estados inconsistentes: {resumen['estados_inconsistentes']}", file=sys.stderr)
+    # Código de salida distinto de cero si hay hallazgos (útil en tareas programadas)
+    return 1 if any(resumen.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Caché de resultados de reportes
+Programación Funcional - Decorador que envuelve los métodos de ReportesService
+Patrón Singleton - Una única caché compartida por todas las instancias del servicio
+"""
+
+import functools
+import threading
+from collections import OrderedDict
+
+from persistence.database_connection import DatabaseConnection
+from config import REPORTES_CACHE_MAX_ENTRADAS
+
+
+class CacheReportes:
+    """
+    Resultados por (método, argumentos) con desalojo LRU
+    Antes de cada consulta se lee PRAGMA data_version: si alguna conexión confirmó
+    cambios desde que se guardaron los resultados, se descartan todos (nunca se
+    devuelven datos viejos). El resultado se guarda con la versión leída antes de
+    calcularlo: si otra escritura se confirma en el medio, la próxima consulta no acierta
+    """
+
+    _instance = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock_instancia:
+                if cls._instance is None:
+                    instancia = super(CacheReportes, cls).__new__(cls)
+                    instancia._inicializar()
+                    cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        self._db = DatabaseConnection()
+        self._entradas = OrderedDict()      # clave -> resultado (el más reciente al final)
+        self._version = None
+        self.max_entradas = REPORTES_CACHE_MAX_ENTRADAS
+        self._aciertos = 0
+        self._fallos = 0
+        self._desalojos = 0
+        self._invalidaciones = 0
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, calcular):
+        """
+        Devuelve el resultado guardado para la clave o lo calcula con calcular()
+        Returns:
+            una copia del resultado (quien lo recibe puede modificarlo)
+        """
+        if self._db.en_transaccion():
+            # Con una transacción abierta el thread lee sus cambios sin confirmar:
+            # no se sirven ni se guardan resultados en la caché compartida
+            return calcular()
+        version = self._db.version_datos()
+        with self._lock:
+            if version != self._version:
+                if self._entradas:
+                    self._invalidaciones += 1
+                self._entradas.clear()
+                self._version = version
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                self._aciertos += 1
+                return _copiar(self._entradas[clave])
+            self._fallos += 1
+
+        # La consulta corre sin tomar el lock: otros reportes no esperan
+        resultado = calcular()
+        with self._lock:
+            if version == self._version and self.max_entradas > 0:
+                self._entradas[clave] = resultado
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.max_entradas:
+                    self._entradas.popitem(last=False)
+                    self._desalojos += 1
+        return _copiar(resultado)
+
+    def limpiar(self):
+        """Descarta todos los resultados (las estadísticas se conservan)"""
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: aciertos, fallos, tasa_aciertos, desalojos, invalidaciones,
+                  entradas y max_entradas
+        """
+        with self._lock:
+            consultas = self._aciertos + self._fallos
+            return {
+                "aciertos": self._aciertos,
+                "fallos": self._fallos,
+                "tasa_aciertos": self._aciertos / consultas if consultas else 0.0,
+                "desalojos": self._desalojos,
+                "invalidaciones": self._invalidaciones,
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+            }
+
+
+def cache_reporte(metodo):
+    """
+    Decorador para métodos de reportes: la clave es el nombre del método y sus argumentos
+    (deben ser hashables; si no lo son, se consulta la base sin caché)
+    """
+    @functools.wraps(metodo)
+    def envoltura(self, *args, **kwargs):
+        clave = (metodo.__qualname__, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(clave)
+        except TypeError:
+            return metodo(self, *args, **kwargs)
+        return CacheReportes().obtener(clave, lambda: metodo(self, *args, **kwargs))
+    return envoltura
+
+
+def _copiar(resultado):
+    # Los reportes devuelven listas de dicts: alcanza con copiar cada fila
+    if isinstance(resultado, list):
+        return [dict(fila) if isinstance(fila, dict) else fila for fila in resultado]
+    return resultado
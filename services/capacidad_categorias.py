@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Modelo de capacidad por categoría (tipo de vehículo) y por día
+Programación Estructurada - Un array de contadores diarios por tipo (módulo array)
+Patrón Observer - Se actualiza en forma incremental con los eventos del calendario
+"""
+
+import json
+import threading
+from array import array
+from datetime import date, timedelta
+
+from persistence.database_connection import DatabaseConnection, VersionObservada
+from patterns.observer import Observer, CalendarioNotifier
+from validations import normalizar_fecha
+
+
+class CapacidadCategorias(Observer):
+    """
+    Para cada tipo guarda flota[tipo] (vehículos de ese tipo) y uso[tipo][día]
+    (vehículos ocupados por alquileres o mantenimientos + reservas por categoría pendientes)
+    "¿Puedo vender otra PickUp en estas fechas?" es flota - max(uso[tipo][desde:hasta]) > 0
+    El horizonte empieza hoy; si se consulta más allá, se amplía y se recarga
+    Patrón Singleton - Una única instancia suscrita al calendario
+    """
+
+    DIAS_HORIZONTE = 730
+
+    _EVENTOS = ("alquiler_creado", "alquiler_modificado", "alquiler_eliminado",
+                "mantenimiento_creado", "mantenimiento_eliminado",
+                "reserva_creada", "reserva_cancelada", "reserva_asignada")
+
+    SQL_FLOTA = """
+    SELECT id_vehiculo, tipo FROM vehiculo WHERE tipo IS NOT NULL
+    """
+
+    SQL_OCUPACION = """
+    SELECT v.tipo, a.fecha_inicio, a.fecha_fin
+    FROM alquiler a JOIN vehiculo v ON v.id_vehiculo = a.id_vehiculo
+    WHERE a.fecha_fin >= :desde AND a.fecha_inicio <= :hasta AND v.tipo IS NOT NULL
+    UNION ALL
+    SELECT v.tipo, m.fecha_inicio, m.fecha_fin
+    FROM mantenimiento m JOIN vehiculo v ON v.id_vehiculo = m.id_vehiculo
+    WHERE m.fecha_fin >= :desde AND m.fecha_inicio <= :hasta AND v.tipo IS NOT NULL
+    UNION ALL
+    SELECT tipo, fecha_inicio, fecha_fin
+    FROM reserva_categoria
+    WHERE estado = 'Pendiente' AND fecha_fin >= :desde AND fecha_inicio <= :hasta
+    """
+
+    # Flota y ocupación de algunos tipos (:tipos es un array JSON): se leen dentro de una
+    # transacción de escritura cuando el modelo no refleja su versión del calendario
+    SQL_FLOTA_TIPOS = """
+    SELECT tipo, COUNT(*) AS cantidad FROM vehiculo
+    WHERE tipo IN (SELECT value FROM json_each(:tipos))
+    GROUP BY tipo
+    """
+
+    SQL_OCUPACION_TIPOS = f"""
+    SELECT * FROM ({SQL_OCUPACION})
+    WHERE tipo IN (SELECT value FROM json_each(:tipos))
+    """
+
+    _instance = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock_instancia:
+                if cls._instance is None:
+                    instancia = super(CapacidadCategorias, cls).__new__(cls)
+                    instancia._inicializar()
+                    cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        self._db = DatabaseConnection()
+        self._base = None           # date del índice 0 de los arrays
+        self._dias = 0
+        self._flota = {}            # tipo -> cantidad de vehículos
+        self._uso = {}              # tipo -> array('i') de ocupación diaria
+        self._tipo_vehiculo = {}    # id_vehiculo -> tipo
+        self._version = VersionObservada(self._db)
+        self._lock = threading.RLock()
+        CalendarioNotifier().attach(self)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def disponibles(self, tipo, fecha_inicio, fecha_fin):
+        """
+        Cantidad de vehículos del tipo que se pueden vender para todo el período
+        (mínimo diario de flota - uso)
+        """
+        with self._lock:
+            desde, hasta = self._preparar(fecha_inicio, fecha_fin)
+            uso = self._uso.get(tipo)
+            if uso is None:
+                return self._flota.get(tipo, 0)
+            return self._flota.get(tipo, 0) - (max(uso[desde:hasta]) if hasta > desde else 0)
+
+    def disponibilidad_diaria(self, tipo, fecha_inicio, fecha_fin):
+        """Lista de (fecha ISO, vehículos disponibles) para cada día del período"""
+        with self._lock:
+            desde, hasta = self._preparar(fecha_inicio, fecha_fin)
+            flota = self._flota.get(tipo, 0)
+            uso = self._uso.get(tipo) or array('i', bytes(4 * self._dias))
+            return [((self._base + timedelta(days=i)).isoformat(), flota - uso[i])
+                    for i in range(desde, hasta)]
+
+    def admite(self, solicitudes, cursor=None):
+        """
+        Verifica un conjunto de solicitudes (tipo, fecha_inicio, fecha_fin) como si se
+        vendieran en orden: cada una consume capacidad para las siguientes
+        cursor: cursor de una transacción BEGIN IMMEDIATE abierta. Con cursor el modelo nunca
+        se recarga (sería leer tablas enteras con el lock de escritura tomado): si no refleja
+        la versión del calendario de la transacción, se leen solo los tipos y el período
+        de las solicitudes. Conviene llamar antes a preparar()
+        Returns:
+            list: un bool por solicitud
+        """
+        solicitudes = [(tipo, normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin))
+                       for tipo, fecha_inicio, fecha_fin in solicitudes]
+        with self._lock:
+            if cursor is None:
+                for _, fecha_inicio, fecha_fin in solicitudes:
+                    self._preparar(fecha_inicio, fecha_fin)
+                base, flota_tipos, uso_tipos = self._base, self._flota, self._uso
+            else:
+                base, flota_tipos, uso_tipos = self._contadores_en_transaccion(cursor, solicitudes)
+
+            extra = {}      # tipo -> {día: uso adicional de las solicitudes ya aceptadas}
+            resultado = []
+            for tipo, fecha_inicio, fecha_fin in solicitudes:
+                desde, hasta = self._indices(base, fecha_inicio, fecha_fin)
+                flota = flota_tipos.get(tipo, 0)
+                uso = uso_tipos.get(tipo)
+                sumado = extra.setdefault(tipo, {})
+                maximo = max(((uso[i] if uso else 0) + sumado.get(i, 0) for i in range(desde, hasta)),
+                             default=0)
+                acepta = maximo < flota
+                if acepta:
+                    for i in range(desde, hasta):
+                        sumado[i] = sumado.get(i, 0) + 1
+                resultado.append(acepta)
+            return resultado
+
+    def preparar(self, fecha_inicio=None, fecha_fin=None):
+        """
+        Carga o actualiza el modelo para el período (por defecto, el horizonte desde hoy)
+        Se llama antes de abrir la transacción de escritura que usa admite(..., cursor)
+        """
+        hoy = date.today()
+        with self._lock:
+            self._preparar(fecha_inicio or hoy, fecha_fin or hoy)
+
+    def tipo_de(self, id_vehiculo):
+        """Tipo del vehículo según el modelo (None si no tiene tipo)"""
+        with self._lock:
+            self._verificar_version()
+            if self._base is None:
+                self._cargar(date.today(), self.DIAS_HORIZONTE)
+            return self._tipo_vehiculo.get(id_vehiculo)
+
+    def invalidar(self):
+        """Descarta el modelo: se vuelve a cargar en la próxima consulta"""
+        with self._lock:
+            self._base = None
+            self._version.invalidar()
+
+    # ------------------------------------------------------------------
+    # Patrón Observer
+    # ------------------------------------------------------------------
+    def update(self, event_type, data):
+        """
+        Patrón Observer - Suma o resta un día de uso por cada día del registro afectado
+        Los contadores no admiten aplicar dos veces un cambio: solo se suma si la escritura
+        del evento es el único cambio desde la versión cargada; si no, se recarga
+        """
+        if event_type not in self._EVENTOS:
+            return
+        with self._lock:
+            if self._base is None:
+                return  # Sin cargar: se leerá todo de la base en la próxima consulta
+            if not self._version.aplicar_evento():
+                self._base = None
+                return
+            if event_type.startswith("reserva_"):
+                tipo = data["tipo"]
+            elif data.get("id_vehiculo") in self._tipo_vehiculo:
+                tipo = self._tipo_vehiculo[data["id_vehiculo"]]
+            else:
+                # Vehículo desconocido (alta reciente o sin tipo): recargar es lo más simple
+                self.invalidar()
+                return
+
+            if event_type in ("alquiler_creado", "mantenimiento_creado", "reserva_creada"):
+                self._sumar(tipo, data["fecha_inicio"], data["fecha_fin"], 1)
+            elif event_type in ("alquiler_eliminado", "mantenimiento_eliminado",
+                                "reserva_cancelada", "reserva_asignada"):
+                self._sumar(tipo, data["fecha_inicio"], data["fecha_fin"], -1)
+            elif event_type == "alquiler_modificado":
+                self._sumar(tipo, data["fecha_inicio_anterior"], data["fecha_fin_anterior"], -1)
+                self._sumar(tipo, data["fecha_inicio"], data["fecha_fin"], 1)
+
+    # ------------------------------------------------------------------
+    # Auxiliares (requieren tener tomado self._lock)
+    # ------------------------------------------------------------------
+    def _verificar_version(self):
+        if not self._version.vigente():
+            # Hubo cambios del calendario que no pasaron por sus eventos
+            self._base = None
+
+    def _preparar(self, fecha_inicio, fecha_fin):
+        """Carga o amplía el modelo si hace falta y devuelve el rango [desde, hasta) de índices"""
+        fin = date.fromisoformat(normalizar_fecha(fecha_fin))
+        self._verificar_version()
+        hoy = date.today()
+        if self._base is None or self._base != hoy or (fin - self._base).days >= self._dias:
+            self._cargar(hoy, max(self.DIAS_HORIZONTE, (fin - hoy).days + 1))
+        return self._indices(self._base, fecha_inicio, fecha_fin)
+
+    @staticmethod
+    def _indices(base, fecha_inicio, fecha_fin):
+        """Rango [desde, hasta) de índices del período respecto del día base"""
+        desde = max(0, (date.fromisoformat(normalizar_fecha(fecha_inicio)) - base).days)
+        hasta = max(desde, (date.fromisoformat(normalizar_fecha(fecha_fin)) - base).days + 1)
+        return desde, hasta
+
+    def _contadores_en_transaccion(self, cursor, solicitudes):
+        """
+        (base, flota, uso) para verificar las solicitudes dentro de una transacción de escritura
+        Con el lock tomado la versión del calendario leída en la transacción es exacta: si el
+        modelo la refleja se usa tal cual; si no, se arman contadores solo para esos tipos
+        """
+        conn = cursor.connection
+        hoy = date.today()
+        dias = max(1, max((date.fromisoformat(fecha_fin) - hoy).days + 1 for _, _, fecha_fin in solicitudes))
+        if (self._base == hoy and dias <= self._dias
+                and self._version.coincide(self._db.version_calendario(conn))):
+            return self._base, self._flota, self._uso
+
+        tipos = json.dumps(sorted({tipo for tipo, _, _ in solicitudes}))
+        flota = {fila["tipo"]: fila["cantidad"]
+                 for fila in conn.execute(self.SQL_FLOTA_TIPOS, {"tipos": tipos}).fetchall()}
+        hasta = (hoy + timedelta(days=dias - 1)).isoformat()
+        filas = conn.execute(self.SQL_OCUPACION_TIPOS,
+                             {"tipos": tipos, "desde": hoy.isoformat(), "hasta": hasta}).fetchall()
+        return hoy, flota, self._acumular(filas, hoy, dias)
+
+    def _cargar(self, base, dias):
+        self._version.marcar()
+        self._base = base
+        self._dias = dias
+        self._flota = {}
+        self._tipo_vehiculo = {}
+        for fila in self._db.execute_query(self.SQL_FLOTA).fetchall():
+            self._tipo_vehiculo[fila["id_vehiculo"]] = fila["tipo"]
+            self._flota[fila["tipo"]] = self._flota.get(fila["tipo"], 0) + 1
+
+        hasta = (base + timedelta(days=dias - 1)).isoformat()
+        filas = self._db.execute_query(self.SQL_OCUPACION,
+                                       {"desde": base.isoformat(), "hasta": hasta}).fetchall()
+        self._uso = self._acumular(filas, base, dias)
+        self._version.confirmar_carga()
+
+    @classmethod
+    def _acumular(cls, filas, base, dias):
+        """Uso diario por tipo (tipo -> array) a partir de filas (tipo, fecha_inicio, fecha_fin)"""
+        # Arreglo de diferencias: +1 el día de inicio, -1 el día siguiente al fin
+        diferencias = {}
+        for fila in filas:
+            desde_i, hasta_i = cls._rango(base, dias, fila["fecha_inicio"], fila["fecha_fin"])
+            d = diferencias.setdefault(fila["tipo"], array('i', bytes(4 * (dias + 1))))
+            d[desde_i] += 1
+            d[hasta_i] -= 1
+
+        usos = {}
+        for tipo, d in diferencias.items():
+            uso = array('i', bytes(4 * dias))
+            acumulado = 0
+            for i in range(dias):
+                acumulado += d[i]
+                uso[i] = acumulado
+            usos[tipo] = uso
+        return usos
+
+    @staticmethod
+    def _rango(base, dias, fecha_inicio, fecha_fin):
+        """Índices [desde, hasta) del período recortado al horizonte"""
+        desde = (date.fromisoformat(fecha_inicio) - base).days
+        hasta = (date.fromisoformat(fecha_fin) - base).days + 1
+        return min(max(desde, 0), dias), min(max(hasta, 0), dias)
+
+    def _sumar(self, tipo, fecha_inicio, fecha_fin, delta):
+        desde, hasta = self._rango(self._base, self._dias,
+                                   normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin))
+        if desde >= hasta:
+            return
+        uso = self._uso.setdefault(tipo, array('i', bytes(4 * self._dias)))
+        for i in range(desde, hasta):
+            uso[i] += delta
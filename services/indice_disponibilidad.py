@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Índice de disponibilidad en memoria
+Programación Estructurada - Intervalos ordenados por vehículo con búsqueda binaria (bisect)
+Patrón Observer - Se mantiene sincronizado con los eventos del calendario (CalendarioNotifier)
+"""
+
+import bisect
+import heapq
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+
+from persistence.database_connection import DatabaseConnection, VersionObservada
+from patterns.observer import Observer, CalendarioNotifier
+from validations import normalizar_fecha
+
+
+# Las fechas de los intervalos se repiten mucho entre vehículos: se cachea la aritmética
+@lru_cache(maxsize=4096)
+def _dia_siguiente(fecha):
+    return (date.fromisoformat(fecha) + timedelta(days=1)).isoformat()
+
+
+@lru_cache(maxsize=4096)
+def _dia_anterior(fecha):
+    return (date.fromisoformat(fecha) - timedelta(days=1)).isoformat()
+
+
+class _IntervalosVehiculo:
+    """
+    Alquileres y mantenimientos de un vehículo ordenados por fecha de inicio
+    max_fin[i] es la mayor fecha de fin entre los intervalos 0..i: permite saber
+    con una búsqueda binaria si algún intervalo que empieza antes de b termina después de a
+    """
+
+    __slots__ = ("inicios", "intervalos", "max_fin")
+
+    def __init__(self, intervalos=()):
+        # intervalo: (fecha_inicio, fecha_fin, tipo, id)
+        self.intervalos = sorted(intervalos)
+        self.inicios = [i[0] for i in self.intervalos]
+        self.max_fin = []
+        self._recalcular_max(0)
+
+    def agregar(self, intervalo):
+        pos = bisect.bisect_right(self.intervalos, intervalo)
+        self.intervalos.insert(pos, intervalo)
+        self.inicios.insert(pos, intervalo[0])
+        self._recalcular_max(pos)
+
+    def quitar(self, tipo, id_registro):
+        for pos, intervalo in enumerate(self.intervalos):
+            if intervalo[2] == tipo and intervalo[3] == id_registro:
+                del self.intervalos[pos]
+                del self.inicios[pos]
+                self._recalcular_max(pos)
+                return intervalo
+        return None
+
+    def conflictos(self, fecha_inicio, fecha_fin):
+        """Intervalos que se solapan con [fecha_inicio, fecha_fin] (fechas ISO)"""
+        pos = bisect.bisect_right(self.inicios, fecha_fin) - 1
+        encontrados = []
+        # Si el máximo de los fines hasta pos es anterior al inicio pedido, no hay más solapados
+        while pos >= 0 and self.max_fin[pos] >= fecha_inicio:
+            if self.intervalos[pos][1] >= fecha_inicio:
+                encontrados.append(self.intervalos[pos])
+            pos -= 1
+        encontrados.reverse()
+        return encontrados
+
+    def libre(self, fecha_inicio, fecha_fin):
+        pos = bisect.bisect_right(self.inicios, fecha_fin) - 1
+        return pos < 0 or self.max_fin[pos] < fecha_inicio
+
+    def hueco(self, fecha_inicio, fecha_fin):
+        """
+        Ventana libre que contiene [fecha_inicio, fecha_fin]
+        Returns:
+            tuple: (fin del intervalo anterior o None, inicio del siguiente o None),
+                   o None si el período no está libre
+        """
+        pos = bisect.bisect_right(self.inicios, fecha_fin)
+        if pos > 0 and self.max_fin[pos - 1] >= fecha_inicio:
+            return None
+        anterior = self.max_fin[pos - 1] if pos > 0 else None
+        siguiente = self.inicios[pos] if pos < len(self.inicios) else None
+        return anterior, siguiente
+
+    def ventanas(self, desde):
+        """
+        Barrido de los intervalos ordenados: genera las ventanas libres maximales a partir
+        de desde, en orden, como (inicio, fin) con fin=None para la última (sin límite)
+        """
+        pos = bisect.bisect_left(self.inicios, desde)
+        cursor = desde
+        # Los intervalos que empiezan antes de desde pueden cubrirlo
+        if pos > 0 and self.max_fin[pos - 1] >= cursor:
+            cursor = _dia_siguiente(self.max_fin[pos - 1])
+        for inicio, fin, _, _ in self.intervalos[pos:]:
+            if fin < cursor:
+                continue  # Contenido en un intervalo anterior
+            if inicio > cursor:
+                yield cursor, _dia_anterior(inicio)
+            cursor = max(cursor, _dia_siguiente(fin))
+        yield cursor, None
+
+    def _recalcular_max(self, desde):
+        del self.max_fin[desde:]
+        maximo = self.max_fin[-1] if self.max_fin else ""
+        for intervalo in self.intervalos[desde:]:
+            maximo = max(maximo, intervalo[1])
+            self.max_fin.append(maximo)
+
+
+class IndiceDisponibilidad(Observer):
+    """
+    Responde "¿el vehículo X está libre en [a, b]?" y "¿por qué no?" sin consultar SQLite
+    - Cada vehículo se carga la primera vez que se consulta (o todos con cargar_todo)
+    - Los eventos del calendario agregan/quitan intervalos de los vehículos ya cargados,
+      solo si su escritura es el único cambio desde la versión que refleja el índice
+    - Los cambios del calendario que no pasaron por los eventos (DAOs, otros procesos) se
+      detectan con VersionObservada: en ese caso el índice se descarta y se vuelve a cargar
+      bajo demanda
+    Patrón Singleton - Una única instancia suscrita al calendario
+    """
+
+    SQL_INTERVALOS_VEHICULO = """
+    SELECT fecha_inicio, fecha_fin, 'alquiler' AS tipo, id_alquiler AS id
+    FROM alquiler WHERE id_vehiculo = ?
+    UNION ALL
+    SELECT fecha_inicio, fecha_fin, 'mantenimiento', id_mant
+    FROM mantenimiento WHERE id_vehiculo = ?
+    """
+
+    SQL_INTERVALOS_TODOS = """
+    SELECT id_vehiculo, fecha_inicio, fecha_fin, 'alquiler' AS tipo, id_alquiler AS id FROM alquiler
+    UNION ALL
+    SELECT id_vehiculo, fecha_inicio, fecha_fin, 'mantenimiento', id_mant FROM mantenimiento
+    """
+
+    _EVENTOS = {
+        "alquiler_creado": ("alquiler", "id_alquiler"),
+        "alquiler_modificado": ("alquiler", "id_alquiler"),
+        "alquiler_eliminado": ("alquiler", "id_alquiler"),
+        "mantenimiento_creado": ("mantenimiento", "id_mant"),
+        "mantenimiento_eliminado": ("mantenimiento", "id_mant"),
+    }
+
+    _instance = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock_instancia:
+                if cls._instance is None:
+                    instancia = super(IndiceDisponibilidad, cls).__new__(cls)
+                    instancia._inicializar()
+                    cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        self._db = DatabaseConnection()
+        self._vehiculos = {}        # id_vehiculo -> _IntervalosVehiculo
+        self._completo = False      # True si se cargaron todos los vehículos
+        self._version = VersionObservada(self._db)
+        self._lock = threading.RLock()
+        CalendarioNotifier().attach(self)
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+    def esta_libre(self, id_vehiculo, fecha_inicio, fecha_fin):
+        """True si el vehículo no tiene alquileres ni mantenimientos en [fecha_inicio, fecha_fin]"""
+        fecha_inicio, fecha_fin = normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin)
+        with self._lock:
+            return self._intervalos(id_vehiculo).libre(fecha_inicio, fecha_fin)
+
+    def motivo(self, id_vehiculo, fecha_inicio, fecha_fin):
+        """
+        Registros que impiden usar el vehículo en [fecha_inicio, fecha_fin]
+        Returns:
+            list: dicts con tipo ('alquiler' o 'mantenimiento'), id, fecha_inicio y fecha_fin
+                  (lista vacía si el vehículo está libre)
+        """
+        fecha_inicio, fecha_fin = normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin)
+        with self._lock:
+            conflictos = self._intervalos(id_vehiculo).conflictos(fecha_inicio, fecha_fin)
+        return [{"tipo": tipo, "id": id_registro, "fecha_inicio": inicio, "fecha_fin": fin}
+                for inicio, fin, tipo, id_registro in conflictos]
+
+    def en_mantenimiento(self, id_vehiculo, fecha_inicio, fecha_fin):
+        """True si algún mantenimiento del vehículo se solapa con el período"""
+        return any(m["tipo"] == "mantenimiento" for m in self.motivo(id_vehiculo, fecha_inicio, fecha_fin))
+
+    def libres(self, ids_vehiculo, fecha_inicio, fecha_fin):
+        """
+        Filtra los vehículos libres en el período (cotización de varios candidatos)
+        Carga todo el índice con una sola consulta si todavía no estaba cargado
+        """
+        fecha_inicio, fecha_fin = normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin)
+        with self._lock:
+            self.cargar_todo()
+            return [id_vehiculo for id_vehiculo in ids_vehiculo
+                    if self._intervalos(id_vehiculo, verificar=False).libre(fecha_inicio, fecha_fin)]
+
+    def hueco(self, id_vehiculo, fecha_inicio, fecha_fin):
+        """
+        Ventana libre del vehículo que contiene el período (ver _IntervalosVehiculo.hueco)
+        """
+        fecha_inicio, fecha_fin = normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin)
+        with self._lock:
+            return self._intervalos(id_vehiculo).hueco(fecha_inicio, fecha_fin)
+
+    def huecos(self, ids_vehiculo, fecha_inicio, fecha_fin):
+        """
+        Ventana libre de cada vehículo para el período (carga todo el índice una vez)
+        Returns:
+            dict: id_vehiculo -> (fin anterior, inicio siguiente), solo vehículos libres
+        """
+        fecha_inicio, fecha_fin = normalizar_fecha(fecha_inicio), normalizar_fecha(fecha_fin)
+        with self._lock:
+            self.cargar_todo()
+            resultado = {}
+            for id_vehiculo in ids_vehiculo:
+                hueco = self._intervalos(id_vehiculo, verificar=False).hueco(fecha_inicio, fecha_fin)
+                if hueco is not None:
+                    resultado[id_vehiculo] = hueco
+            return resultado
+
+    def ventanas_libres(self, ids_vehiculo, desde):
+        """
+        Ventanas libres maximales de cada vehículo a partir de desde (ver _IntervalosVehiculo.ventanas)
+        Returns:
+            dict: id_vehiculo -> lista de (inicio, fin o None)
+        """
+        desde = normalizar_fecha(desde)
+        with self._lock:
+            self.cargar_todo()
+            return {id_vehiculo: list(self._intervalos(id_vehiculo, verificar=False).ventanas(desde))
+                    for id_vehiculo in ids_vehiculo}
+
+    def proximas_ventanas(self, ids_vehiculo, dias, desde=None, cantidad=5):
+        """
+        Primeras ventanas libres de al menos `dias` días a partir de `desde` (hoy por defecto)
+        Programación Estructurada - Un barrido por vehículo sobre sus intervalos ordenados;
+        los barridos se combinan por fecha de inicio (heapq.merge) y se cortan al llegar a
+        `cantidad`, así solo se recorre lo necesario
+        Returns:
+            list: dicts con id_vehiculo, fecha_inicio y fecha_fin (período propuesto de
+                  `dias` días) y libre_hasta (último día libre, None si no hay límite)
+        """
+        if dias < 1:
+            raise ValueError("La duración debe ser de al menos un día.")
+        desde = normalizar_fecha(desde if desde is not None else date.today())
+        
+        def ventanas_que_alcanzan(id_vehiculo, intervalos):
+            for inicio, fin in intervalos.ventanas(desde):
+                propuesto_fin = (date.fromisoformat(inicio) + timedelta(days=dias - 1)).isoformat()
+                if fin is None or propuesto_fin <= fin:
+                    yield inicio, id_vehiculo, propuesto_fin, fin
+        
+        with self._lock:
+            self.cargar_todo()
+            barridos = [ventanas_que_alcanzan(id_vehiculo, self._intervalos(id_vehiculo, verificar=False))
+                        for id_vehiculo in ids_vehiculo]
+            resultado = []
+            for inicio, id_vehiculo, propuesto_fin, fin in heapq.merge(*barridos):
+                resultado.append({"id_vehiculo": id_vehiculo, "fecha_inicio": inicio,
+                                  "fecha_fin": propuesto_fin, "libre_hasta": fin})
+                if len(resultado) >= cantidad:
+                    break
+            return resultado
+
+    # ------------------------------------------------------------------
+    # Carga e invalidación
+    # ------------------------------------------------------------------
+    def cargar_todo(self):
+        """Carga los intervalos de todos los vehículos con una sola consulta"""
+        with self._lock:
+            self._verificar_version()
+            if self._completo:
+                return
+            agrupados = {}
+            for fila in self._db.execute_query(self.SQL_INTERVALOS_TODOS).fetchall():
+                agrupados.setdefault(fila["id_vehiculo"], []).append(
+                    (fila["fecha_inicio"], fila["fecha_fin"], fila["tipo"], fila["id"]))
+            self._vehiculos = {id_vehiculo: _IntervalosVehiculo(intervalos)
+                               for id_vehiculo, intervalos in agrupados.items()}
+            self._completo = True
+
+    def invalidar(self):
+        """Descarta el índice: se vuelve a cargar en la próxima consulta"""
+        with self._lock:
+            self._vehiculos = {}
+            self._completo = False
+            self._version.invalidar()
+
+    def update(self, event_type, data):
+        """
+        Patrón Observer - Aplica al índice el alta, cambio o baja informada por models
+        """
+        if event_type not in self._EVENTOS:
+            return
+        tipo, clave = self._EVENTOS[event_type]
+        with self._lock:
+            if not self._version.aplicar_evento():
+                # Hubo otros cambios además del evento: se recarga en la próxima consulta
+                self._vehiculos = {}
+                self._completo = False
+                return
+            intervalos = self._vehiculos.get(data["id_vehiculo"])
+            if intervalos is None:
+                return  # Vehículo no cargado: se leerá de la base de datos al consultarlo
+            # Se quita siempre antes de agregar: si el vehículo se cargó después del commit,
+            # el intervalo ya estaba y el evento no lo duplica
+            intervalos.quitar(tipo, data[clave])
+            if event_type in ("alquiler_creado", "alquiler_modificado", "mantenimiento_creado"):
+                intervalos.agregar((normalizar_fecha(data["fecha_inicio"]),
+                                    normalizar_fecha(data["fecha_fin"]), tipo, data[clave]))
+
+    # ------------------------------------------------------------------
+    # Auxiliares (requieren tener tomado self._lock)
+    # ------------------------------------------------------------------
+    def _verificar_version(self):
+        if not self._version.vigente():
+            # Hubo cambios del calendario que no pasaron por sus eventos
+            self._vehiculos = {}
+            self._completo = False
+            self._version.marcar()
+
+    def _intervalos(self, id_vehiculo, verificar=True):
+        if verificar:
+            self._verificar_version()
+        intervalos = self._vehiculos.get(id_vehiculo)
+        if intervalos is None:
+            if self._completo:
+                # Cargado completo: el vehículo no tiene alquileres ni mantenimientos
+                intervalos = _IntervalosVehiculo()
+            else:
+                filas = self._db.execute_query(self.SQL_INTERVALOS_VEHICULO, (id_vehiculo, id_vehiculo)).fetchall()
+                intervalos = _IntervalosVehiculo(
+                    (f["fecha_inicio"], f["fecha_fin"], f["tipo"], f["id"]) for f in filas)
+            self._vehiculos[id_vehiculo] = intervalos
+        return intervalos
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Emparejamiento de la lista de espera con los vehículos que se liberan
+Patrón Observer - Reacciona a las bajas de alquileres/mantenimientos y a las devoluciones anticipadas
+Programación Estructurada - Una consulta indexada por hueco liberado (sin recorrer toda la lista)
+"""
+
+import json
+import threading
+from datetime import date, timedelta
+
+from persistence.database_connection import DatabaseConnection
+from patterns.observer import Observer, CalendarioNotifier
+from services.indice_disponibilidad import IndiceDisponibilidad
+from models import atender_espera
+from validations import normalizar_fecha
+
+
+class ListaEspera(Observer):
+    """
+    Cuando se libera un período de un vehículo, busca solicitudes pendientes de su tipo
+    que entren en la ventana libre resultante y que toquen el tramo liberado (las que no
+    lo tocan ya podían atenderse antes) y arma propuestas de alquiler
+    - Prioridad por orden de llegada (id_espera); en una misma ventana no se proponen
+      solicitudes que se solapen entre sí
+    - Una solicitud se propone una sola vez; las propuestas se confirman con aceptar()
+    Patrón Singleton - Una única instancia suscrita al calendario
+    """
+
+    SQL_VEHICULO = "SELECT tipo, estado FROM vehiculo WHERE id_vehiculo = ?"
+
+    # Usa idx_lista_espera_tipo_inicio: rango sobre fecha_inicio dentro de (estado, tipo)
+    SQL_CANDIDATAS = """
+    SELECT id_espera, tipo, fecha_inicio, fecha_fin, id_cliente, id_empleado
+    FROM lista_espera
+    WHERE estado = 'Pendiente' AND tipo = :tipo
+      AND fecha_inicio >= :ventana_inicio AND fecha_inicio <= :liberado_fin
+      AND fecha_fin >= :liberado_inicio AND fecha_fin <= :ventana_fin
+    ORDER BY id_espera
+    """
+
+    SQL_PENDIENTES = """
+    SELECT id_espera FROM lista_espera
+    WHERE estado = 'Pendiente' AND id_espera IN (SELECT value FROM json_each(?))
+    """
+
+    _instance = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock_instancia:
+                if cls._instance is None:
+                    instancia = super(ListaEspera, cls).__new__(cls)
+                    instancia._inicializar()
+                    cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        self._db = DatabaseConnection()
+        # El índice se suscribe antes: al recibir un evento ya refleja el período liberado
+        self._indice = IndiceDisponibilidad()
+        self._propuestas = {}       # id_espera -> propuesta (orden de llegada)
+        self._lock = threading.RLock()
+        CalendarioNotifier().attach(self)
+
+    # ------------------------------------------------------------------
+    # Consultas y acciones
+    # ------------------------------------------------------------------
+    def propuestas(self, id_vehiculo=None):
+        """
+        Propuestas vigentes: la solicitud sigue pendiente y el vehículo sigue libre
+        Returns:
+            list: dicts con id_espera, id_vehiculo, id_cliente, tipo, fecha_inicio y fecha_fin
+        """
+        with self._lock:
+            if not self._propuestas:
+                return []
+            pendientes = {fila["id_espera"] for fila in self._db.execute_query(
+                self.SQL_PENDIENTES, (json.dumps(list(self._propuestas)),)).fetchall()}
+            for id_espera in list(self._propuestas):
+                p = self._propuestas[id_espera]
+                if id_espera not in pendientes or not self._indice.esta_libre(
+                        p["id_vehiculo"], p["fecha_inicio"], p["fecha_fin"]):
+                    del self._propuestas[id_espera]
+            return [dict(p) for p in self._propuestas.values()
+                    if id_vehiculo is None or p["id_vehiculo"] == id_vehiculo]
+
+    def aceptar(self, id_espera, id_empleado=None):
+        """
+        Registra el alquiler propuesto (models.atender_espera)
+        Returns:
+            int: id del alquiler creado
+        """
+        with self._lock:
+            propuesta = self._propuestas.pop(id_espera, None)
+        if propuesta is None:
+            raise ValueError("No hay una propuesta vigente para esa solicitud.")
+        return atender_espera(id_espera, propuesta["id_vehiculo"], id_empleado)
+
+    def descartar(self, id_espera):
+        """Descarta la propuesta (la solicitud sigue en espera para próximas liberaciones)"""
+        with self._lock:
+            self._propuestas.pop(id_espera, None)
+
+    def buscar(self, id_vehiculo, fecha_inicio, fecha_fin):
+        """
+        Empareja el período liberado [fecha_inicio, fecha_fin] del vehículo con la lista de espera
+        Returns:
+            list: propuestas nuevas
+        """
+        liberado_inicio = max(normalizar_fecha(fecha_inicio), date.today().isoformat())
+        liberado_fin = normalizar_fecha(fecha_fin)
+        if liberado_fin < liberado_inicio:
+            return []   # Se liberó un período que ya pasó
+
+        vehiculo = self._db.execute_query(self.SQL_VEHICULO, (id_vehiculo,)).fetchone()
+        if not vehiculo or not vehiculo["tipo"] or (vehiculo["estado"] or "").upper() != "DISPONIBLE":
+            return []   # registrar_alquiler rechazaría el vehículo
+
+        hueco = self._indice.hueco(id_vehiculo, liberado_inicio, liberado_fin)
+        if hueco is None:
+            return []   # El período liberado sigue ocupado por otro registro
+        anterior, siguiente = hueco
+        ventana_inicio = max(liberado_inicio if anterior is None else _dia(anterior, 1),
+                             date.today().isoformat())
+        ventana_fin = "9999-12-31" if siguiente is None else _dia(siguiente, -1)
+
+        candidatas = self._db.execute_query(self.SQL_CANDIDATAS, {
+            "tipo": vehiculo["tipo"], "ventana_inicio": ventana_inicio, "ventana_fin": ventana_fin,
+            "liberado_inicio": liberado_inicio, "liberado_fin": liberado_fin,
+        }).fetchall()
+
+        nuevas = []
+        with self._lock:
+            for fila in candidatas:
+                if fila["id_espera"] in self._propuestas:
+                    continue
+                if any(p["fecha_fin"] >= fila["fecha_inicio"] and p["fecha_inicio"] <= fila["fecha_fin"]
+                       for p in nuevas):
+                    continue
+                propuesta = {"id_espera": fila["id_espera"], "id_vehiculo": id_vehiculo,
+                             "id_cliente": fila["id_cliente"], "tipo": fila["tipo"],
+                             "fecha_inicio": fila["fecha_inicio"], "fecha_fin": fila["fecha_fin"]}
+                self._propuestas[fila["id_espera"]] = propuesta
+                nuevas.append(propuesta)
+        return nuevas
+
+    # ------------------------------------------------------------------
+    # Patrón Observer
+    # ------------------------------------------------------------------
+    def update(self, event_type, data):
+        """
+        Patrón Observer - Solo los eventos que liberan días de un vehículo disparan la búsqueda
+        """
+        if event_type in ("alquiler_eliminado", "mantenimiento_eliminado"):
+            self.buscar(data["id_vehiculo"], data["fecha_inicio"], data["fecha_fin"])
+        elif event_type == "alquiler_modificado" and data.get("fecha_fin_anterior"):
+            # Devolución anticipada: se liberan los días entre el nuevo fin y el anterior
+            fin_anterior = normalizar_fecha(data["fecha_fin_anterior"])
+            fin = normalizar_fecha(data["fecha_fin"])
+            if fin < fin_anterior:
+                self.buscar(data["id_vehiculo"], _dia(fin, 1), fin_anterior)
+
+
+def _dia(fecha, desplazamiento):
+    return (date.fromisoformat(fecha) + timedelta(days=desplazamiento)).isoformat()
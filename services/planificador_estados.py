@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Planificador de estados de vehículos
+Patrón Observer - Se re-arma con los eventos del calendario (CalendarioNotifier)
+Programación Estructurada - Min-heap de fechas frontera (inicio/fin de alquileres y mantenimientos)
+"""
+
+import heapq
+import threading
+from datetime import date, datetime, timedelta
+
+from database import get_connection
+from models import actualizar_estados_vehiculos
+from persistence.database_connection import DatabaseConnection, VersionObservada
+from patterns.observer import Observer, CalendarioNotifier
+from validations import normalizar_fecha
+
+
+class PlanificadorEstados(Observer):
+    """
+    El estado de un vehículo solo cambia cuando empieza o termina un alquiler
+    o cuando termina un mantenimiento. El planificador guarda esas fechas frontera
+    en un min-heap y, al procesar, recalcula únicamente los vehículos cuyas
+    fronteras ya pasaron
+    Los cambios del calendario que no avisaron eventos (DAOs, otros procesos) se detectan con
+    VersionObservada: en ese caso el próximo procesar() recalcula la flota y rearma el heap
+    Patrón Singleton - Una única instancia suscrita al calendario
+    """
+
+    # Fechas en las que cambia el estado derivado de cada vehículo a partir de :ref
+    # (el día siguiente al fin de un alquiler o mantenimiento el vehículo se libera)
+    SQL_FRONTERAS = """
+    SELECT id_vehiculo, fecha_inicio AS fecha FROM alquiler WHERE fecha_inicio > :ref
+    UNION ALL
+    SELECT id_vehiculo, date(fecha_fin, '+1 day') FROM alquiler WHERE fecha_fin >= :ref
+    UNION ALL
+    SELECT id_vehiculo, date(fecha_fin, '+1 day') FROM mantenimiento WHERE fecha_fin >= :ref
+    """
+
+    _instance = None
+    _lock_instancia = threading.Lock()
+
+    def __new__(cls):
+        """
+        Patrón Singleton - Crea la instancia solo la primera vez
+        """
+        if cls._instance is None:
+            with cls._lock_instancia:
+                if cls._instance is None:
+                    instancia = super(PlanificadorEstados, cls).__new__(cls)
+                    instancia._inicializar()
+                    cls._instance = instancia
+        return cls._instance
+
+    def _inicializar(self):
+        self._heap = []             # (fecha ISO, id_vehiculo)
+        self._armado = False
+        self._ultima_fecha = None   # última fecha de referencia procesada
+        self._version = VersionObservada(DatabaseConnection())
+        self._lock = threading.Lock()
+        CalendarioNotifier().attach(self)
+
+    def procesar(self, fecha_referencia=None):
+        """
+        Aplica las transiciones de estado cuyas fechas frontera ya llegaron
+        La primera vez (o si la fecha retrocede, o hubo cambios del calendario sin evento) recalcula
+        toda la flota y carga el heap
+        Si no hay fronteras vencidas ni cambios externos del calendario no se modifica la base de datos
+        Returns:
+            dict: mismo formato que actualizar_estados_vehiculos
+        """
+        fecha_ref = normalizar_fecha(fecha_referencia if fecha_referencia is not None else date.today())
+
+        with self._lock:
+            if not self._armado or fecha_ref < self._ultima_fecha or not self._version.vigente():
+                cambios = actualizar_estados_vehiculos(fecha_ref)
+                self._cargar_fronteras(fecha_ref)
+                return cambios
+
+            vencidos = set()
+            while self._heap and self._heap[0][0] <= fecha_ref:
+                vencidos.add(heapq.heappop(self._heap)[1])
+            self._ultima_fecha = fecha_ref
+
+        # La escritura de los estados no cambia la versión del calendario
+        return actualizar_estados_vehiculos(fecha_ref, ids_vehiculo=vencidos)
+
+    def proxima_transicion(self):
+        """Fecha de la próxima frontera pendiente (o None)"""
+        with self._lock:
+            return self._heap[0][0] if self._heap else None
+
+    def reiniciar(self):
+        """Descarta el heap: el próximo procesar() recalcula toda la flota"""
+        with self._lock:
+            self._heap = []
+            self._armado = False
+            self._ultima_fecha = None
+            self._version.invalidar()
+
+    def update(self, event_type, data):
+        """
+        Patrón Observer - Agrega las fronteras del registro creado o modificado
+        Las fronteras de registros eliminados quedan en el heap: al vencer solo
+        recalculan un vehículo sin cambios
+        Todos los eventos avanzan la versión; si hubo otros cambios se rearma el heap
+        """
+        with self._lock:
+            if not self._armado:
+                return  # Se cargarán desde la base de datos en el primer procesar()
+            if not self._version.aplicar_evento():
+                self._armado = False
+                return
+            if event_type not in ("alquiler_creado", "alquiler_modificado", "mantenimiento_creado"):
+                return
+            fechas = [self._dia_siguiente(data["fecha_fin"])]
+            if event_type != "mantenimiento_creado":
+                fechas.append(normalizar_fecha(data["fecha_inicio"]))
+            for fecha in fechas:
+                if fecha > self._ultima_fecha:
+                    heapq.heappush(self._heap, (fecha, data["id_vehiculo"]))
+
+    # ------------------------------------------------------------------
+    # Auxiliares (requieren tener tomado self._lock)
+    # ------------------------------------------------------------------
+    def _cargar_fronteras(self, fecha_ref):
+        self._version.marcar()
+        c = get_connection().cursor()
+        c.execute(self.SQL_FRONTERAS, {"ref": fecha_ref})
+        self._heap = [(fila["fecha"], fila["id_vehiculo"]) for fila in c.fetchall()]
+        heapq.heapify(self._heap)
+        self._ultima_fecha = fecha_ref
+        self._armado = True
+        self._version.confirmar_carga()
+
+    @staticmethod
+    def _dia_siguiente(fecha):
+        return (datetime.strptime(normalizar_fecha(fecha), "%Y-%m-%d").date() + timedelta(days=1)).isoformat()
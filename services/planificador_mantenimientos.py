@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Planificador de mantenimientos para toda la flota
+Programación Estructurada - Ventanas libres del índice de disponibilidad + ocupación diaria del taller
+Programación Orientada a Objetos - Encapsula la búsqueda de turnos de taller
+"""
+
+import json
+from datetime import date
+
+from persistence.database_connection import DatabaseConnection
+from services.indice_disponibilidad import IndiceDisponibilidad
+from models import registrar_mantenimientos
+from validations import normalizar_fecha
+
+
+class PlanificadorMantenimientos:
+    """
+    Busca para cada vehículo el primer período de `dias` días que:
+    - no se solapa con sus alquileres ni mantenimientos (ventanas libres del índice)
+    - no supera la capacidad diaria del taller, contando los mantenimientos ya programados
+    Los vehículos se atienden en el orden recibido (prioridad) y cada turno asignado
+    ocupa el taller para los siguientes
+    """
+
+    SQL_VEHICULOS = """
+    SELECT id_vehiculo FROM vehiculo WHERE id_vehiculo IN (SELECT value FROM json_each(?))
+    """
+
+    SQL_MANTENIMIENTOS_PROGRAMADOS = """
+    SELECT fecha_inicio, fecha_fin FROM mantenimiento WHERE fecha_fin >= ?
+    """
+
+    # Sin mantenimiento en los últimos :dias días y sin uno ya programado; los más atrasados primero
+    SQL_VEHICULOS_VENCIDOS = """
+    SELECT v.id_vehiculo
+    FROM vehiculo v
+    WHERE (v.fecha_ultimo_mantenimiento IS NULL
+           OR v.fecha_ultimo_mantenimiento < date(:ref, '-' || :dias || ' days'))
+      AND NOT EXISTS (SELECT 1 FROM mantenimiento m
+                      WHERE m.id_vehiculo = v.id_vehiculo AND m.fecha_fin >= :ref)
+    ORDER BY v.fecha_ultimo_mantenimiento, v.id_vehiculo
+    """
+
+    HORIZONTE_DIAS = 365
+
+    def __init__(self):
+        self._db = DatabaseConnection()
+        self._indice = IndiceDisponibilidad()
+
+    def vehiculos_vencidos(self, dias_desde_ultimo=180, fecha_referencia=None):
+        """IDs de los vehículos que deben pasar por el taller, del más atrasado al más reciente"""
+        ref = normalizar_fecha(fecha_referencia if fecha_referencia is not None else date.today())
+        filas = self._db.execute_query(self.SQL_VEHICULOS_VENCIDOS,
+                                       {"ref": ref, "dias": int(dias_desde_ultimo)}).fetchall()
+        return [fila["id_vehiculo"] for fila in filas]
+
+    def planificar(self, ids_vehiculo, dias=1, capacidad_diaria=1, desde=None,
+                   tipo="preventivo", costo=0.0, observaciones=None):
+        """
+        Args:
+            ids_vehiculo: vehículos a atender, en orden de prioridad
+            dias: duración de cada mantenimiento
+            capacidad_diaria: vehículos que el taller puede tener a la vez
+            desde: primer día posible (hoy por defecto)
+        Returns:
+            dict: 'programados' (dicts listos para models.registrar_mantenimientos) y
+                  'sin_programar' (id_vehiculo y motivo)
+        """
+        if dias < 1:
+            raise ValueError("La duración debe ser de al menos un día.")
+        if capacidad_diaria < 1:
+            raise ValueError("La capacidad del taller debe ser de al menos un vehículo por día.")
+        desde = normalizar_fecha(desde if desde is not None else date.today())
+        inicio_ord = date.fromisoformat(desde).toordinal()
+        limite_ord = inicio_ord + self.HORIZONTE_DIAS
+
+        ids_vehiculo = list(dict.fromkeys(ids_vehiculo))
+        existentes = {fila["id_vehiculo"] for fila in self._db.execute_query(
+            self.SQL_VEHICULOS, (json.dumps(ids_vehiculo),)).fetchall()}
+        ventanas = self._indice.ventanas_libres([i for i in ids_vehiculo if i in existentes], desde)
+
+        # Ocupación del taller por día (ordinal) con los mantenimientos ya programados
+        taller = _OcupacionTaller(capacidad_diaria)
+        for fila in self._db.execute_query(self.SQL_MANTENIMIENTOS_PROGRAMADOS, (desde,)).fetchall():
+            taller.ocupar(max(date.fromisoformat(fila["fecha_inicio"]).toordinal(), inicio_ord),
+                          date.fromisoformat(fila["fecha_fin"]).toordinal())
+
+        programados = []
+        sin_programar = []
+        for id_vehiculo in ids_vehiculo:
+            if id_vehiculo not in existentes:
+                sin_programar.append({"id_vehiculo": id_vehiculo, "motivo": "Vehículo no encontrado."})
+                continue
+            turno = self._primer_turno(ventanas[id_vehiculo], dias, taller, limite_ord)
+            if turno is None:
+                sin_programar.append({"id_vehiculo": id_vehiculo,
+                                      "motivo": f"Sin turno libre en los próximos {self.HORIZONTE_DIAS} días."})
+                continue
+            taller.ocupar(turno, turno + dias - 1)
+            programados.append({
+                "id_vehiculo": id_vehiculo, "tipo": tipo, "costo": costo, "observaciones": observaciones,
+                "fecha_inicio": date.fromordinal(turno).isoformat(),
+                "fecha_fin": date.fromordinal(turno + dias - 1).isoformat(),
+            })
+        return {"programados": programados, "sin_programar": sin_programar}
+
+    def programar(self, ids_vehiculo, **opciones):
+        """
+        Planifica y registra el plan en una sola transacción (models.registrar_mantenimientos)
+        Returns:
+            dict: mismo formato que planificar, con id_mant en cada mantenimiento programado
+        """
+        plan = self.planificar(ids_vehiculo, **opciones)
+        ids_mant = registrar_mantenimientos(plan["programados"])
+        for mantenimiento, id_mant in zip(plan["programados"], ids_mant):
+            mantenimiento["id_mant"] = id_mant
+        return plan
+
+    # ------------------------------------------------------------------
+    # Auxiliares
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _primer_turno(ventanas, dias, taller, limite_ord):
+        """
+        Primer día (ordinal) desde el que el vehículo está libre `dias` días seguidos
+        y el taller tiene lugar en todos ellos
+        """
+        for inicio, fin in ventanas:
+            ultimo = date.fromisoformat(fin).toordinal() if fin is not None else limite_ord
+            turno = taller.primer_dia_con_lugar(date.fromisoformat(inicio).toordinal())
+            while turno <= limite_ord and turno + dias - 1 <= ultimo:
+                lleno = next((dia for dia in range(turno + 1, turno + dias) if taller.lleno(dia)), None)
+                if lleno is None:
+                    return turno
+                # Ningún turno que incluya el día lleno sirve
+                turno = taller.primer_dia_con_lugar(lleno + 1)
+        return None
+
+
+class _OcupacionTaller:
+    """
+    Vehículos en el taller por día y, para los días llenos, un puntero al siguiente
+    día candidato (con compresión de caminos): saltear una racha de días llenos
+    no cuesta un paso por día
+    """
+
+    __slots__ = ("capacidad", "uso", "siguiente")
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.uso = {}
+        self.siguiente = {}     # día lleno -> día posterior a revisar
+
+    def ocupar(self, desde, hasta):
+        for dia in range(desde, hasta + 1):
+            self.uso[dia] = self.uso.get(dia, 0) + 1
+            if self.uso[dia] >= self.capacidad:
+                self.siguiente[dia] = dia + 1
+
+    def lleno(self, dia):
+        return dia in self.siguiente
+
+    def primer_dia_con_lugar(self, dia):
+        camino = []
+        while dia in self.siguiente:
+            camino.append(dia)
+            dia = self.siguiente[dia]
+        for visitado in camino:
+            self.siguiente[visitado] = dia
+        return dia
@@ -8,10 +8,15 @@ Programación Funcional - Uso de funciones para procesar datos
 """
 
 from persistence.database_connection import DatabaseConnection
+from services.cache_reportes import cache_reporte
 from datetime import datetime, date
 import base64
+import csv
+import gzip
 import io
-from config import MATPLOTLIB_AVAILABLE
+import os
+from config import MATPLOTLIB_AVAILABLE, EXPORTACION_TAMANO_LOTE
+from validations import normalizar_fecha
 
 if MATPLOTLIB_AVAILABLE:
     import matplotlib
@@ -28,12 +33,177 @@ except ImportError:
     OPENPYXL_AVAILABLE = False
 
 
+class ResultadoReporte:
+    """
+    Resultado tipado de un reporte
+    Programación Orientada a Objetos - Columnas (clave, encabezado, tipo) y filas como tuplas
+    Inmutable: la caché de reportes devuelve la misma instancia a todos los llamadores
+    """
+    
+    __slots__ = ("_titulo", "_columnas", "_filas")
+    
+    def __init__(self, titulo, columnas, filas):
+        self._titulo = titulo
+        self._columnas = tuple(columnas)
+        tipos = [tipo for _, _, tipo in self._columnas]
+        # Los valores se convierten al tipo de la columna (NULL queda como None)
+        self._filas = tuple(
+            tuple(None if valor is None else tipo(valor) for valor, tipo in zip(fila, tipos))
+            for fila in filas
+        )
+    
+    @property
+    def titulo(self):
+        return self._titulo
+    
+    @property
+    def columnas(self):
+        return self._columnas
+    
+    @property
+    def claves(self):
+        return tuple(clave for clave, _, _ in self._columnas)
+    
+    @property
+    def encabezados(self):
+        return tuple(encabezado for _, encabezado, _ in self._columnas)
+    
+    @property
+    def filas(self):
+        return self._filas
+    
+    def columna(self, clave):
+        """Valores de una columna, en el orden de las filas"""
+        indice = self.claves.index(clave)
+        return [fila[indice] for fila in self._filas]
+    
+    def a_dicts(self):
+        """Filas como diccionarios (formato de los reportes anteriores)"""
+        claves = self.claves
+        return [dict(zip(claves, fila)) for fila in self._filas]
+    
+    def __len__(self):
+        return len(self._filas)
+    
+    def __iter__(self):
+        return iter(self._filas)
+
+
 class ReportesService:
     """
     Programación Orientada a Objetos - Servicio de reportes
     Encapsula la lógica de generación de reportes
     """
     
+    # Detalle de alquileres de un cliente (usa idx_alquiler_cliente_fecha)
+    SQL_DETALLE_ALQUILERES_CLIENTE = """
+    SELECT 
+        a.id_alquiler,
+        a.fecha_inicio,
+        a.fecha_fin,
+        a.costo_total,
+        v.patente || ' - ' || v.marca || ' ' || v.modelo as vehiculo,
+        e.nombre || ' ' || e.apellido as empleado
+    FROM alquiler a
+    JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
+    LEFT JOIN empleado e ON a.id_empleado = e.id_empleado
+    WHERE a.id_cliente = ?
+    ORDER BY a.fecha_inicio DESC
+    """
+    
+    # Rankings sobre los contadores que mantienen los triggers (usan idx_estadistica_*_ranking;
+    # CROSS JOIN fija el orden de las tablas para recorrer el índice y cortar en el LIMIT)
+    SQL_RANKING_CLIENTES = """
+    SELECT 
+        c.id_cliente,
+        c.nombre || ' ' || c.apellido as cliente_nombre,
+        e.cantidad_alquileres as total_alquileres,
+        ROUND(e.total_facturado, 2) as total_facturado,
+        e.ultimo_alquiler
+    FROM estadistica_cliente e
+    CROSS JOIN cliente c ON c.id_cliente = e.id_cliente
+    ORDER BY e.cantidad_alquileres DESC, e.total_facturado DESC
+    LIMIT ?
+    """
+    
+    SQL_RANKING_VEHICULOS = """
+    SELECT 
+        v.id_vehiculo,
+        v.patente,
+        v.marca || ' ' || v.modelo as descripcion,
+        e.cantidad_alquileres as veces_alquilado,
+        ROUND(e.total_facturado, 2) as total_facturado,
+        e.ultimo_alquiler
+    FROM estadistica_vehiculo e
+    CROSS JOIN vehiculo v ON v.id_vehiculo = e.id_vehiculo
+    ORDER BY e.cantidad_alquileres DESC, e.total_facturado DESC
+    LIMIT ?
+    """
+    
+    # Listado de alquileres con cliente y vehículo (con filtro por cliente usa idx_alquiler_cliente_fecha)
+    SQL_LISTADO_ALQUILERES = """
+    SELECT 
+        a.id_alquiler,
+        c.apellido || ', ' || c.nombre as cliente,
+        v.patente || ' - ' || v.marca || ' ' || v.modelo as vehiculo,
+        a.fecha_inicio,
+        a.fecha_fin,
+        a.costo_total
+    FROM alquiler a
+    JOIN cliente c ON a.id_cliente = c.id_cliente
+    JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
+    {filtro}
+    ORDER BY a.fecha_inicio DESC
+    """
+    
+    # Períodos sobre el resumen mensual: 'YYYY-MM', 'YYYY-Tn' (trimestre) y 'YYYY'
+    EXPRESIONES_PERIODO = {
+        'mes': "mes",
+        'trimestre': "substr(mes, 1, 4) || '-T' || ((CAST(substr(mes, 6, 2) AS INTEGER) - 1) / 3 + 1)",
+        'año': "substr(mes, 1, 4)",
+    }
+    
+    SQL_RESUMEN_PERIODO = """
+    SELECT 
+        {expresion} as periodo,
+        SUM(cantidad) as cantidad_alquileres,
+        ROUND(SUM(total), 2) as total_facturado
+    FROM resumen_mensual
+    WHERE dimension = 'total'
+    GROUP BY periodo
+    ORDER BY periodo {orden}
+    """
+    
+    # Columnas de los reportes tipados: (clave, encabezado, tipo), en el orden del SELECT
+    COLUMNAS_RANKING_CLIENTES = (
+        ("id_cliente", "ID", int),
+        ("cliente_nombre", "Cliente", str),
+        ("total_alquileres", "Cant. Alquileres", int),
+        ("total_facturado", "Total facturado ($)", float),
+        ("ultimo_alquiler", "Último alquiler", str),
+    )
+    COLUMNAS_RANKING_VEHICULOS = (
+        ("id_vehiculo", "ID", int),
+        ("patente", "Patente", str),
+        ("descripcion", "Descripción", str),
+        ("veces_alquilado", "Cant. Alquileres", int),
+        ("total_facturado", "Total facturado ($)", float),
+        ("ultimo_alquiler", "Último alquiler", str),
+    )
+    COLUMNAS_LISTADO_ALQUILERES = (
+        ("id_alquiler", "ID", int),
+        ("cliente", "Cliente", str),
+        ("vehiculo", "Vehículo", str),
+        ("fecha_inicio", "Inicio", str),
+        ("fecha_fin", "Fin", str),
+        ("costo_total", "Costo ($)", float),
+    )
+    COLUMNAS_PERIODO = (
+        ("periodo", "Período", str),
+        ("cantidad_alquileres", "Cantidad", int),
+        ("total_facturado", "Total facturado ($)", float),
+    )
+    
     def __init__(self):
         """
         Programación Orientada a Objetos - Constructor
@@ -42,125 +212,103 @@ class ReportesService:
         # Patrón Singleton - Obtener instancia única de conexión
         self._db = DatabaseConnection()
     
-    def alquileres_por_cliente(self):
+    # ------------------------------------------------------------------
+    # Reportes tipados (ResultadoReporte): los usan la interfaz, las exportaciones
+    # y el uso sin interfaz; pasan por la caché de reportes
+    # ------------------------------------------------------------------
+    @cache_reporte
+    def ranking_clientes(self, limite=None):
+        """
+        Clientes ordenados por cantidad de alquileres y total facturado
+        Lee los contadores de estadistica_cliente (índice de ranking), no agrupa alquileres
+        Args:
+            limite: cantidad máxima de clientes (None = todos)
+        """
+        return self._consultar("Alquileres por cliente", self.COLUMNAS_RANKING_CLIENTES,
+                               self.SQL_RANKING_CLIENTES, (_limite_sql(limite),))
+    
+    @cache_reporte
+    def ranking_vehiculos(self, limite=None):
+        """
+        Vehículos ordenados por cantidad de alquileres y total facturado
+        Lee los contadores de estadistica_vehiculo (índice de ranking), no agrupa alquileres
+        Args:
+            limite: cantidad máxima de vehículos (None = todos)
+        """
+        return self._consultar("Vehículos más alquilados", self.COLUMNAS_RANKING_VEHICULOS,
+                               self.SQL_RANKING_VEHICULOS, (_limite_sql(limite),))
+    
+    @cache_reporte
+    def listado_alquileres(self, id_cliente=None):
+        """
+        Alquileres de un cliente (o de todos si id_cliente es None), del más reciente al más antiguo
+        """
+        if id_cliente is None:
+            return self._consultar("Alquileres", self.COLUMNAS_LISTADO_ALQUILERES,
+                                   self.SQL_LISTADO_ALQUILERES.format(filtro=""), ())
+        return self._consultar(f"Alquileres del cliente {id_cliente}", self.COLUMNAS_LISTADO_ALQUILERES,
+                               self.SQL_LISTADO_ALQUILERES.format(filtro="WHERE a.id_cliente = ?"),
+                               (id_cliente,))
+    
+    @cache_reporte
+    def resumen_por_periodo(self, periodo='mes', ascendente=False):
+        """
+        Cantidad de alquileres y facturación por mes ('YYYY-MM'), trimestre ('YYYY-Tn') o año
+        Lee el resumen mensual que mantienen los triggers (una fila por mes, no por alquiler)
+        Raises:
+            ValueError: si el período no es 'mes', 'trimestre' ni 'año'
+        """
+        if periodo not in self.EXPRESIONES_PERIODO:
+            raise ValueError("Período inválido: use 'mes', 'trimestre' o 'año'.")
+        sql = self.SQL_RESUMEN_PERIODO.format(expresion=self.EXPRESIONES_PERIODO[periodo],
+                                              orden="ASC" if ascendente else "DESC")
+        return self._consultar(f"Alquileres por {periodo}", self.COLUMNAS_PERIODO, sql, ())
+    
+    def facturacion_mensual(self):
+        """Facturación por mes en orden cronológico (datos del gráfico de barras)"""
+        return self.resumen_por_periodo('mes', ascendente=True)
+    
+    def _consultar(self, titulo, columnas, sql, params):
+        cursor = self._db.execute_query(sql, params)
+        return ResultadoReporte(titulo, columnas, cursor.fetchall())
+    
+    # ------------------------------------------------------------------
+    # Compatibilidad - Reportes como listas de diccionarios
+    # ------------------------------------------------------------------
+    def alquileres_por_cliente(self, limite=None):
         """
         Reporte: Listado de alquileres por cliente
         Programación Estructurada - Función bien organizada
         """
-        query = """
-        SELECT 
-            c.id_cliente,
-            c.nombre || ' ' || c.apellido as cliente_nombre,
-            COUNT(a.id_alquiler) as total_alquileres,
-            SUM(a.costo_total) as total_facturado
-        FROM cliente c
-        LEFT JOIN alquiler a ON c.id_cliente = a.id_cliente
-        GROUP BY c.id_cliente, c.nombre, c.apellido
-        ORDER BY total_alquileres DESC, cliente_nombre
-        """
-        cursor = self._db.execute_query(query)
-        rows = cursor.fetchall()
-        
-        # Programación Funcional - Transformar filas a diccionarios
-        return [dict(row) for row in rows]
+        return self.ranking_clientes(limite).a_dicts()
     
+    @cache_reporte
     def detalle_alquileres_por_cliente(self, id_cliente):
         """
         Reporte: Detalle de alquileres de un cliente específico
         Programación Estructurada - Función bien organizada
         """
-        query = """
-        SELECT 
-            a.id_alquiler,
-            a.fecha_inicio,
-            a.fecha_fin,
-            a.costo_total,
-            v.patente || ' - ' || v.marca || ' ' || v.modelo as vehiculo,
-            e.nombre || ' ' || e.apellido as empleado
-        FROM alquiler a
-        JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
-        LEFT JOIN empleado e ON a.id_empleado = e.id_empleado
-        WHERE a.id_cliente = ?
-        ORDER BY a.fecha_inicio DESC
-        """
-        cursor = self._db.execute_query(query, (id_cliente,))
+        cursor = self._db.execute_query(self.SQL_DETALLE_ALQUILERES_CLIENTE, (id_cliente,))
         rows = cursor.fetchall()
         
         # Programación Funcional - Transformar filas a diccionarios
         return [dict(row) for row in rows]
     
-    def vehiculos_mas_alquilados(self):
+    def vehiculos_mas_alquilados(self, limite=None):
         """
         Reporte: Vehículos más alquilados
         Programación Estructurada - Función bien organizada
         """
-        query = """
-        SELECT 
-            v.id_vehiculo,
-            v.patente,
-            v.marca || ' ' || v.modelo as descripcion,
-            COUNT(a.id_alquiler) as veces_alquilado,
-            SUM(a.costo_total) as total_facturado
-        FROM vehiculo v
-        LEFT JOIN alquiler a ON v.id_vehiculo = a.id_vehiculo
-        GROUP BY v.id_vehiculo, v.patente, v.marca, v.modelo
-        ORDER BY veces_alquilado DESC, total_facturado DESC
-        """
-        cursor = self._db.execute_query(query)
-        rows = cursor.fetchall()
-        
-        # Programación Funcional - Transformar filas a diccionarios
-        return [dict(row) for row in rows]
+        return self.ranking_vehiculos(limite).a_dicts()
     
     def alquileres_por_periodo(self, periodo='mes'):
         """
-        Reporte: Alquileres por período (mes, trimestre, año)
+        Reporte: Alquileres por período (mes, trimestre, año), del más reciente al más antiguo
         Programación Estructurada - Función bien organizada
-        Programación Funcional - Lógica condicional para diferentes períodos
         """
-        if periodo == 'mes':
-            # Agrupar por mes
-            query = """
-            SELECT 
-                strftime('%Y-%m', fecha_inicio) as periodo,
-                COUNT(*) as cantidad_alquileres,
-                SUM(costo_total) as total_facturado
-            FROM alquiler
-            GROUP BY strftime('%Y-%m', fecha_inicio)
-            ORDER BY periodo DESC
-            """
-        elif periodo == 'trimestre':
-            # Agrupar por trimestre
-            query = """
-            SELECT 
-                strftime('%Y', fecha_inicio) || '-Q' || 
-                CAST((CAST(strftime('%m', fecha_inicio) AS INTEGER) - 1) / 3 + 1 AS TEXT) as periodo,
-                COUNT(*) as cantidad_alquileres,
-                SUM(costo_total) as total_facturado
-            FROM alquiler
-            GROUP BY strftime('%Y', fecha_inicio), 
-                     CAST((CAST(strftime('%m', fecha_inicio) AS INTEGER) - 1) / 3 + 1 AS INTEGER)
-            ORDER BY periodo DESC
-            """
-        elif periodo == 'año':
-            # Agrupar por año
-            query = """
-            SELECT 
-                strftime('%Y', fecha_inicio) as periodo,
-                COUNT(*) as cantidad_alquileres,
-                SUM(costo_total) as total_facturado
-            FROM alquiler
-            GROUP BY strftime('%Y', fecha_inicio)
-            ORDER BY periodo DESC
-            """
-        else:
+        if periodo not in self.EXPRESIONES_PERIODO:
             return []
-        
-        cursor = self._db.execute_query(query)
-        rows = cursor.fetchall()
-        
-        # Programación Funcional - Transformar filas a diccionarios
-        return [dict(row) for row in rows]
+        return self.resumen_por_periodo(periodo).a_dicts()
     
     def facturacion_mensual_grafico(self):
         """
@@ -404,4 +552,93 @@ class ReportesService:
         excel_buffer.seek(0)
         
         return excel_buffer
+    
+    # Exportación de alquileres (la más reciente primero); el filtro por fecha de inicio
+    # usa idx_alquiler_fecha_inicio, que también da el orden sin ordenar en memoria
+    SQL_EXPORTACION_ALQUILERES = """
+    SELECT a.id_alquiler, a.fecha_inicio, a.fecha_fin, a.costo_total,
+           c.nombre || ' ' || c.apellido as cliente, v.patente as vehiculo
+    FROM alquiler a
+    JOIN cliente c ON a.id_cliente = c.id_cliente
+    JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
+    WHERE a.fecha_inicio >= :desde AND a.fecha_inicio <= :hasta
+    ORDER BY a.fecha_inicio DESC
+    """
+    
+    SQL_CANTIDAD_EXPORTACION = """
+    SELECT COUNT(*) FROM alquiler WHERE fecha_inicio >= :desde AND fecha_inicio <= :hasta
+    """
+    
+    COLUMNAS_EXPORTACION_ALQUILERES = ("id_alquiler", "fecha_inicio", "fecha_fin",
+                                       "costo_total", "cliente", "vehiculo")
+    
+    def exportar_alquileres_csv(self, destino="alquileres_export.csv", desde=None, hasta=None,
+                                comprimir=None, progreso=None, cancelado=None, tamano_lote=None):
+        """
+        Exporta los alquileres a CSV en lotes de fetchmany (memoria constante)
+        Se escribe en un archivo temporal que reemplaza al destino solo si la exportación
+        termina: una cancelación o un error no dejan archivos a medio escribir
+        Args:
+            destino: ruta del archivo
+            desde, hasta: rango opcional de fecha de inicio (inclusive)
+            comprimir: gzip; por defecto, si el destino termina en '.gz'
+            progreso: función (filas_escritas, total) llamada después de cada lote
+            cancelado: función sin argumentos; si devuelve True se detiene la exportación
+            tamano_lote: filas por fetchmany (EXPORTACION_TAMANO_LOTE por defecto)
+        Returns:
+            dict: filas (escritas), total y cancelada
+        Raises:
+            ValueError: si alguna fecha es inválida o desde es posterior a hasta
+        """
+        params = {
+            "desde": normalizar_fecha(desde) if desde else "0000-01-01",
+            "hasta": normalizar_fecha(hasta) if hasta else "9999-12-31",
+        }
+        if params["desde"] > params["hasta"]:
+            raise ValueError("La fecha desde no puede ser posterior a la fecha hasta.")
+        if comprimir is None:
+            comprimir = str(destino).endswith(".gz")
+        tamano_lote = tamano_lote or EXPORTACION_TAMANO_LOTE
+        
+        temporal = f"{destino}.parcial"
+        filas = 0
+        cancelada = False
+        try:
+            with self._db.lector() as conn:
+                total = conn.execute(self.SQL_CANTIDAD_EXPORTACION, params).fetchone()[0]
+                if progreso:
+                    progreso(0, total)
+                if comprimir:
+                    # Nivel 6: casi el mismo tamaño que el 9 (por defecto) y varias veces más rápido
+                    archivo = gzip.open(temporal, "wt", compresslevel=6, newline='', encoding='utf-8')
+                else:
+                    archivo = open(temporal, "w", newline='', encoding='utf-8')
+                with archivo as f:
+                    writer = csv.writer(f)
+                    writer.writerow(self.COLUMNAS_EXPORTACION_ALQUILERES)
+                    cursor = conn.execute(self.SQL_EXPORTACION_ALQUILERES, params)
+                    while True:
+                        if cancelado and cancelado():
+                            cancelada = True
+                            break
+                        lote = cursor.fetchmany(tamano_lote)
+                        if not lote:
+                            break
+                        writer.writerows(lote)
+                        filas += len(lote)
+                        if progreso:
+                            progreso(filas, total)
+                    cursor.close()
+            if cancelada:
+                os.remove(temporal)
+            else:
+                os.replace(temporal, destino)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+        return {"filas": filas, "total": total, "cancelada": cancelada}
 
+def _limite_sql(limite):
+    """LIMIT de SQLite: un valor negativo significa sin límite"""
+    return -1 if limite is None else int(limite)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de concurrencia - N threads reservan el mismo vehículo en períodos solapados
+Solo una reserva puede confirmarse: el resto debe recibir ValueError y la base no
+puede quedar con alquileres solapados
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import unittest
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+import database
+import models
+import persistence.database_connection as database_connection
+from persistence.database_connection import DatabaseConnection
+
+CANTIDAD_THREADS = 8
+
+SQL_SOLAPAMIENTOS = """
+SELECT a.id_alquiler, b.id_alquiler
+FROM alquiler a
+JOIN alquiler b ON a.id_vehiculo = b.id_vehiculo AND a.id_alquiler < b.id_alquiler
+WHERE a.id_vehiculo = ?
+  AND a.fecha_fin >= b.fecha_inicio
+  AND a.fecha_inicio <= b.fecha_fin
+"""
+
+
+class TestConcurrenciaAlquileres(unittest.TestCase):
+
+    def setUp(self):
+        # Base temporal: DB_FILE se importa por nombre en cada módulo que lo usa
+        self._directorio = tempfile.mkdtemp()
+        self._db_original = config.DB_FILE
+        self._usar_base(os.path.join(self._directorio, "alquileres.db"))
+        database.init_db()
+
+        conn = sqlite3.connect(config.DB_FILE)
+        with conn:
+            self.id_cliente = conn.execute(
+                "INSERT INTO cliente (nombre, apellido, dni) VALUES ('Ana', 'Pérez', '30111222')").lastrowid
+            self.id_vehiculo = conn.execute(
+                """INSERT INTO vehiculo (patente, marca, modelo, tipo, costo_diario, estado)
+                   VALUES ('AA123BB', 'Fiat', 'Cronos', 'Sedan', 100, 'Disponible')""").lastrowid
+        conn.close()
+
+    def tearDown(self):
+        self._usar_base(self._db_original)
+        shutil.rmtree(self._directorio, ignore_errors=True)
+
+    @staticmethod
+    def _usar_base(ruta):
+        DatabaseConnection().close()
+        DatabaseConnection._pool = None
+        config.DB_FILE = database.DB_FILE = database_connection.DB_FILE = ruta
+
+    def test_reservas_solapadas_simultaneas(self):
+        barrera = threading.Barrier(CANTIDAD_THREADS)
+        exitos = []
+        rechazos = []
+        errores = []
+
+        def reservar(i):
+            # Todos los períodos se solapan entre sí (duran 10 días y empiezan con 1 día de diferencia)
+            inicio = f"2099-01-{i + 1:02d}"
+            fin = f"2099-01-{i + 11:02d}"
+            barrera.wait()
+            try:
+                models.registrar_alquiler(inicio, fin, self.id_cliente, self.id_vehiculo)
+                exitos.append(i)
+            except ValueError as e:
+                rechazos.append(str(e))
+            except Exception as e:
+                errores.append(e)
+
+        threads = [threading.Thread(target=reservar, args=(i,)) for i in range(CANTIDAD_THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=60)
+
+        self.assertEqual(errores, [])
+        self.assertEqual(len(exitos), 1)
+        self.assertEqual(len(rechazos), CANTIDAD_THREADS - 1)
+
+        conn = sqlite3.connect(config.DB_FILE)
+        try:
+            self.assertEqual(conn.execute(SQL_SOLAPAMIENTOS, (self.id_vehiculo,)).fetchall(), [])
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM alquiler WHERE id_vehiculo = ?",
+                                          (self.id_vehiculo,)).fetchone()[0], 1)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba del registro de alquileres en lote
+En modo todo o nada un error descarta el lote completo; en mejor esfuerzo se
+registran las solicitudes válidas y cada rechazo informa su motivo
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+import database
+import models
+import persistence.database_connection as database_connection
+from persistence.database_connection import DatabaseConnection
+from services.capacidad_categorias import CapacidadCategorias
+from services.indice_disponibilidad import IndiceDisponibilidad
+from services.planificador_estados import PlanificadorEstados
+
+
+class TestRegistrarAlquileres(unittest.TestCase):
+
+    def setUp(self):
+        # Base temporal: DB_FILE se importa por nombre en cada módulo que lo usa
+        self._directorio = tempfile.mkdtemp()
+        self._db_original = config.DB_FILE
+        self._usar_base(os.path.join(self._directorio, "alquileres.db"))
+        database.init_db()
+
+        conn = sqlite3.connect(config.DB_FILE)
+        with conn:
+            self.id_cliente = conn.execute(
+                "INSERT INTO cliente (nombre, apellido, dni) VALUES ('Ana', 'Pérez', '30111222')"
+            ).lastrowid
+            self.vehiculos = [conn.execute(
+                """INSERT INTO vehiculo (patente, marca, modelo, tipo, costo_diario, estado)
+                   VALUES (?, 'Fiat', 'Cronos', 'Sedan', 100, 'Disponible')""",
+                (patente,)).lastrowid for patente in ("AA123BB", "AA123BC", "AA123BD")]
+            # Alquiler ya registrado contra el que choca una de las solicitudes
+            conn.execute(
+                """INSERT INTO alquiler (fecha_inicio, fecha_fin, costo_total, id_cliente, id_vehiculo)
+                   VALUES ('2099-06-01', '2099-06-05', 500, ?, ?)""",
+                (self.id_cliente, self.vehiculos[2]))
+        conn.close()
+
+    def tearDown(self):
+        self._usar_base(self._db_original)
+        shutil.rmtree(self._directorio, ignore_errors=True)
+
+    @staticmethod
+    def _usar_base(ruta):
+        DatabaseConnection().close()
+        DatabaseConnection._pool = None
+        config.DB_FILE = database.DB_FILE = database_connection.DB_FILE = ruta
+        # Las estructuras en memoria del calendario reflejan la base anterior
+        CapacidadCategorias().invalidar()
+        IndiceDisponibilidad().invalidar()
+        PlanificadorEstados().reiniciar()
+
+    def _solicitudes(self):
+        """Dos válidas, un solapamiento dentro del lote, fechas invertidas y un choque con la base"""
+        v1, v2, v3 = self.vehiculos
+        return [
+            {"fecha_inicio": "2099-06-01", "fecha_fin": "2099-06-03", "id_cliente": self.id_cliente, "id_vehiculo": v1},
+            {"fecha_inicio": "2099-06-02", "fecha_fin": "2099-06-04", "id_cliente": self.id_cliente, "id_vehiculo": v1},
+            {"fecha_inicio": "2099-06-10", "fecha_fin": "2099-06-12", "id_cliente": self.id_cliente, "id_vehiculo": v2},
+            {"fecha_inicio": "2099-06-09", "fecha_fin": "2099-06-07", "id_cliente": self.id_cliente, "id_vehiculo": v2},
+            {"fecha_inicio": "2099-06-04", "fecha_fin": "2099-06-06", "id_cliente": self.id_cliente, "id_vehiculo": v3},
+        ]
+
+    def _alquileres(self):
+        conn = sqlite3.connect(config.DB_FILE)
+        try:
+            return conn.execute(
+                "SELECT id_alquiler, id_vehiculo, fecha_inicio, fecha_fin FROM alquiler ORDER BY id_alquiler"
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def test_todo_o_nada_no_registra_ninguna(self):
+        previos = self._alquileres()
+        resultados = models.registrar_alquileres(self._solicitudes(), modo=models.MODO_TODO_O_NADA)
+
+        self.assertEqual(self._alquileres(), previos)
+        self.assertEqual([r["indice"] for r in resultados], list(range(5)))
+        for resultado in resultados:
+            self.assertFalse(resultado["ok"])
+            self.assertIsNone(resultado["id_alquiler"])
+            self.assertTrue(resultado["error"])
+        self.assertIn("No registrado", resultados[0]["error"])
+        self.assertIn("mismo lote", resultados[1]["error"])
+        self.assertIn("No registrado", resultados[2]["error"])
+
+    def test_todo_o_nada_registra_lote_valido(self):
+        solicitudes = [self._solicitudes()[i] for i in (0, 2)]
+        resultados = models.registrar_alquileres(solicitudes, modo=models.MODO_TODO_O_NADA)
+
+        self.assertTrue(all(r["ok"] and r["error"] is None for r in resultados), resultados)
+        registrados = {fila[0]: fila[1:] for fila in self._alquileres()}
+        for solicitud, resultado in zip(solicitudes, resultados):
+            self.assertEqual(registrados[resultado["id_alquiler"]],
+                             (solicitud["id_vehiculo"], solicitud["fecha_inicio"], solicitud["fecha_fin"]))
+
+    def test_mejor_esfuerzo_registra_las_validas(self):
+        solicitudes = self._solicitudes()
+        previos = self._alquileres()
+        resultados = models.registrar_alquileres(solicitudes, modo=models.MODO_MEJOR_ESFUERZO)
+
+        self.assertEqual([r["ok"] for r in resultados], [True, False, True, False, False])
+        for resultado in resultados:
+            self.assertEqual(resultado["ok"], resultado["error"] is None)
+            self.assertEqual(resultado["ok"], resultado["id_alquiler"] is not None)
+        self.assertIn("mismo lote", resultados[1]["error"])
+
+        registrados = {fila[0]: fila[1:] for fila in self._alquileres() if fila not in previos}
+        self.assertEqual(len(registrados), 2)
+        for i in (0, 2):
+            self.assertEqual(registrados[resultados[i]["id_alquiler"]],
+                             (solicitudes[i]["id_vehiculo"], solicitudes[i]["fecha_inicio"],
+                              solicitudes[i]["fecha_fin"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
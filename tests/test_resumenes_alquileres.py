@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de las tablas de resumen mantenidas por triggers
+Después de altas en lote, extensiones, devoluciones anticipadas, cambios y bajas de
+alquileres, cada tabla debe coincidir con el GROUP BY recalculado sobre alquiler
+"""
+
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+import database
+import models
+import persistence.database_connection as database_connection
+from persistence.database_connection import DatabaseConnection
+from entities.alquiler import Alquiler
+from persistence.alquiler_dao import AlquilerDAO
+from services.capacidad_categorias import CapacidadCategorias
+from services.indice_disponibilidad import IndiceDisponibilidad
+from services.planificador_estados import PlanificadorEstados
+
+SQL_RESUMEN_ESPERADO = """
+SELECT 'total', substr(fecha_inicio, 1, 7), 0, COUNT(*), round(SUM(costo_total), 2)
+FROM alquiler GROUP BY 2
+UNION ALL
+SELECT 'vehiculo', substr(fecha_inicio, 1, 7), id_vehiculo, COUNT(*), round(SUM(costo_total), 2)
+FROM alquiler GROUP BY 2, 3
+UNION ALL
+SELECT 'cliente', substr(fecha_inicio, 1, 7), id_cliente, COUNT(*), round(SUM(costo_total), 2)
+FROM alquiler GROUP BY 2, 3
+"""
+
+SQL_RESUMEN = "SELECT dimension, mes, id, cantidad, round(total, 2) FROM resumen_mensual"
+
+SQL_ESTADISTICA_ESPERADA = """
+SELECT e.{clave}, COUNT(a.id_alquiler), round(COALESCE(SUM(a.costo_total), 0), 2), MAX(a.fecha_inicio)
+FROM {entidad} e LEFT JOIN alquiler a ON a.{clave} = e.{clave}
+GROUP BY e.{clave}
+"""
+
+SQL_ESTADISTICA = """
+SELECT {clave}, cantidad_alquileres, round(total_facturado, 2), ultimo_alquiler
+FROM estadistica_{entidad}
+"""
+
+
+class TestResumenesAlquileres(unittest.TestCase):
+
+    def setUp(self):
+        # Base temporal: DB_FILE se importa por nombre en cada módulo que lo usa
+        self._directorio = tempfile.mkdtemp()
+        self._db_original = config.DB_FILE
+        self._usar_base(os.path.join(self._directorio, "alquileres.db"))
+        database.init_db()
+
+        conn = sqlite3.connect(config.DB_FILE)
+        with conn:
+            self.clientes = [conn.execute(
+                "INSERT INTO cliente (nombre, apellido, dni) VALUES (?, 'Pérez', ?)",
+                (nombre, dni)).lastrowid for nombre, dni in (("Ana", "30111222"), ("Luis", "30111333"))]
+            self.vehiculos = [conn.execute(
+                """INSERT INTO vehiculo (patente, marca, modelo, tipo, costo_diario, estado)
+                   VALUES (?, 'Fiat', 'Cronos', 'Sedan', ?, 'Disponible')""",
+                (patente, costo)).lastrowid
+                for patente, costo in (("AA123BB", 100), ("AA123BC", 150), ("AA123BD", 200))]
+        conn.close()
+
+    def tearDown(self):
+        self._usar_base(self._db_original)
+        shutil.rmtree(self._directorio, ignore_errors=True)
+
+    @staticmethod
+    def _usar_base(ruta):
+        DatabaseConnection().close()
+        DatabaseConnection._pool = None
+        config.DB_FILE = database.DB_FILE = database_connection.DB_FILE = ruta
+        # Las estructuras en memoria del calendario reflejan la base anterior
+        CapacidadCategorias().invalidar()
+        IndiceDisponibilidad().invalidar()
+        PlanificadorEstados().reiniciar()
+
+    def _consultar(self, sql):
+        conn = sqlite3.connect(config.DB_FILE)
+        try:
+            return sorted(conn.execute(sql).fetchall())
+        finally:
+            conn.close()
+
+    def _operar(self):
+        """Altas en lote, alta simple, extensión, devolución anticipada, cambio y baja"""
+        v1, v2, v3 = self.vehiculos
+        c1, c2 = self.clientes
+        resultados = models.registrar_alquileres([
+            {"fecha_inicio": "2099-01-05", "fecha_fin": "2099-01-09", "id_cliente": c1, "id_vehiculo": v1},
+            {"fecha_inicio": "2099-01-20", "fecha_fin": "2099-01-22", "id_cliente": c2, "id_vehiculo": v1},
+            {"fecha_inicio": "2099-01-10", "fecha_fin": "2099-01-14", "id_cliente": c1, "id_vehiculo": v2},
+            {"fecha_inicio": "2099-02-01", "fecha_fin": "2099-02-03", "id_cliente": c2, "id_vehiculo": v3},
+            {"fecha_inicio": "2099-03-10", "fecha_fin": "2099-03-12", "id_cliente": c2, "id_vehiculo": v2},
+        ], modo=models.MODO_MEJOR_ESFUERZO)
+        self.assertTrue(all(r["ok"] for r in resultados), resultados)
+        ids = [r["id_alquiler"] for r in resultados]
+
+        models.registrar_alquiler("2099-02-15", "2099-02-18", c1, v3)
+        models.extender_alquiler(ids[0], "2099-01-12")
+        models.acortar_alquiler(ids[2], "2099-01-11")
+
+        # Cambio de mes, cliente y vehículo por el DAO (sin pasar por models)
+        dao = AlquilerDAO()
+        datos = dao.read(ids[3]).to_dict()
+        datos.update(fecha_inicio="2099-04-01", fecha_fin="2099-04-02",
+                     id_cliente=c1, id_vehiculo=v1, costo_total=321.5)
+        dao.update(Alquiler.from_dict(datos))
+
+        # Baja del único alquiler de marzo: el mes desaparece del resumen
+        models.eliminar_alquiler(ids[4])
+
+    def test_resumen_mensual_coincide_con_group_by(self):
+        self._operar()
+        resumen = self._consultar(SQL_RESUMEN)
+        self.assertEqual(resumen, self._consultar(SQL_RESUMEN_ESPERADO))
+        meses = {mes for _, mes, _, _, _ in resumen}
+        self.assertIn("2099-04", meses)
+        self.assertNotIn("2099-03", meses)
+
+    def test_estadisticas_coinciden_con_group_by(self):
+        self._operar()
+        for entidad, clave in (("cliente", "id_cliente"), ("vehiculo", "id_vehiculo")):
+            with self.subTest(entidad=entidad):
+                self.assertEqual(
+                    self._consultar(SQL_ESTADISTICA.format(entidad=entidad, clave=clave)),
+                    self._consultar(SQL_ESTADISTICA_ESPERADA.format(entidad=entidad, clave=clave)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Prueba de los planes de consulta
+Cada consulta que verifica database.verificar_indices debe usar alguno de sus índices
+sobre una base con los datos de ejemplo
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+# Agregar directorio padre al path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+import database
+import persistence.database_connection as database_connection
+from persistence.database_connection import DatabaseConnection
+from services.capacidad_categorias import CapacidadCategorias
+from services.indice_disponibilidad import IndiceDisponibilidad
+from services.planificador_estados import PlanificadorEstados
+
+
+class TestVerificarIndices(unittest.TestCase):
+
+    def setUp(self):
+        # Base temporal: DB_FILE se importa por nombre en cada módulo que lo usa
+        self._directorio = tempfile.mkdtemp()
+        self._db_original = config.DB_FILE
+        self._usar_base(os.path.join(self._directorio, "alquileres.db"))
+        database.init_db()
+        database.seed_sample_data()
+
+    def tearDown(self):
+        self._usar_base(self._db_original)
+        shutil.rmtree(self._directorio, ignore_errors=True)
+
+    @staticmethod
+    def _usar_base(ruta):
+        DatabaseConnection().close()
+        DatabaseConnection._pool = None
+        config.DB_FILE = database.DB_FILE = database_connection.DB_FILE = ruta
+        # Las estructuras en memoria del calendario reflejan la base anterior
+        CapacidadCategorias().invalidar()
+        IndiceDisponibilidad().invalidar()
+        PlanificadorEstados().reiniciar()
+
+    def test_todas_las_consultas_usan_indice(self):
+        resultados = database.verificar_indices()
+
+        self.assertTrue(resultados)
+        for resultado in resultados:
+            with self.subTest(consulta=resultado["consulta"]):
+                self.assertTrue(resultado["indices_esperados"])
+                self.assertTrue(resultado["usa_indice"],
+                                f"Esperaba {', '.join(resultado['indices_esperados'])}; plan:\n"
+                                + "\n".join(resultado["plan"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
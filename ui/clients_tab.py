@@ -14,6 +14,7 @@ import os
 # Agregar directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import get_connection
+from persistence.database_connection import DatabaseConnection
 from validations import validar_dni, validar_telefono, validar_email
 from .ui_utils import enable_treeview_sorting
 
@@ -106,19 +107,16 @@ class ClientesTab(ttk.Frame):
             )
 
         if not messagebox.askyesno("Confirmar", mensaje):
-            conn.close()
             return
 
-        try:
-            if asociados:
-                c.execute("DELETE FROM alquiler WHERE id_cliente = ?", (idc,))
+        def eliminar(c):
+            c.execute("DELETE FROM alquiler WHERE id_cliente = ?", (idc,))
             c.execute("DELETE FROM cliente WHERE id_cliente = ?", (idc,))
-            conn.commit()
+
+        try:
+            DatabaseConnection().ejecutar_inmediata(eliminar)
         except sqlite3.IntegrityError as e:
-            conn.rollback()
             messagebox.showerror("Error", f"No se puede eliminar: {e}")
-        finally:
-            conn.close()
         self.populate()
 
 
@@ -201,8 +199,7 @@ class DatosClienteDialog(simpledialog.Dialog):
 
     def apply(self):
         """Guarda los datos en la base de datos"""
-        conn = get_connection()
-        c = conn.cursor()
+        db = DatabaseConnection()
         
         # Limpiar y normalizar datos
         dni = self.dni.get().strip()
@@ -211,27 +208,24 @@ class DatosClienteDialog(simpledialog.Dialog):
         
         if self.id_cliente:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """UPDATE cliente SET nombre=?, apellido=?, dni=?, telefono=?, direccion=?, email=? 
                        WHERE id_cliente=?""",
                     (self.nombre.get(), self.apellido.get(), dni,
                      telefono, self.direccion.get(), email, self.id_cliente)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo actualizar: {e}")
         else:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """INSERT INTO cliente (nombre, apellido, dni, telefono, direccion, email) 
                        VALUES (?,?,?,?,?,?)""",
                     (self.nombre.get(), self.apellido.get(), dni,
                      telefono, self.direccion.get(), email)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo insertar: {e}")
         
-        conn.commit()
-        conn.close()
-        
         if self.on_save:
             self.on_save()
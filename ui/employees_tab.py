@@ -14,6 +14,7 @@ import os
 # Agregar directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import get_connection
+from persistence.database_connection import DatabaseConnection
 from validations import validar_dni, validar_telefono, validar_email
 from .ui_utils import enable_treeview_sorting
 
@@ -90,14 +91,11 @@ class EmpleadosTab(ttk.Frame):
         ide = item[0]
         
         if messagebox.askyesno("Confirmar", "¿Eliminar empleado seleccionado?"):
-            conn = get_connection()
-            c = conn.cursor()
             try:
-                c.execute("DELETE FROM empleado WHERE id_empleado = ?", (ide,))
-                conn.commit()
+                DatabaseConnection().ejecutar_inmediata(
+                    lambda c: c.execute("DELETE FROM empleado WHERE id_empleado = ?", (ide,)))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se puede eliminar: {e}")
-            conn.close()
             self.populate()
 
 
@@ -180,8 +178,7 @@ class DatosEmpleadoDialog(simpledialog.Dialog):
 
     def apply(self):
         """Guarda los datos en la base de datos"""
-        conn = get_connection()
-        c = conn.cursor()
+        db = DatabaseConnection()
         
         # Limpiar y normalizar datos
         dni = self.dni.get().strip()
@@ -190,27 +187,24 @@ class DatosEmpleadoDialog(simpledialog.Dialog):
         
         if self.id_empleado:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """UPDATE empleado SET nombre=?, apellido=?, dni=?, cargo=?, telefono=?, 
                        email=? WHERE id_empleado=?""",
                     (self.nombre.get(), self.apellido.get(), dni,
                      self.cargo.get(), telefono, email, self.id_empleado)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo actualizar: {e}")
         else:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """INSERT INTO empleado (nombre, apellido, dni, cargo, telefono, email) 
                        VALUES (?,?,?,?,?,?)""",
                     (self.nombre.get(), self.apellido.get(), dni,
                      self.cargo.get(), telefono, email)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo insertar: {e}")
         
-        conn.commit()
-        conn.close()
-        
         if self.on_save:
             self.on_save()
@@ -14,8 +14,15 @@ import os
 # Agregar directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import get_connection
-from models import registrar_alquiler, actualizar_estados_vehiculos
-from validations import validar_fecha_inicio_alquiler
+from models import (registrar_alquiler, eliminar_alquiler, registrar_mantenimiento, eliminar_mantenimiento,
+                    registrar_mantenimientos, extender_alquiler, acortar_alquiler, proximas_fechas_libres, SQL_LISTADO_ALQUILERES, SQL_ALQUILERES_ACTIVOS)
+from services.planificador_estados import PlanificadorEstados
+from services.planificador_mantenimientos import PlanificadorMantenimientos
+from services.lista_espera import ListaEspera
+from persistence.vehiculo_dao import VehiculoDAO
+from persistence.database_connection import DatabaseConnection
+from persistence.alquiler_dao import AlquilerDAO
+from validations import validar_fecha_inicio_alquiler, normalizar_fecha
 from .ui_utils import enable_treeview_sorting
 
 
@@ -50,6 +57,7 @@ class AlquileresTab(ttk.Frame):
         ttk.Button(top_alq, text="Nuevo Alquiler", command=self.nuevo_alquiler).pack(side=tk.LEFT)
         ttk.Button(top_alq, text="Ver Detalle", command=self.ver_detalle).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_alq, text="Eliminar", command=self.eliminar_alquiler).pack(side=tk.LEFT, padx=5)
+        ttk.Button(top_alq, text="Cambiar Fecha Fin", command=self.cambiar_fecha_fin).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_alq, text="Registrar Multa/Daño", command=self.registrar_multa).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_alq, text="Refrescar", command=self.populate).pack(side=tk.RIGHT)
         
@@ -72,6 +80,7 @@ class AlquileresTab(ttk.Frame):
         
         ttk.Button(top_mant, text="Registrar Mantenimiento", command=self.registrar_mantenimiento).pack(side=tk.LEFT)
         ttk.Button(top_mant, text="Eliminar", command=self.eliminar_mantenimiento).pack(side=tk.LEFT, padx=5)
+        ttk.Button(top_mant, text="Planificar Taller", command=self.planificar_mantenimientos).pack(side=tk.LEFT, padx=5)
         ttk.Button(top_mant, text="Refrescar", command=self.populate_mantenimientos).pack(side=tk.RIGHT)
         
         cols_mant = ("id", "tipo", "fechas", "costo", "vehiculo", "observaciones")
@@ -86,11 +95,11 @@ class AlquileresTab(ttk.Frame):
         """
         Carga los alquileres en la tabla
         Programación Estructurada - Función bien organizada
-        Actualiza automáticamente los estados de vehículos antes de mostrar los datos
+        Antes de mostrar aplica las transiciones de estado cuyas fechas ya llegaron
         """
-        # Actualizar estados de vehículos antes de mostrar (para reflejar cambios de fechas)
+        # Solo se recalculan los vehículos con un inicio/fin vencido (ver PlanificadorEstados)
         try:
-            actualizar_estados_vehiculos()
+            PlanificadorEstados().procesar()
         except Exception:
             # Si hay error, continuar de todas formas
             pass
@@ -100,17 +109,7 @@ class AlquileresTab(ttk.Frame):
         
         conn = get_connection()
         c = conn.cursor()
-        query = """SELECT a.id_alquiler, a.fecha_inicio, a.fecha_fin, a.costo_total,
-                          c.apellido || ', ' || c.nombre AS cliente,
-                          v.patente || ' - ' || v.marca || ' ' || v.modelo AS vehiculo,
-                          e.apellido || ', ' || e.nombre AS empleado
-                   FROM alquiler a
-                   JOIN cliente c ON a.id_cliente = c.id_cliente
-                   JOIN vehiculo v ON a.id_vehiculo = v.id_vehiculo
-                   LEFT JOIN empleado e ON a.id_empleado = e.id_empleado
-                   ORDER BY a.fecha_inicio DESC
-                """
-        c.execute(query)
+        c.execute(SQL_LISTADO_ALQUILERES)
         for row in c.fetchall():
             self.tree.insert("", tk.END, values=(
                 row["id_alquiler"],
@@ -196,53 +195,82 @@ class AlquileresTab(ttk.Frame):
         if not respuesta:
             return
         
-        conn = get_connection()
-        c = conn.cursor()
-        
         try:
-            # Obtener información del vehículo antes de eliminar el alquiler
-            c.execute("SELECT id_vehiculo FROM alquiler WHERE id_alquiler = ?", (id_alq,))
-            row = c.fetchone()
-            
-            if not row:
-                messagebox.showerror("Error", "Alquiler no encontrado")
-                return
-            
-            id_vehiculo = row["id_vehiculo"]
-            
-            # Eliminar el alquiler (las multas se eliminarán automáticamente por CASCADE)
-            c.execute("DELETE FROM alquiler WHERE id_alquiler = ?", (id_alq,))
-            
-            # Verificar si el vehículo tiene otros alquileres activos
-            # Un alquiler está activo si: fecha_inicio <= fecha_actual <= fecha_fin
-            from datetime import date as date_class
-            fecha_actual = date_class.today().strftime("%Y-%m-%d")
-            c.execute("""
-                SELECT COUNT(*) FROM alquiler 
-                WHERE id_vehiculo = ? 
-                AND date(fecha_inicio) <= date(?)
-                AND date(fecha_fin) >= date(?)
-            """, (id_vehiculo, fecha_actual, fecha_actual))
-            otros_alquileres = c.fetchone()[0]
-            
-            # Si no hay otros alquileres y el vehículo estaba "Alquilado", cambiar a "Disponible"
-            if otros_alquileres == 0:
-                c.execute("SELECT estado FROM vehiculo WHERE id_vehiculo = ?", (id_vehiculo,))
-                estado_actual = c.fetchone()
-                if estado_actual and estado_actual["estado"] == "Alquilado":
-                    c.execute("UPDATE vehiculo SET estado = 'Disponible' WHERE id_vehiculo = ?", (id_vehiculo,))
-            
-            conn.commit()
+            # Las multas se eliminan por CASCADE; el estado del vehículo se recalcula en models
+            eliminar_alquiler(id_alq)
             messagebox.showinfo("Éxito", f"Alquiler #{id_alq} eliminado correctamente")
             
             # Refrescar la lista
             self.populate()
+            self.ofrecer_lista_espera()
             
         except Exception as e:
-            conn.rollback()
             messagebox.showerror("Error", f"Error al eliminar alquiler: {str(e)}")
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido para evitar cerrar conexión compartida
+
+    def ofrecer_lista_espera(self):
+        """
+        Propone registrar las solicitudes de la lista de espera que entran en el
+        período que se acaba de liberar (ListaEspera arma las propuestas con el evento)
+        """
+        lista = ListaEspera()
+        registradas = 0
+        for p in lista.propuestas():
+            respuesta = messagebox.askyesno(
+                "Lista de espera",
+                f"La solicitud en espera #{p['id_espera']} (cliente {p['id_cliente']}, {p['tipo']}, "
+                f"{p['fecha_inicio']} a {p['fecha_fin']}) entra en el vehículo {p['id_vehiculo']}.\n\n"
+                f"¿Registrar el alquiler?")
+            if not respuesta:
+                lista.descartar(p["id_espera"])
+                continue
+            try:
+                lista.aceptar(p["id_espera"])
+                registradas += 1
+            except ValueError as e:
+                messagebox.showerror("Validación", str(e))
+        if registradas:
+            self.populate()
+
+    def cambiar_fecha_fin(self):
+        """
+        Extiende el alquiler seleccionado o registra una devolución anticipada
+        Programación Estructurada - Delega en models (extender_alquiler / acortar_alquiler)
+        """
+        sel = self.tree.selection()
+        if not sel:
+            messagebox.showwarning("Atención", "Seleccione un alquiler")
+            return
+        
+        id_alq = self.tree.item(sel[0])["values"][0]
+        dao = AlquilerDAO()
+        alquiler = dao.read(id_alq)
+        if not alquiler:
+            messagebox.showerror("Error", "Alquiler no encontrado")
+            return
+        fecha_fin_actual = normalizar_fecha(alquiler.fecha_fin)
+        
+        valor = simpledialog.askstring(
+            "Cambiar Fecha Fin",
+            f"Alquiler #{id_alq} - fin actual: {fecha_fin_actual}\n"
+            f"Nueva fecha de fin (YYYY-MM-DD):",
+            initialvalue=fecha_fin_actual, parent=self)
+        if not valor:
+            return
+        
+        try:
+            nueva_fecha_fin = normalizar_fecha(valor)
+            if nueva_fecha_fin > fecha_fin_actual:
+                datos = extender_alquiler(id_alq, nueva_fecha_fin)
+            else:
+                datos = acortar_alquiler(id_alq, nueva_fecha_fin)
+        except ValueError as e:
+            messagebox.showerror("Validación", str(e))
+            return
+        
+        messagebox.showinfo("OK", f"Alquiler #{id_alq} hasta {nueva_fecha_fin}. "
+                                  f"Nuevo costo total: ${datos['costo_total']}")
+        self.populate()
+        self.ofrecer_lista_espera()
 
     def registrar_multa(self):
         """
@@ -295,6 +323,13 @@ class AlquileresTab(ttk.Frame):
         """
         DialogMantenimiento(self, on_save=self.populate_mantenimientos)
     
+    def planificar_mantenimientos(self):
+        """
+        Programa mantenimientos para varios vehículos según la capacidad del taller
+        Programación Orientada a Objetos - Abre diálogo del planificador
+        """
+        DialogPlanMantenimientos(self, on_save=self.populate_mantenimientos)
+    
     def eliminar_mantenimiento(self):
         """
         Elimina el mantenimiento seleccionado
@@ -318,65 +353,17 @@ class AlquileresTab(ttk.Frame):
         if not respuesta:
             return
         
-        conn = get_connection()
-        c = conn.cursor()
-        
         try:
-            # Obtener información del vehículo antes de eliminar el mantenimiento
-            c.execute("SELECT id_vehiculo FROM mantenimiento WHERE id_mant = ?", (id_mant,))
-            row = c.fetchone()
-            
-            if not row:
-                messagebox.showerror("Error", "Mantenimiento no encontrado")
-                return
-            
-            id_vehiculo = row["id_vehiculo"]
-            
-            # Eliminar el mantenimiento
-            c.execute("DELETE FROM mantenimiento WHERE id_mant = ?", (id_mant,))
-            
-            # Verificar si el vehículo tiene otros mantenimientos activos
-            # Si no tiene más mantenimientos activos y estaba en "Mantenimiento", actualizar estado
-            from datetime import date as date_class
-            fecha_actual = date_class.today().strftime("%Y-%m-%d")
-            
-            c.execute("""
-                SELECT COUNT(*) FROM mantenimiento 
-                WHERE id_vehiculo = ? 
-                AND date(fecha_fin) >= date(?)
-            """, (id_vehiculo, fecha_actual))
-            otros_mantenimientos_activos = c.fetchone()[0]
-            
-            if otros_mantenimientos_activos == 0:
-                c.execute("SELECT estado FROM vehiculo WHERE id_vehiculo = ?", (id_vehiculo,))
-                estado_actual = c.fetchone()
-                if estado_actual and estado_actual["estado"] == "Mantenimiento":
-                    # Verificar si tiene alquileres activos antes de cambiar a Disponible
-                    # Un alquiler está activo si: fecha_inicio <= fecha_actual <= fecha_fin
-                    c.execute("""
-                        SELECT COUNT(*) FROM alquiler 
-                        WHERE id_vehiculo = ? 
-                        AND date(fecha_inicio) <= date(?)
-                        AND date(fecha_fin) >= date(?)
-                    """, (id_vehiculo, fecha_actual, fecha_actual))
-                    alquileres_activos = c.fetchone()[0]
-                    
-                    if alquileres_activos == 0:
-                        c.execute("UPDATE vehiculo SET estado = 'Disponible' WHERE id_vehiculo = ?", (id_vehiculo,))
-                    else:
-                        c.execute("UPDATE vehiculo SET estado = 'Alquilado' WHERE id_vehiculo = ?", (id_vehiculo,))
-            
-            conn.commit()
+            # El estado del vehículo se recalcula en models
+            eliminar_mantenimiento(id_mant)
             messagebox.showinfo("Éxito", f"Mantenimiento #{id_mant} eliminado correctamente")
             
             # Refrescar la lista
             self.populate_mantenimientos()
+            self.ofrecer_lista_espera()
             
         except Exception as e:
-            conn.rollback()
             messagebox.showerror("Error", f"Error al eliminar mantenimiento: {str(e)}")
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido para evitar cerrar conexión compartida
 
 
 class DialogNuevoAlquiler(simpledialog.Dialog):
@@ -413,6 +400,7 @@ class DialogNuevoAlquiler(simpledialog.Dialog):
         ttk.Label(frame, text="Vehículo (ID):").grid(row=1, column=0, sticky=tk.W)
         self.id_vehiculo = ttk.Entry(frame)
         self.id_vehiculo.grid(row=1, column=1)
+        ttk.Button(frame, text="Buscar disponibles...", command=self.buscar_vehiculos).grid(row=1, column=2, padx=5)
         
         ttk.Label(frame, text="Empleado (ID) opcional:").grid(row=2, column=0, sticky=tk.W)
         self.id_empleado = ttk.Entry(frame)
@@ -433,6 +421,43 @@ class DialogNuevoAlquiler(simpledialog.Dialog):
         
         return self.id_cliente
 
+    def buscar_vehiculos(self):
+        """
+        Abre el buscador de vehículos libres en las fechas ingresadas
+        y completa el ID del vehículo elegido
+        """
+        try:
+            fecha_inicio = normalizar_fecha(self.fecha_inicio.get())
+            fecha_fin = normalizar_fecha(self.fecha_fin.get())
+        except ValueError:
+            messagebox.showwarning("Validación", "Ingrese primero las fechas (usar YYYY-MM-DD)", parent=self)
+            return
+        if fecha_fin < fecha_inicio:
+            messagebox.showwarning("Validación", "La fecha de fin debe ser igual o posterior a la fecha de inicio",
+                                   parent=self)
+            return
+        
+        dialogo = DialogVehiculosDisponibles(self, fecha_inicio, fecha_fin)
+        if dialogo.id_seleccionado is not None:
+            self.id_vehiculo.delete(0, tk.END)
+            self.id_vehiculo.insert(0, str(dialogo.id_seleccionado))
+
+    def sugerir_fechas(self):
+        """
+        Abre las próximas fechas libres para la duración pedida (mismo vehículo o
+        mismo tipo) y completa vehículo y fechas con la opción elegida
+        """
+        fecha_inicio = normalizar_fecha(self.fecha_inicio.get())
+        fecha_fin = normalizar_fecha(self.fecha_fin.get())
+        dias = (datetime.strptime(fecha_fin, "%Y-%m-%d") - datetime.strptime(fecha_inicio, "%Y-%m-%d")).days + 1
+        dialogo = DialogProximasFechas(self, int(self.id_vehiculo.get()), max(fecha_inicio, date.today().isoformat()), dias)
+        if dialogo.seleccion is not None:
+            id_vehiculo, nuevo_inicio, nuevo_fin = dialogo.seleccion
+            for entry, valor in ((self.id_vehiculo, id_vehiculo), (self.fecha_inicio, nuevo_inicio),
+                                 (self.fecha_fin, nuevo_fin)):
+                entry.delete(0, tk.END)
+                entry.insert(0, str(valor))
+
     def validate(self):
         """
         Valida los datos ingresados
@@ -513,7 +538,12 @@ class DialogNuevoAlquiler(simpledialog.Dialog):
         except ValueError as e:
             # Los mensajes de ValueError ya son claros (Cliente no encontrado, Empleado no encontrado, etc.)
             self._error_occurred = True  # Marcar que hubo error
-            messagebox.showerror("Error", str(e))
+            if str(e).startswith("Vehículo no disponible en el periodo indicado"):
+                # Ofrecer fechas alternativas en lugar de que el usuario pruebe a ciegas
+                if messagebox.askyesno("Sin disponibilidad", f"{e}\n\n¿Buscar las próximas fechas libres?"):
+                    self.sugerir_fechas()
+            else:
+                messagebox.showerror("Error", str(e))
         except Exception as e:
             # Capturar errores de FOREIGN KEY y mostrar mensajes más claros
             self._error_occurred = True  # Marcar que hubo error
@@ -532,6 +562,169 @@ class DialogNuevoAlquiler(simpledialog.Dialog):
                 messagebox.showerror("Error", str(e))
 
 
+class DialogVehiculosDisponibles(simpledialog.Dialog):
+    """
+    Buscador de vehículos sin alquileres ni mantenimientos en un período
+    Programación Orientada a Objetos - Clase de diálogo
+    Los resultados se cargan por páginas (VehiculoDAO.listar_disponibles_en_periodo)
+    """
+    
+    TAMANIO_PAGINA = 50
+    
+    def __init__(self, parent, fecha_inicio, fecha_fin):
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.id_seleccionado = None
+        self._dao = VehiculoDAO()
+        self._desplazamiento = 0
+        super().__init__(parent, f"Vehículos disponibles {fecha_inicio} a {fecha_fin}")
+    
+    def body(self, frame):
+        """Construye filtros y tabla de resultados"""
+        filtros = ttk.Frame(frame)
+        filtros.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(filtros, text="Tipo:").pack(side=tk.LEFT)
+        conn = get_connection()
+        tipos = [r[0] for r in conn.execute(
+            "SELECT DISTINCT tipo FROM vehiculo WHERE tipo IS NOT NULL ORDER BY tipo").fetchall()]
+        self.tipo = ttk.Combobox(filtros, values=[""] + tipos, state="readonly", width=12)
+        self.tipo.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filtros, text="Marca:").pack(side=tk.LEFT)
+        self.marca = ttk.Entry(filtros, width=12)
+        self.marca.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Label(filtros, text="Costo diario máx.:").pack(side=tk.LEFT)
+        self.costo_maximo = ttk.Entry(filtros, width=8)
+        self.costo_maximo.pack(side=tk.LEFT, padx=5)
+        
+        ttk.Button(filtros, text="Buscar", command=self.buscar).pack(side=tk.LEFT, padx=5)
+        
+        cols = ("id", "patente", "marca", "modelo", "tipo", "costo_diario")
+        self.tree = ttk.Treeview(frame, columns=cols, show="headings", height=12)
+        for c in cols:
+            self.tree.heading(c, text=c.capitalize())
+            self.tree.column(c, width=100)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<Double-1>", lambda e: self.ok())
+        
+        self.btn_mas = ttk.Button(frame, text="Más resultados", command=self.cargar_pagina)
+        self.btn_mas.pack(pady=5)
+        
+        self.buscar()
+        return self.tree
+    
+    def buscar(self):
+        """Reinicia la búsqueda con los filtros actuales"""
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        self._desplazamiento = 0
+        self.cargar_pagina()
+    
+    def cargar_pagina(self):
+        """Agrega la siguiente página de resultados a la tabla"""
+        try:
+            costo_maximo = float(self.costo_maximo.get()) if self.costo_maximo.get().strip() else None
+        except ValueError:
+            messagebox.showwarning("Validación", "El costo máximo debe ser un número válido", parent=self)
+            return
+        
+        vehiculos = self._dao.listar_disponibles_en_periodo(
+            self.fecha_inicio, self.fecha_fin,
+            tipo=self.tipo.get() or None,
+            marca=self.marca.get().strip() or None,
+            costo_maximo=costo_maximo,
+            limite=self.TAMANIO_PAGINA,
+            desplazamiento=self._desplazamiento,
+        )
+        for v in vehiculos:
+            self.tree.insert("", tk.END, values=(
+                v.id_vehiculo, v.patente, v.marca, v.modelo, v.to_dict()["tipo"], v.costo_diario))
+        self._desplazamiento += len(vehiculos)
+        # Una página incompleta indica que no hay más resultados
+        self.btn_mas.configure(state=tk.NORMAL if len(vehiculos) == self.TAMANIO_PAGINA else tk.DISABLED)
+    
+    def validate(self):
+        """Requiere un vehículo seleccionado"""
+        if not self.tree.selection():
+            messagebox.showwarning("Atención", "Seleccione un vehículo", parent=self)
+            return False
+        return True
+    
+    def apply(self):
+        """Guarda el ID del vehículo elegido"""
+        self.id_seleccionado = self.tree.item(self.tree.selection()[0])["values"][0]
+
+
+class DialogProximasFechas(simpledialog.Dialog):
+    """
+    Próximas fechas libres para un alquiler de `dias` días, en el vehículo pedido
+    o en cualquier vehículo disponible del mismo tipo
+    Programación Orientada a Objetos - Clase de diálogo
+    """
+    
+    CANTIDAD = 10
+    ALCANCES = ("Este vehículo", "Cualquier vehículo del mismo tipo")
+    
+    def __init__(self, parent, id_vehiculo, desde, dias):
+        self.id_vehiculo = id_vehiculo
+        self.desde = desde
+        self.dias = dias
+        self.seleccion = None
+        row = get_connection().execute("SELECT tipo FROM vehiculo WHERE id_vehiculo = ?", (id_vehiculo,)).fetchone()
+        self.tipo_vehiculo = row["tipo"] if row else None
+        super().__init__(parent, f"Próximas fechas libres ({dias} días desde {desde})")
+    
+    def body(self, frame):
+        """Construye el selector de alcance y la tabla de sugerencias"""
+        filtros = ttk.Frame(frame)
+        filtros.pack(fill=tk.X, pady=5)
+        ttk.Label(filtros, text="Buscar en:").pack(side=tk.LEFT)
+        alcances = self.ALCANCES if self.tipo_vehiculo else self.ALCANCES[:1]
+        self.alcance = ttk.Combobox(filtros, values=alcances, state="readonly", width=32)
+        self.alcance.current(0)
+        self.alcance.pack(side=tk.LEFT, padx=5)
+        self.alcance.bind("<<ComboboxSelected>>", lambda e: self.buscar())
+        
+        cols = ("vehiculo", "fecha_inicio", "fecha_fin", "libre_hasta")
+        self.tree = ttk.Treeview(frame, columns=cols, show="headings", height=10)
+        for c in cols:
+            self.tree.heading(c, text=c.replace("_", " ").capitalize())
+            self.tree.column(c, width=110)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree.bind("<Double-1>", lambda e: self.ok())
+        
+        self.buscar()
+        return self.tree
+    
+    def buscar(self):
+        """Carga las sugerencias para el alcance elegido"""
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        if self.alcance.current() == 0:
+            ventanas = proximas_fechas_libres(self.dias, id_vehiculo=self.id_vehiculo,
+                                              desde=self.desde, cantidad=self.CANTIDAD)
+        else:
+            ventanas = proximas_fechas_libres(self.dias, tipo=self.tipo_vehiculo,
+                                              desde=self.desde, cantidad=self.CANTIDAD)
+        for v in ventanas:
+            self.tree.insert("", tk.END, values=(
+                v["id_vehiculo"], v["fecha_inicio"], v["fecha_fin"], v["libre_hasta"] or "Sin límite"))
+    
+    def validate(self):
+        """Requiere una sugerencia seleccionada"""
+        if not self.tree.selection():
+            messagebox.showwarning("Atención", "Seleccione una fecha", parent=self)
+            return False
+        return True
+    
+    def apply(self):
+        """Guarda vehículo y fechas elegidos"""
+        valores = self.tree.item(self.tree.selection()[0])["values"]
+        self.seleccion = (valores[0], valores[1], valores[2])
+
+
 class DialogMulta(simpledialog.Dialog):
     """
     Diálogo completo para registrar multa/daño
@@ -584,16 +777,12 @@ class DialogMulta(simpledialog.Dialog):
         Guarda la multa en la base de datos
         Programación Estructurada - Persistencia
         """
-        conn = get_connection()
-        c = conn.cursor()
         descripcion = self.descripcion.get("1.0", tk.END).strip()
         monto = float(self.monto.get())
         
-        c.execute("INSERT INTO multa (descripcion, monto, id_alquiler) VALUES (?,?,?)", 
-                 (descripcion, monto, self.id_alquiler))
-        conn.commit()
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido para evitar cerrar conexión compartida
+        DatabaseConnection().ejecutar_inmediata(lambda c: c.execute(
+            "INSERT INTO multa (descripcion, monto, id_alquiler) VALUES (?,?,?)",
+            (descripcion, monto, self.id_alquiler)))
         
         messagebox.showinfo("OK", "Multa registrada exitosamente")
         
@@ -708,12 +897,7 @@ class DialogMantenimiento(simpledialog.Dialog):
         # Programación Estructurada - Validación de alquileres activos
         # Un alquiler está activo si: fecha_inicio <= fecha_actual <= fecha_fin
         fecha_actual = date.today().strftime("%Y-%m-%d")
-        c.execute("""
-            SELECT COUNT(*) FROM alquiler 
-            WHERE id_vehiculo = ? 
-            AND date(fecha_inicio) <= date(?)
-            AND date(fecha_fin) >= date(?)
-        """, (id_vehiculo, fecha_actual, fecha_actual))
+        c.execute(SQL_ALQUILERES_ACTIVOS, (id_vehiculo, fecha_actual, fecha_actual))
         
         alquileres_activos = c.fetchone()[0]
         if alquileres_activos > 0:
@@ -748,50 +932,124 @@ class DialogMantenimiento(simpledialog.Dialog):
             return
         
         id_vehiculo = r["id_vehiculo"]
-        tipo = self.tipo.get()
-        fecha_inicio = self.fecha_inicio.get()
-        fecha_fin = self.fecha_fin.get()
-        costo = float(self.costo.get())
         observaciones = self.observaciones.get("1.0", tk.END).strip()
         
-        # Verificar que no haya alquileres en el período de mantenimiento
-        from datetime import date as date_class
-        fecha_actual = date_class.today().strftime("%Y-%m-%d")
-        c.execute("""
-            SELECT COUNT(*) FROM alquiler 
-            WHERE id_vehiculo = ? 
-            AND NOT (date(fecha_fin) < date(?) OR date(fecha_inicio) > date(?))
-        """, (id_vehiculo, fecha_inicio, fecha_fin))
-        
-        alquileres_solapados = c.fetchone()[0]
-        if alquileres_solapados > 0:
-            messagebox.showerror("Validación", 
-                                f"No se puede programar mantenimiento en un vehículo que tiene alquileres en ese período. "
-                                f"El vehículo tiene {alquileres_solapados} alquiler(es) que se solapan con el mantenimiento.")
+        try:
+            # Valida solapamiento con alquileres, inserta y actualiza el estado del vehículo
+            registrar_mantenimiento(id_vehiculo, self.tipo.get(), self.fecha_inicio.get(), self.fecha_fin.get(),
+                                    float(self.costo.get()), observaciones)
+        except ValueError as e:
+            messagebox.showerror("Validación", str(e))
             return
         
-        # Insertar mantenimiento
-        c.execute(
-            "INSERT INTO mantenimiento (tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones) VALUES (?,?,?,?,?,?)",
-            (tipo, fecha_inicio, fecha_fin, costo, id_vehiculo, observaciones if observaciones else None)
-        )
-        
-        # Verificar si el vehículo está en mantenimiento activo (fecha_fin >= fecha_actual)
-        # Si está en mantenimiento activo, actualizar estado a "Mantenimiento"
-        fecha_fin_date = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
-        if fecha_fin_date >= date_class.today():
-            c.execute("UPDATE vehiculo SET fecha_ultimo_mantenimiento = ?, estado = 'Mantenimiento' WHERE id_vehiculo = ?", 
-                     (fecha_fin, id_vehiculo))
-        else:
-            # Si el mantenimiento ya terminó, solo actualizar fecha_ultimo_mantenimiento
-            c.execute("UPDATE vehiculo SET fecha_ultimo_mantenimiento = ? WHERE id_vehiculo = ?", 
-                     (fecha_fin, id_vehiculo))
+        messagebox.showinfo("OK", "Mantenimiento registrado exitosamente. El vehículo ahora está en estado 'Mantenimiento'.")
         
-        conn.commit()
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido para evitar cerrar conexión compartida
+        if self.on_save:
+            self.on_save()
+
+
+class DialogPlanMantenimientos(simpledialog.Dialog):
+    """
+    Planificador de taller: busca el primer turno libre de cada vehículo sin chocar
+    con alquileres y respetando la capacidad diaria, y registra el plan completo
+    Programación Orientada a Objetos - Clase de diálogo
+    """
+    
+    def __init__(self, parent, on_save=None):
+        self.on_save = on_save
+        self._planificador = PlanificadorMantenimientos()
+        self._plan = None
+        super().__init__(parent, "Planificar Mantenimientos")
+    
+    def body(self, frame):
+        """Construye parámetros del plan y tabla de vista previa"""
+        form = ttk.Frame(frame)
+        form.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(form, text="Vehículos (IDs separados por coma):").grid(row=0, column=0, sticky=tk.W)
+        self.ids = ttk.Entry(form, width=40)
+        self.ids.grid(row=0, column=1, columnspan=2, sticky=tk.EW, padx=5)
+        
+        ttk.Label(form, text="Días desde el último service:").grid(row=1, column=0, sticky=tk.W)
+        self.dias_ultimo = ttk.Entry(form, width=8)
+        self.dias_ultimo.insert(0, "180")
+        self.dias_ultimo.grid(row=1, column=1, sticky=tk.W, padx=5)
+        ttk.Button(form, text="Cargar vencidos", command=self.cargar_vencidos).grid(row=1, column=2, padx=5)
+        
+        ttk.Label(form, text="Duración (días):").grid(row=2, column=0, sticky=tk.W)
+        self.dias = ttk.Entry(form, width=8)
+        self.dias.insert(0, "1")
+        self.dias.grid(row=2, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(form, text="Capacidad del taller (por día):").grid(row=3, column=0, sticky=tk.W)
+        self.capacidad = ttk.Entry(form, width=8)
+        self.capacidad.insert(0, "2")
+        self.capacidad.grid(row=3, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(form, text="Desde (YYYY-MM-DD):").grid(row=4, column=0, sticky=tk.W)
+        self.desde = ttk.Entry(form, width=12)
+        self.desde.insert(0, str(date.today()))
+        self.desde.grid(row=4, column=1, sticky=tk.W, padx=5)
+        
+        ttk.Label(form, text="Tipo:").grid(row=5, column=0, sticky=tk.W)
+        self.tipo = ttk.Combobox(form, values=["preventivo", "correctivo"], state="readonly", width=12)
+        self.tipo.current(0)
+        self.tipo.grid(row=5, column=1, sticky=tk.W, padx=5)
         
-        messagebox.showinfo("OK", "Mantenimiento registrado exitosamente. El vehículo ahora está en estado 'Mantenimiento'.")
+        ttk.Button(form, text="Calcular plan", command=self.calcular).grid(row=6, column=0, pady=5, sticky=tk.W)
         
+        cols = ("vehiculo", "fecha_inicio", "fecha_fin", "observacion")
+        self.tree = ttk.Treeview(frame, columns=cols, show="headings", height=12)
+        for c in cols:
+            self.tree.heading(c, text=c.replace("_", " ").capitalize())
+            self.tree.column(c, width=120)
+        self.tree.pack(fill=tk.BOTH, expand=True)
+        return self.ids
+    
+    def cargar_vencidos(self):
+        """Completa la lista con los vehículos que deben pasar por el taller"""
+        try:
+            ids = self._planificador.vehiculos_vencidos(int(self.dias_ultimo.get()))
+        except ValueError:
+            messagebox.showwarning("Validación", "Los días deben ser un número entero", parent=self)
+            return
+        self.ids.delete(0, tk.END)
+        self.ids.insert(0, ", ".join(str(i) for i in ids))
+    
+    def calcular(self):
+        """Calcula el plan y lo muestra sin registrarlo"""
+        for r in self.tree.get_children():
+            self.tree.delete(r)
+        self._plan = None
+        try:
+            ids = [int(x) for x in self.ids.get().replace(" ", "").split(",") if x]
+            plan = self._planificador.planificar(
+                ids, dias=int(self.dias.get()), capacidad_diaria=int(self.capacidad.get()),
+                desde=self.desde.get().strip(), tipo=self.tipo.get())
+        except ValueError as e:
+            messagebox.showwarning("Validación", str(e), parent=self)
+            return
+        for m in plan["programados"]:
+            self.tree.insert("", tk.END, values=(m["id_vehiculo"], m["fecha_inicio"], m["fecha_fin"], ""))
+        for s in plan["sin_programar"]:
+            self.tree.insert("", tk.END, values=(s["id_vehiculo"], "", "", s["motivo"]))
+        self._plan = plan
+    
+    def validate(self):
+        """Requiere un plan calculado con al menos un mantenimiento"""
+        if not self._plan or not self._plan["programados"]:
+            messagebox.showwarning("Atención", "Calcule un plan con al menos un mantenimiento", parent=self)
+            return False
+        return True
+    
+    def apply(self):
+        """Registra todos los mantenimientos del plan en una sola transacción"""
+        try:
+            registrar_mantenimientos(self._plan["programados"])
+        except ValueError as e:
+            # Otro puesto registró un alquiler después de calcular el plan: no se guardó nada
+            messagebox.showerror("Validación", f"{e}\nVuelva a calcular el plan.")
+            return
+        messagebox.showinfo("OK", f"{len(self._plan['programados'])} mantenimiento(s) programado(s).")
         if self.on_save:
             self.on_save()
@@ -9,11 +9,14 @@ import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import sys
 import os
+import queue
+import threading
 
 # Agregar directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from database import get_connection
 from config import MATPLOTLIB_AVAILABLE
+from services.reportes_service import ReportesService
+from validations import normalizar_fecha
 
 try:
     from fpdf import FPDF
@@ -32,8 +35,19 @@ from .ui_utils import enable_treeview_sorting
 class ReportesTab(ttk.Frame):
     """Tab para reportes y análisis"""
     
+    # Ancho de las columnas de los reportes (el resto usa ANCHO_COLUMNA)
+    ANCHOS_COLUMNAS = {
+        "id_alquiler": 60, "id_cliente": 60, "id_vehiculo": 60,
+        "cliente": 200, "cliente_nombre": 200, "vehiculo": 220, "descripcion": 240,
+        "fecha_inicio": 110, "fecha_fin": 110, "costo_total": 100, "ultimo_alquiler": 120,
+        "patente": 120, "veces_alquilado": 140, "total_alquileres": 140, "total_facturado": 160,
+    }
+    ANCHO_COLUMNA = 140
+
     def __init__(self, container):
         super().__init__(container)
+        # Todos los reportes pasan por el servicio (consultas indexadas y caché compartidas)
+        self.servicio = ReportesService()
         self.views = {}
         self.periodo_var = tk.StringVar(self, value="mes")
         self.build_ui()
@@ -231,6 +245,13 @@ class ReportesTab(ttk.Frame):
             if key in ("pdf", "excel"):
                 button["state"] = tk.NORMAL if rows else tk.DISABLED
 
+    def _mostrar_resultado(self, section, resultado):
+        """Muestra un ResultadoReporte en la tabla de la sección"""
+        columnas = [(clave, encabezado, self.ANCHOS_COLUMNAS.get(clave, self.ANCHO_COLUMNA))
+                    for clave, encabezado, _ in resultado.columnas]
+        filas = [tuple("" if valor is None else valor for valor in fila) for fila in resultado.filas]
+        self._update_view(section, columnas, filas)
+
     def listar_alquileres_por_cliente(self):
         """Lista los alquileres por cliente"""
         respuesta = simpledialog.askstring(
@@ -250,83 +271,11 @@ class ReportesTab(ttk.Frame):
                 return
             cliente_id = int(respuesta)
 
-        conn = get_connection()
-        c = conn.cursor()
-        
-        if cliente_id:
-            c.execute("""SELECT a.*, c.apellido||', '||c.nombre as cliente,
-                                v.patente || ' - ' || v.marca || ' ' || v.modelo as vehiculo
-                         FROM alquiler a
-                         JOIN cliente c ON a.id_cliente=c.id_cliente
-                         JOIN vehiculo v ON a.id_vehiculo=v.id_vehiculo
-                         WHERE a.id_cliente=?
-                         ORDER BY a.fecha_inicio DESC""", (cliente_id,))
-        else:
-            c.execute("""SELECT a.*, c.apellido||', '||c.nombre as cliente,
-                                v.patente || ' - ' || v.marca || ' ' || v.modelo as vehiculo
-                         FROM alquiler a
-                         JOIN cliente c ON a.id_cliente=c.id_cliente
-                         JOIN vehiculo v ON a.id_vehiculo=v.id_vehiculo
-                         ORDER BY a.fecha_inicio DESC""")
-        
-        rows = c.fetchall()
-        conn.close()
-        
-        datos = [
-            (
-                r["id_alquiler"],
-                r["cliente"],
-                r["vehiculo"],
-                r["fecha_inicio"],
-                r["fecha_fin"],
-                r["costo_total"]
-            )
-            for r in rows
-        ]
-
-        columnas = [
-            ("id_alquiler", "ID", 60),
-            ("cliente", "Cliente", 200),
-            ("vehiculo", "Vehículo", 220),
-            ("fecha_inicio", "Inicio", 110),
-            ("fecha_fin", "Fin", 110),
-            ("costo_total", "Costo ($)", 100)
-        ]
-
-        self._update_view("clientes", columnas, datos)
+        self._mostrar_resultado("clientes", self.servicio.listado_alquileres(cliente_id))
 
     def vehiculos_mas_alquilados(self):
         """Lista los vehículos más alquilados"""
-        conn = get_connection()
-        c = conn.cursor()
-        
-        c.execute("""SELECT v.id_vehiculo, v.patente, v.marca||' '||v.modelo as desc, COUNT(a.id_alquiler) as veces
-                     FROM vehiculo v
-                     LEFT JOIN alquiler a ON v.id_vehiculo = a.id_vehiculo
-                     GROUP BY v.id_vehiculo
-                     ORDER BY veces DESC""")
-        
-        rows = c.fetchall()
-        conn.close()
-
-        datos = [
-            (
-                r["id_vehiculo"],
-                r["patente"],
-                r["desc"],
-                r["veces"]
-            )
-            for r in rows
-        ]
-
-        columnas = [
-            ("id_vehiculo", "ID", 60),
-            ("patente", "Patente", 120),
-            ("desc", "Descripción", 240),
-            ("veces", "Cant. Alquileres", 140)
-        ]
-
-        self._update_view("vehiculos", columnas, datos)
+        self._mostrar_resultado("vehiculos", self.servicio.ranking_vehiculos())
 
     def grafico_vehiculos_anillo(self, save_path=None):
         """Genera gráfico de anillo para vehículos más alquilados"""
@@ -336,18 +285,13 @@ class ReportesTab(ttk.Frame):
 
         import matplotlib.pyplot as plt
 
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("""SELECT v.patente || ' - ' || v.marca||' '||v.modelo as desc, COUNT(a.id_alquiler) as veces
-                     FROM vehiculo v
-                     LEFT JOIN alquiler a ON v.id_vehiculo = a.id_vehiculo
-                     GROUP BY v.id_vehiculo
-                     ORDER BY veces DESC""")
-        rows = c.fetchall()
-        conn.close()
+        ranking = self.servicio.ranking_vehiculos()
+        etiquetas = [f"{patente} - {descripcion}" for patente, descripcion
+                     in zip(ranking.columna("patente"), ranking.columna("descripcion"))]
 
         # Filtrar vehículos con 0 alquileres
-        datos_filtrados = [(r["desc"], r["veces"]) for r in rows if r["veces"] > 0]
+        datos_filtrados = [(etiqueta, veces) for etiqueta, veces
+                           in zip(etiquetas, ranking.columna("veces_alquilado")) if veces > 0]
         
         if not datos_filtrados:
             messagebox.showinfo("Información", "No hay vehículos con alquileres para mostrar en el gráfico.")
@@ -426,19 +370,9 @@ class ReportesTab(ttk.Frame):
         
         import matplotlib.pyplot as plt
         
-        conn = get_connection()
-        c = conn.cursor()
-        
-        c.execute("""SELECT substr(fecha_inicio,1,7) as mes, SUM(costo_total) as total
-                     FROM alquiler
-                     GROUP BY mes
-                     ORDER BY mes""")
-        
-        rows = c.fetchall()
-        conn.close()
-        
-        meses = [r["mes"] for r in rows]
-        tot = [r["total"] for r in rows]
+        facturacion = self.servicio.facturacion_mensual()
+        meses = facturacion.columna("periodo")
+        tot = facturacion.columna("total_facturado")
         
         if not meses:
             messagebox.showinfo("Info", "No hay datos de facturación")
@@ -467,17 +401,9 @@ class ReportesTab(ttk.Frame):
 
         import matplotlib.pyplot as plt
 
-        conn = get_connection()
-        c = conn.cursor()
-        c.execute("""SELECT substr(fecha_inicio,1,7) as mes, SUM(costo_total) as total
-                     FROM alquiler
-                     GROUP BY mes
-                     ORDER BY mes""")
-        rows = c.fetchall()
-        conn.close()
-
-        meses = [r["mes"] for r in rows]
-        tot = [r["total"] for r in rows]
+        facturacion = self.servicio.facturacion_mensual()
+        meses = facturacion.columna("periodo")
+        tot = facturacion.columna("total_facturado")
         if not meses:
             messagebox.showinfo("Info", "No hay datos de facturación")
             return
@@ -493,73 +419,39 @@ class ReportesTab(ttk.Frame):
         messagebox.showinfo("Exportar", f"Gráfico guardado en {filename}")
 
     def exportar_alquileres_csv(self):
-        """Exporta la lista de alquileres a un archivo CSV"""
-        import csv
-        
-        fname = "alquileres_export.csv"
-        conn = get_connection()
-        c = conn.cursor()
-        
-        c.execute("""SELECT a.id_alquiler, a.fecha_inicio, a.fecha_fin, a.costo_total,
-                            c.nombre||' '||c.apellido as cliente, v.patente as vehiculo
-                     FROM alquiler a
-                     JOIN cliente c ON a.id_cliente=c.id_cliente
-                     JOIN vehiculo v ON a.id_vehiculo=v.id_vehiculo
-                     ORDER BY a.fecha_inicio DESC""")
-        
-        rows = c.fetchall()
-        conn.close()
-        
-        with open(fname, "w", newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["id_alquiler", "fecha_inicio", "fecha_fin", "costo_total", "cliente", "vehiculo"])
-            for r in rows:
-                writer.writerow([
-                    r["id_alquiler"], r["fecha_inicio"], r["fecha_fin"],
-                    r["costo_total"], r["cliente"], r["vehiculo"]
-                ])
-        
-        messagebox.showinfo("Exportar", f"Exportado a {fname}")
+        """
+        Exporta los alquileres a CSV (opcionalmente gzip y por rango de fechas)
+        La exportación corre en un thread aparte: la ventana sigue respondiendo
+        """
+        dialogo = DialogExportarAlquileres(self)
+        if dialogo.resultado is None:
+            return
+        desde, hasta, comprimir = dialogo.resultado
+
+        extension = ".csv.gz" if comprimir else ".csv"
+        filename = filedialog.asksaveasfilename(
+            defaultextension=extension,
+            initialfile="alquileres_export" + extension,
+            filetypes=[("CSV comprimido", "*.csv.gz")] if comprimir else [("CSV", "*.csv")],
+            title="Exportar alquileres"
+        )
+        if not filename:
+            return
+
+        VentanaExportacion(self, lambda progreso, cancelado: self.servicio.exportar_alquileres_csv(
+            filename, desde=desde, hasta=hasta, comprimir=comprimir,
+            progreso=progreso, cancelado=cancelado), filename)
 
     def alquileres_por_periodo(self):
         """Genera un resumen de alquileres agrupado por período."""
         periodo = self.periodo_var.get()
-        if periodo not in ("mes", "trimestre", "año"):
+        if periodo not in ReportesService.EXPRESIONES_PERIODO:
             messagebox.showerror("Error", "Seleccione un período válido.")
             return
 
-        conn = get_connection()
-        c = conn.cursor()
-
-        if periodo == "mes":
-            campo = "substr(fecha_inicio,1,7)"
-            titulo = "Alquileres por mes"
-        elif periodo == "trimestre":
-            campo = ("substr(fecha_inicio,1,4) || '-T' || ("
-                     "CAST(((CAST(substr(fecha_inicio,6,2) AS INTEGER)-1) / 3) AS INTEGER) + 1)")
-            titulo = "Alquileres por trimestre"
-        else:
-            campo = "substr(fecha_inicio,1,4)"
-            titulo = "Alquileres por año"
-
-        c.execute(f"""SELECT {campo} as periodo,
-                             COUNT(*) as cantidad,
-                             SUM(costo_total) as total
-                      FROM alquiler
-                      GROUP BY periodo
-                      ORDER BY periodo""")
-
-        rows = c.fetchall()
-        conn.close()
-
-        datos = [(r["periodo"], r["cantidad"], r["total"]) for r in rows]
-        columnas = [
-            ("periodo", "Período", 140),
-            ("cantidad", "Cantidad", 120),
-            ("total", "Total facturado ($)", 180)
-        ]
-        self._update_view("periodos", columnas, datos)
-        if not datos:
+        resultado = self.servicio.resumen_por_periodo(periodo, ascendente=True)
+        self._mostrar_resultado("periodos", resultado)
+        if not resultado:
             messagebox.showinfo("Información", "No hay datos para el período seleccionado.")
 
     def exportar_tabla_pdf(self, section, titulo):
@@ -635,3 +527,125 @@ class ReportesTab(ttk.Frame):
 
         wb.save(filename)
         messagebox.showinfo("Exportar", f"Reporte guardado en {filename}")
+
+
+class DialogExportarAlquileres(simpledialog.Dialog):
+    """
+    Opciones de la exportación de alquileres: rango de fechas de inicio y compresión
+    Programación Orientada a Objetos - Clase de diálogo
+    """
+
+    def __init__(self, parent):
+        self.resultado = None
+        super().__init__(parent, "Exportar alquileres (CSV)")
+
+    def body(self, frame):
+        ttk.Label(frame, text="Inicio desde (YYYY-MM-DD, vacío = sin límite):").grid(row=0, column=0, sticky=tk.W)
+        self.desde = ttk.Entry(frame, width=12)
+        self.desde.grid(row=0, column=1, sticky=tk.W, padx=5, pady=2)
+
+        ttk.Label(frame, text="Inicio hasta (YYYY-MM-DD, vacío = sin límite):").grid(row=1, column=0, sticky=tk.W)
+        self.hasta = ttk.Entry(frame, width=12)
+        self.hasta.grid(row=1, column=1, sticky=tk.W, padx=5, pady=2)
+
+        self.comprimir = tk.BooleanVar(frame, value=False)
+        ttk.Checkbutton(frame, text="Comprimir (gzip)", variable=self.comprimir).grid(
+            row=2, column=0, columnspan=2, sticky=tk.W, pady=5)
+        return self.desde
+
+    def validate(self):
+        try:
+            desde = normalizar_fecha(self.desde.get()) if self.desde.get().strip() else None
+            hasta = normalizar_fecha(self.hasta.get()) if self.hasta.get().strip() else None
+        except ValueError as e:
+            messagebox.showwarning("Validación", str(e), parent=self)
+            return False
+        if desde and hasta and desde > hasta:
+            messagebox.showwarning("Validación", "La fecha desde no puede ser posterior a la fecha hasta.",
+                                   parent=self)
+            return False
+        self._valores = (desde, hasta, self.comprimir.get())
+        return True
+
+    def apply(self):
+        self.resultado = self._valores
+
+
+class VentanaExportacion(tk.Toplevel):
+    """
+    Progreso de una exportación que corre en un thread de fondo
+    El thread no toca Tk: informa por una cola que la ventana revisa con after()
+    Cancelar (o cerrar la ventana) le pide al exportador que se detenga
+    """
+
+    INTERVALO_MS = 100
+
+    def __init__(self, parent, exportar, destino):
+        """
+        Args:
+            exportar: función (progreso, cancelado) que hace la exportación y devuelve
+                      el dict de ReportesService.exportar_alquileres_csv
+            destino: archivo de salida (para el mensaje final)
+        """
+        super().__init__(parent)
+        self.title("Exportando alquileres")
+        self.transient(parent)
+        self.resizable(False, False)
+        self._destino = destino
+        self._cola = queue.Queue()
+        self._cancelar = threading.Event()
+
+        self._estado = ttk.Label(self, text="Preparando exportación...", width=50)
+        self._estado.pack(padx=10, pady=(10, 5))
+        self._barra = ttk.Progressbar(self, mode="determinate", length=360)
+        self._barra.pack(padx=10, pady=5)
+        self._boton = ttk.Button(self, text="Cancelar", command=self.cancelar)
+        self._boton.pack(pady=(5, 10))
+        self.protocol("WM_DELETE_WINDOW", self.cancelar)
+
+        hilo = threading.Thread(target=self._trabajar, args=(exportar,), daemon=True)
+        hilo.start()
+        self.after(self.INTERVALO_MS, self._revisar)
+
+    def cancelar(self):
+        self._cancelar.set()
+        self._boton["state"] = tk.DISABLED
+        self._estado["text"] = "Cancelando..."
+
+    def _trabajar(self, exportar):
+        """Thread de fondo: solo escribe en la cola"""
+        try:
+            resultado = exportar(lambda filas, total: self._cola.put(("progreso", filas, total)),
+                                 self._cancelar.is_set)
+            self._cola.put(("fin", resultado))
+        except Exception as e:
+            self._cola.put(("error", e))
+
+    def _revisar(self):
+        """Vacía la cola en el thread de Tk; se reprograma hasta que termine la exportación"""
+        try:
+            while True:
+                mensaje = self._cola.get_nowait()
+                if mensaje[0] == "progreso":
+                    _, filas, total = mensaje
+                    self._barra["maximum"] = max(total, 1)
+                    self._barra["value"] = filas
+                    if not self._cancelar.is_set():
+                        self._estado["text"] = f"{filas:,} de {total:,} alquileres"
+                elif mensaje[0] == "fin":
+                    self._terminar(mensaje[1])
+                    return
+                else:
+                    self.destroy()
+                    messagebox.showerror("Error", f"No se pudo exportar: {mensaje[1]}")
+                    return
+        except queue.Empty:
+            pass
+        self.after(self.INTERVALO_MS, self._revisar)
+
+    def _terminar(self, resultado):
+        self.destroy()
+        if resultado["cancelada"]:
+            messagebox.showinfo("Exportar", "Exportación cancelada; no se generó el archivo.")
+        else:
+            messagebox.showinfo("Exportar", f"{resultado['filas']} alquiler(es) exportado(s) a {self._destino}")
@@ -14,6 +14,7 @@ import os
 # Agregar directorio padre al path para imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from database import get_connection
+from persistence.database_connection import DatabaseConnection
 from validations import validar_patente, validar_fecha_mantenimiento
 from .ui_utils import enable_treeview_sorting
 
@@ -113,19 +114,15 @@ class VehiculosTab(ttk.Frame):
             # conn.close()  # Removido para evitar cerrar conexión compartida
             return
 
-        try:
-            if alquileres:
-                c.execute("DELETE FROM alquiler WHERE id_vehiculo = ?", (idv,))
-            if mantenimientos:
-                c.execute("DELETE FROM mantenimiento WHERE id_vehiculo = ?", (idv,))
+        def eliminar(c):
+            c.execute("DELETE FROM alquiler WHERE id_vehiculo = ?", (idv,))
+            c.execute("DELETE FROM mantenimiento WHERE id_vehiculo = ?", (idv,))
             c.execute("DELETE FROM vehiculo WHERE id_vehiculo = ?", (idv,))
-            conn.commit()
+
+        try:
+            DatabaseConnection().ejecutar_inmediata(eliminar)
         except sqlite3.IntegrityError as e:
-            conn.rollback()
             messagebox.showerror("Error", f"No se puede eliminar: {e}")
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # finally:
-        #     conn.close()  # Removido para evitar cerrar conexión compartida
         self.populate()
 
 
@@ -227,36 +224,31 @@ class DatosVehiculoDialog(simpledialog.Dialog):
         # Obtener estado del combobox
         estado = self.entries["Estado:"].get()
         
-        conn = get_connection()
-        c = conn.cursor()
+        db = DatabaseConnection()
         
         if self.id_vehiculo:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """UPDATE vehiculo SET patente=?, marca=?, modelo=?, tipo=?, 
                        costo_diario=?, estado=?, fecha_ultimo_mantenimiento=? 
                        WHERE id_vehiculo=?""",
                     (patente, values["Marca:"], values["Modelo:"],
                      values["Tipo:"], float(values["Costo diario:"]), estado,
                      fecha_mant, self.id_vehiculo)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo actualizar: {e}")
         else:
             try:
-                c.execute(
+                db.ejecutar_inmediata(lambda c: c.execute(
                     """INSERT INTO vehiculo (patente, marca, modelo, tipo, costo_diario, 
                        estado, fecha_ultimo_mantenimiento) VALUES (?,?,?,?,?,?,?)""",
                     (patente, values["Marca:"], values["Modelo:"],
                      values["Tipo:"], float(values["Costo diario:"]), estado,
                      fecha_mant)
-                )
+                ))
             except sqlite3.IntegrityError as e:
                 messagebox.showerror("Error", f"No se pudo insertar: {e}")
         
-        conn.commit()
-        # No cerrar la conexión - el Singleton la maneja por thread
-        # conn.close()  # Removido para evitar cerrar conexión compartida
-        
         if self.on_save:
             self.on_save()
@@ -73,3 +73,26 @@ def validar_fecha_inicio_alquiler(fecha_str):
     except ValueError:
         return False
 
+
+
+def normalizar_fecha(valor):
+    """
+    Devuelve la fecha en formato ISO 'YYYY-MM-DD' (el único que se guarda en la base)
+    Acepta objetos date/datetime o texto 'YYYY-MM-DD' (con espacios alrededor)
+    Raises:
+        ValueError: si el valor no es una fecha válida
+    """
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, str):
+        texto = valor.strip()
+        try:
+            # Camino rápido para el formato canónico (se usa en cada consulta de disponibilidad)
+            if len(texto) == 10 and texto[4] == '-' and texto[7] == '-':
+                return date.fromisoformat(texto).isoformat()
+            return datetime.strptime(texto, '%Y-%m-%d').date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Fecha inválida: {valor!r} (usar formato YYYY-MM-DD)")